@@ -1,36 +1,40 @@
-import time
-import hashlib
-from config.settings import THRESHOLDS
-from core.models import Anomaly, Severity
+import uuid
+from core.models import Anomaly
+from core.batch import MetricBatch, SERIES
+from core.rules import RULES, SEVERITIES
+from core.sketch import SKETCHES
 
 class DetectorAgent:
+    def __init__(self, rules=RULES, registry=SERIES, sketches=SKETCHES):
+        # Thresholds and severity bands come from the live, hot-reloadable rule set
+        self.rules = rules
+        self.registry = registry
+        # Windowed quantiles for series whose rule asks for one (fed by MonitorAgent)
+        self.sketches = sketches
+
     async def detect(self, metrics):
-        anomalies = []
+        return await self.detect_batch(MetricBatch.from_metrics(metrics, self.registry))
+
+    async def detect_batch(self, batch):
+        if not len(batch):
+            return []
 
-        for m in metrics:
-            key = f"{m.component.value}.{m.name}"
-            threshold = THRESHOLDS.get(key)
-            
-            if threshold and m.value > threshold:
-                aid = hashlib.md5(f"{key}{time.time()}".encode()).hexdigest()[:8]
-                
-                # Determine severity
-                severity = Severity.HIGH
-                if m.value > threshold * 1.5:
-                    severity = Severity.CRITICAL
-                elif m.value < threshold * 1.1:
-                    severity = Severity.MEDIUM
-                
-                anomalies.append(
-                    Anomaly(
-                        id=aid,
-                        component=m.component,
-                        metric=m.name,
-                        value=m.value,
-                        threshold=threshold,
-                        severity=severity,
-                        confidence=0.85, # Static for rule-based, could be dynamic
-                        timestamp=m.timestamp
-                    )
+        rows, limits, severities, values = self.rules.current.evaluate(batch, self.sketches)
+
+        anomalies = []
+        for i, limit, severity, value in zip(rows, limits.tolist(), severities.tolist(), values.tolist()):
+            m = batch.metric(i)
+            anomalies.append(
+                Anomaly(
+                    id=uuid.uuid4().hex[:8],
+                    component=m.component,
+                    metric=m.name,
+                    value=value,
+                    threshold=limit,
+                    severity=SEVERITIES[severity],
+                    confidence=0.85, # Static for rule-based, could be dynamic
+                    timestamp=m.timestamp,
+                    target=m.target
                 )
+            )
         return anomalies
@@ -1,6 +1,10 @@
 from core.models import Diagnosis, Component
+from core.logstore import LOGS
 
 class DiagnoserAgent:
+    def __init__(self, log_store=LOGS):
+        self.log_store = log_store
+
     async def diagnose(self, anomaly, logs):
         root = "Unknown"
         recs = []
@@ -18,7 +22,10 @@ class DiagnoserAgent:
             root = "High latency in upstream service"
             recs = ["Check network", "Scale up API"]
 
-        evidence = [log.message for log in logs if log.level == "ERROR"]
+        # Indexed lines from around the anomaly; `logs` (this tick) only if the store has none
+        evidence = self.log_store.evidence(anomaly, limit=10) or [
+            log.message for log in logs if log.level == "ERROR"
+        ]
 
         return Diagnosis(
             anomaly_id=anomaly.id,
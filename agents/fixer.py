@@ -1,28 +1,113 @@
-from core.models import Fix, Component
+from core.models import Fix, FixStatus
+from core.instrumentation import Counter, Gauge
+from config.settings import FIX_ACTIONS, FIX_HANDLER, FIX_COOLDOWNS, MAX_CONCURRENT_FIXES
+from remediation.fake import FakeHandler
+from remediation.command import CommandHandler
 import asyncio
 
+_fixes_total = Counter("healthguard_fixes_total", "Remediation actions, by outcome", ["status"])
+FIXES_TOTAL = {status: _fixes_total.labels(status.value) for status in FixStatus}
+FIXES_IN_FLIGHT = Gauge("healthguard_fixes_in_flight", "Remediation actions queued or running").labels()
+
+
+def default_handler():
+    return CommandHandler() if FIX_HANDLER == "command" else FakeHandler()
+
+
 class FixerAgent:
-    async def fix(self, diagnosis):
-        action = "notify_only"
-        params = {}
-        safe = True
-
-        root_cause_lower = diagnosis.root_cause.lower()
-
-        if "cpu" in root_cause_lower:
-            action = "restart_service"
-            params = {"service": "api-worker"}
-        elif "database" in root_cause_lower:
-            action = "clear_db_cache"
-            params = {"scope": "global"}
-        elif "memory" in root_cause_lower:
-            action = "restart_service"
-            params = {"service": "memory-hog-service"}
-        elif "api" in root_cause_lower:
-            action = "scale_up"
-            params = {"replicas": 3}
-
-        # Simulate fix execution time
-        await asyncio.sleep(1)
-
-        return Fix(action, params, safe)
+    """
+    Plans a fix per anomaly and runs it through a remediation handler.
+    Identical actions on the same target share one run while it is in
+    flight, an action that just ran is not repeated within its cooldown, and
+    at most `max_concurrent` actions run at once; independent fixes run in
+    parallel.
+    """
+    def __init__(self, handler=None, max_concurrent=MAX_CONCURRENT_FIXES, cooldowns=FIX_COOLDOWNS):
+        self.handler = handler or default_handler()
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.cooldowns = cooldowns
+        self.in_flight = {}  # (target, action, params) -> Task
+        self.last_run = {}   # (target, action, params) -> loop time it finished
+
+    def plan(self, diagnosis, anomaly=None):
+        """(action, params) for an anomaly, or from the root cause text without one."""
+        if anomaly is not None:
+            component = anomaly.component.value
+        else:
+            root_cause = diagnosis.root_cause.lower()
+            component = next((c for c in FIX_ACTIONS if c in root_cause), None)
+        action, params = FIX_ACTIONS.get(component, ("notify_only", {}))
+        return action, dict(params)
+
+    def submit(self, diagnosis, anomaly=None):
+        """
+        Hand a fix over without waiting for it. Returns an awaitable that
+        resolves to the Fix once its action (or the one it joined) finishes.
+        """
+        action, params = self.plan(diagnosis, anomaly)
+        target = anomaly.target if anomaly is not None else "local"
+        loop = asyncio.get_running_loop()
+
+        if action == "notify_only":
+            return self._done(Fix(action, params, True, target, FixStatus.SKIPPED))
+
+        key = (target, action, tuple(sorted(params.items())))
+        running = self.in_flight.get(key)
+        if running is not None:
+            FIXES_TOTAL[FixStatus.DEDUPLICATED].inc()
+            return asyncio.ensure_future(self._join(running))
+
+        last = self.last_run.get(key)
+        cooldown = self.cooldowns.get(action, 0)
+        if last is not None and loop.time() - last < cooldown:
+            remaining = cooldown - (loop.time() - last)
+            return self._done(Fix(action, params, True, target, FixStatus.COOLDOWN,
+                                  f"ran {loop.time() - last:.0f}s ago, cooldown {remaining:.0f}s left"))
+
+        task = loop.create_task(self._execute(action, params, target))
+        self.in_flight[key] = task
+        FIXES_IN_FLIGHT.set(len(self.in_flight))
+        task.add_done_callback(lambda t: self._finished(key))
+        return task
+
+    async def fix(self, diagnosis, anomaly=None):
+        return await self.submit(diagnosis, anomaly)
+
+    def _done(self, fix):
+        FIXES_TOTAL[fix.status].inc()
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(fix)
+        return future
+
+    async def _join(self, running):
+        fix = await asyncio.shield(running)
+        return Fix(fix.action, fix.parameters, fix.safe, fix.target, FixStatus.DEDUPLICATED,
+                   f"joined in-flight run ({fix.status.value})", fix.duration)
+
+    def _finished(self, key):
+        self.in_flight.pop(key, None)
+        # Cooldown counts from the end of the run, whatever its outcome
+        self.last_run[key] = asyncio.get_running_loop().time()
+        FIXES_IN_FLIGHT.set(len(self.in_flight))
+
+    async def _execute(self, action, params, target):
+        async with self.slots:
+            clock = asyncio.get_running_loop().time
+            start = clock()
+            try:
+                detail = await asyncio.wait_for(self.handler.run(action, params, target), self.handler.timeout)
+                status = FixStatus.APPLIED
+            except asyncio.TimeoutError:
+                status, detail = FixStatus.TIMEOUT, f"{self.handler.name} timed out after {self.handler.timeout}s"
+            except Exception as e:
+                status, detail = FixStatus.FAILED, f"{self.handler.name}: {e}"
+
+        FIXES_TOTAL[status].inc()
+        return Fix(action, params, True, target, status, detail, clock() - start)
+
+    async def close(self):
+        """Cancel actions still running (their subprocesses are killed)."""
+        tasks = list(self.in_flight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
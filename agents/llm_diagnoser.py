@@ -1,17 +1,37 @@
 from core.models import Diagnosis, Component
+from core.logstore import LOGS
+from config.settings import (
+    LLM_LATENCY, LLM_CACHE_SIZE, LLM_CACHE_TTL, LLM_BATCH_MODE, LLM_BATCH_WINDOW,
+    LLM_BATCH_MAX,
+)
+from collections import OrderedDict
+import asyncio
+import hashlib
 import random
+import re
+import time
 
-class LLMDiagnoserAgent:
+class SimulatedLLMBackend:
     """
-    Simulates an LLM-based diagnosis agent.
+    Simulates an LLM-based diagnosis backend.
     In a real scenario, this would call OpenAI/Anthropic/Gemini APIs.
+    Any backend only needs `complete(requests)`: one call answers a list of
+    (anomaly, evidence) pairs with one dict per pair. `latency` fakes model time.
     """
-    async def diagnose(self, anomaly, logs):
+    def __init__(self, latency=LLM_LATENCY):
+        self.latency = latency
+        self.calls = 0
+
+    async def complete(self, requests):
+        self.calls += 1
         # Simulate LLM thinking time
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self.answer(anomaly, evidence) for anomaly, evidence in requests]
+
+    def answer(self, anomaly, evidence):
         # In a hackathon, we can pretend the LLM analyzed the data
         root_cause = f"AI analysis indicates {anomaly.component.value} saturation."
-        evidence = [log.message for log in logs[-3:]]
-        
         recommendation = "Investigate immediately."
         
         if anomaly.component == Component.CPU:
@@ -20,11 +40,151 @@ class LLMDiagnoserAgent:
         elif anomaly.component == Component.DATABASE:
             root_cause = "LLM Analysis: N+1 query problem detected in 'user-profile' endpoint."
             recommendation = "Cache query results or optimize ORM lookup."
+
+        return {
+            "root_cause": root_cause,
+            "confidence": 0.92 + random.uniform(-0.05, 0.05),
+            "recommendations": [recommendation, "Monitor for recurrence."],
+        }
+
+
+class DiagnosisCache:
+    """LRU cache of backend answers with a per-entry TTL."""
+    def __init__(self, max_size=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # fingerprint -> (expires_at, answer)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, answer):
+        self.entries[key] = (time.monotonic() + self.ttl, answer)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+def fingerprint(anomaly, evidence):
+    """
+    Cache key: component, metric, severity band and the log evidence with
+    numbers/ids stripped, so repeats of the same failure share one answer.
+    """
+    normalized = sorted({re.sub(r"0x[0-9a-f]+|\d+(\.\d+)?", "#", line.lower()).strip() for line in evidence})
+    raw = "|".join([anomaly.target, anomaly.component.value, anomaly.metric, anomaly.severity.value, *normalized])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class LLMDiagnoserAgent:
+    """
+    LLM-based diagnosis with a fingerprint cache in front of the backend.
+    Concurrent identical requests share one backend call, and in batch mode
+    every request arriving within LLM_BATCH_WINDOW (e.g. all anomalies from
+    one tick) goes to the backend as a single call.
+    """
+    def __init__(self, backend=None, cache=None, batch_mode=LLM_BATCH_MODE, log_store=LOGS):
+        self.backend = backend or SimulatedLLMBackend()
+        self.log_store = log_store
+        self.cache = cache or DiagnosisCache()
+        self.batch_mode = batch_mode
+
+        self.inflight = {}  # fingerprint -> Future shared by identical requests
+        self.batch = []     # pending (anomaly, evidence, future) in batch mode
+        self.flush_handle = None
+        self.flush_tasks = set()
+
+        self.stats = {"hits": 0, "misses": 0, "shared": 0, "backend_calls": 0}
+
+    async def diagnose(self, anomaly, logs):
+        # Indexed warnings/errors around the anomaly, else this tick's last lines
+        evidence = self.log_store.evidence(anomaly, limit=3) or [log.message for log in logs[-3:]]
+        key = fingerprint(anomaly, evidence)
+
+        answer = self.cache.get(key)
+        if answer is not None:
+            self.stats["hits"] += 1
+        elif key in self.inflight:
+            self.stats["shared"] += 1
+            answer = await asyncio.shield(self.inflight[key])
+        else:
+            self.stats["misses"] += 1
+            answer = await self._ask(key, anomaly, evidence)
             
         return Diagnosis(
             anomaly_id=anomaly.id,
-            root_cause=root_cause,
-            confidence=0.92 + random.uniform(-0.05, 0.05),
+            root_cause=answer["root_cause"],
+            confidence=answer["confidence"],
             evidence=evidence,
-            recommendations=[recommendation, "Monitor for recurrence."]
+            recommendations=list(answer["recommendations"])
         )
+
+    async def _ask(self, key, anomaly, evidence):
+        future = asyncio.get_running_loop().create_future()
+        # Mark failures as retrieved even when no other caller shared the future
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.inflight[key] = future
+        try:
+            if self.batch_mode:
+                self.batch.append((anomaly, evidence, future))
+                self._schedule_flush()
+                answer = await asyncio.shield(future)
+            else:
+                self.stats["backend_calls"] += 1
+                answer = (await self.backend.complete([(anomaly, evidence)]))[0]
+                future.set_result(answer)
+            self.cache.put(key, answer)
+            return answer
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            raise
+        finally:
+            self.inflight.pop(key, None)
+
+    def _schedule_flush(self):
+        if len(self.batch) >= LLM_BATCH_MAX:
+            if self.flush_handle:
+                self.flush_handle.cancel()
+                self.flush_handle = None
+            self._start_flush()
+        elif self.flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self.flush_handle = loop.call_later(LLM_BATCH_WINDOW, self._start_flush)
+
+    def _start_flush(self):
+        task = asyncio.create_task(self._flush())
+        self.flush_tasks.add(task)
+        task.add_done_callback(self.flush_tasks.discard)
+
+    async def close(self):
+        """Cancel batches still waiting on the backend (used on shutdown)."""
+        if self.flush_handle:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        for task in self.flush_tasks:
+            task.cancel()
+        await asyncio.gather(*self.flush_tasks, return_exceptions=True)
+
+    async def _flush(self):
+        self.flush_handle = None
+        batch, self.batch = self.batch, []
+        if not batch:
+            return
+        self.stats["backend_calls"] += 1
+        try:
+            answers = await self.backend.complete([(a, ev) for a, ev, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), answer in zip(batch, answers):
+            if not future.done():
+                future.set_result(answer)
@@ -1,44 +1,119 @@
-import random
+import asyncio
+import time
 from datetime import datetime
-from core.models import Metric, Log, Component
+from core.models import Log
+from core.batch import MetricBatch
+from core.logstore import LOGS
+from core.scheduler import SamplingScheduler
+from core.sketch import SKETCHES
+from config.settings import SIMULATION, LATENCY_PROBES, LOG_FILES
+from collectors.simulated import SimulatedCollector
+from collectors.host import ProcHostCollector
+from collectors.latency import LatencyProbeCollector
+from collectors.logs import LogTailCollector
+
+
+def default_collectors():
+    """Collector set picked by SIMULATION in config/settings.py."""
+    if SIMULATION:
+        return [SimulatedCollector()]
+
+    collectors = [ProcHostCollector()]
+    collectors += [LatencyProbeCollector(component, url) for component, url in LATENCY_PROBES]
+    collectors += [LogTailCollector(path) for path in LOG_FILES]
+    return collectors
+
 
 class MonitorAgent:
-    def __init__(self):
-        # Simulation baselines
-        self.cpu_baseline = 0.4
-        self.memory_baseline = 0.5
-        self.db_latency_baseline = 100
-        self.api_latency_baseline = 150
+    def __init__(self, collectors=None, log_store=LOGS, scheduler=None, sketches=SKETCHES):
+        self.collectors = collectors if collectors is not None else default_collectors()
+        # Every collected log line is indexed here for the diagnosers
+        self.log_store = log_store
+        # Drives collect_due(); created on first use
+        self.scheduler = scheduler
+        # Windowed quantile sketches for series judged on percentiles
+        self.sketches = sketches
+
+        # Cost of the most recent tick: total and per-collector seconds
+        self.stats = {"duration": 0.0, "collectors": {}, "timeouts": 0, "errors": 0}
+
+    async def _run(self, collector):
+        """Returns (batch, logs, outcome, seconds) for one collector."""
+        start = time.perf_counter()
+        try:
+            batch, logs = await asyncio.wait_for(collector.collect_batch(), collector.timeout)
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            batch, outcome = None, "timeout"
+            logs = [Log("WARN", f"Collector {collector.name} timed out after {collector.timeout}s", datetime.now())]
+        except Exception as e:
+            batch, outcome = None, "error"
+            logs = [Log("ERROR", f"Collector {collector.name} failed: {e}", datetime.now())]
+        return batch, logs, outcome, time.perf_counter() - start
 
     async def collect(self):
-        now = datetime.now()
-        
-        # Simulate some fluctuation
-        cpu = max(0.0, min(1.0, self.cpu_baseline + random.uniform(-0.1, 0.4)))
-        # Occasional spike
-        if random.random() < 0.1:
-            cpu = random.uniform(0.8, 1.0)
-            
-        memory = max(0.0, min(1.0, self.memory_baseline + random.uniform(-0.05, 0.1)))
-        
-        db_latency = max(10, self.db_latency_baseline + random.uniform(-20, 100))
-        # Occasional latency spike
-        if random.random() < 0.05:
-            db_latency = random.uniform(300, 600)
-            
-        api_latency = max(10, self.api_latency_baseline + random.uniform(-30, 150))
-
-        metrics = [
-            Metric(Component.CPU, "usage", cpu, now),
-            Metric(Component.MEMORY, "usage", memory, now),
-            Metric(Component.DATABASE, "latency", db_latency, now),
-            Metric(Component.API, "latency", api_latency, now),
-        ]
-
-        logs = []
-        if cpu > 0.85:
-            logs.append(Log("ERROR", "High CPU usage detected", now))
-        if db_latency > 300:
-            logs.append(Log("WARN", "Database query slow", now))
-
-        return metrics, logs
+        batch, logs = await self.collect_batch()
+        return batch.to_metrics(), logs
+
+    async def collect_batch(self):
+        """Like collect(), but returns one columnar MetricBatch for the whole tick."""
+        return await self._collect(self.collectors)
+
+    async def collect_due(self, now):
+        """
+        Adaptive sampling: run only the collectors whose series are due at
+        `now` (loop time) and keep only the due samples. Returns (batch, logs);
+        `next_due()` says when to call again.
+        """
+        if self.scheduler is None:
+            self.scheduler = SamplingScheduler()
+            for collector in self.collectors:
+                self.scheduler.add(collector, now)
+        return await self._collect(self.scheduler.pop_due(now), now)
+
+    def next_due(self):
+        return self.scheduler.next_due() if self.scheduler else None
+
+    async def _collect(self, collectors, now=None):
+        start = time.perf_counter()
+        # All collectors run concurrently; a slow one only costs its own timeout
+        results = await asyncio.gather(*(self._run(c) for c in collectors))
+
+        batches, logs = [], []
+        timings, timeouts, errors = {}, 0, 0
+        for collector, (batch, got_logs, outcome, elapsed) in zip(collectors, results):
+            timings[collector.name] = elapsed
+            timeouts += outcome == "timeout"
+            errors += outcome == "error"
+            if now is not None:
+                batch = self.scheduler.observe(collector, batch, now)
+            if batch is not None:
+                batches.append(batch)
+            logs.extend(got_logs)
+
+        self.stats = {
+            "duration": time.perf_counter() - start,
+            "collectors": timings,
+            "timeouts": timeouts,
+            "errors": errors,
+        }
+        self.log_store.extend(logs)
+        batch = MetricBatch.concat(batches)
+        self.sketches.update(batch)
+        return batch, logs
+
+    async def collect_metric(self, component, name, target="local"):
+        """
+        Sample a single series, e.g. to re-check one component of `target`
+        after a fix. None if no collector here covers that target.
+        """
+        for collector in self.collectors:
+            try:
+                m = await asyncio.wait_for(collector.collect_metric(component, name, target), collector.timeout)
+            except Exception:
+                continue
+            if m is not None:
+                # Not folded into the detection sketches: re-checks poll far
+                # faster than normal sampling and would skew their windows
+                return m
+        return None
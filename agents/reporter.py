@@ -1,36 +1,109 @@
-from datetime import datetime
+import html
+
+
+def _md_cell(value):
+    return value.replace("|", "\\|").replace("\n", " ")
+
 
 class ReporterAgent:
+    """
+    Renders incident reports on demand. Incidents are stored as structured
+    records (core/incidents.py), so a report is only formatted when someone
+    looks at it, in whichever format they look at it in.
+    """
+    FORMATS = ("text", "markdown", "html")
+
+    def sections(self, report):
+        """(title, [(label, value), ...]) pairs shared by every format."""
+        ttr = report.verification.get('time_to_recovery')
+        recovery = f"{ttr:.2f}s" if ttr is not None else "N/A"
+        stages = ", ".join(f"{k} {v:.2f}s" for k, v in report.timings.items()) or "N/A"
+        related = ", ".join(
+            f"{a.component.value}.{a.metric}={a.value:.2f}" for a in report.related
+        ) or "none"
+        fix_status = report.fix.status.value + (f" ({report.fix.detail})" if report.fix.detail else "")
+
+        return [
+            (None, [
+                ("Incident ID", report.id),
+                ("Timestamp", report.timestamp.strftime("%Y-%m-%d %H:%M:%S")),
+                ("Status", report.status.value.upper()),
+                ("Duration", f"{report.duration:.2f}s"),
+                ("Stages", stages),
+            ]),
+            ("ANOMALY", [
+                ("Target", report.anomaly.target),
+                ("Component", report.anomaly.component.value),
+                ("Metric", report.anomaly.metric),
+                ("Value", f"{report.anomaly.value:.2f}"),
+                ("Severity", report.anomaly.severity.value),
+                ("Correlated", related),
+            ]),
+            ("DIAGNOSIS (AI Powered)", [
+                ("Root Cause", report.diagnosis.root_cause),
+                ("Confidence", f"{report.diagnosis.confidence:.2f}"),
+                ("Evidence", str(report.diagnosis.evidence)),
+            ]),
+            ("AUTOMATED ACTION", [
+                ("Fix Action", report.fix.action),
+                ("Parameters", str(report.fix.parameters)),
+                ("Fix Status", fix_status),
+            ]),
+            ("VERIFICATION", [
+                ("Result", "Success" if report.verification['healthy'] else "Failed"),
+                ("Recovery", recovery),
+                ("Details", str(report.verification.get('details', 'N/A'))),
+            ]),
+        ]
+
+    def render(self, report, fmt="text"):
+        """Format a report; `report` may also be the stored text of a legacy incident."""
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown report format {fmt!r}, expected one of {self.FORMATS}")
+        if isinstance(report, str):
+            return {"text": report, "markdown": f"```\n{report}\n```",
+                    "html": f"<pre>{html.escape(report)}</pre>"}[fmt]
+        return getattr(self, f"_render_{fmt}")(report, self.sections(report))
+
     def generate(self, report):
+        return self.render(report, "text")
+
+    def summary(self, report):
+        """One line for the console."""
+        icon = "✅" if report.verification['healthy'] else "❌"
+        return (f"{icon} Incident {report.id} {report.status.value.upper()}: "
+                f"{report.anomaly.target}/{report.anomaly.component.value}.{report.anomaly.metric} "
+                f"-> {report.fix.action} ({report.fix.status.value}), {report.duration:.2f}s")
+
+    def _render_text(self, report, sections):
+        rule = "=" * 52
         status_icon = "✅" if report.verification['healthy'] else "❌"
-        
-        return f"""
-====================================================
-HEALTHGUARD AI – INCIDENT REPORT
-====================================================
-Incident ID : {report.id}
-Timestamp   : {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-Status      : {report.status.value.upper()} {status_icon}
-Duration    : {report.duration:.2f}s
-
---- ANOMALY ---
-Component   : {report.anomaly.component.value}
-Metric      : {report.anomaly.metric}
-Value       : {report.anomaly.value:.2f}
-Severity    : {report.anomaly.severity.value}
-
---- DIAGNOSIS (AI Powered) ---
-Root Cause  : {report.diagnosis.root_cause}
-Confidence  : {report.diagnosis.confidence:.2f}
-Evidence    : {report.diagnosis.evidence}
-
---- AUTOMATED ACTION ---
-Fix Action  : {report.fix.action}
-Parameters  : {report.fix.parameters}
-
---- VERIFICATION ---
-Result      : {"Success" if report.verification['healthy'] else "Failed"}
-Details     : {report.verification.get('details', 'N/A')}
-
-====================================================
-"""
+        lines = ["", rule, "HEALTHGUARD AI – INCIDENT REPORT", rule]
+        for title, rows in sections:
+            if title:
+                lines += ["", f"--- {title} ---"]
+            for label, value in rows:
+                if label == "Status":
+                    value = f"{value} {status_icon}"
+                lines.append(f"{label:<12}: {value}")
+        lines += ["", rule, ""]
+        return "\n".join(lines)
+
+    def _render_markdown(self, report, sections):
+        out = [f"## Incident {report.id}"]
+        for title, rows in sections:
+            if title:
+                out.append(f"\n### {title.title()}")
+            out.append("\n| | |\n|---|---|")
+            out += [f"| **{label}** | {_md_cell(value)} |" for label, value in rows]
+        return "\n".join(out) + "\n"
+
+    def _render_html(self, report, sections):
+        out = [f"<h2>Incident {html.escape(report.id)}</h2>"]
+        for title, rows in sections:
+            if title:
+                out.append(f"<h3>{html.escape(title.title())}</h3>")
+            out.append("<table>")
+            out += [f"<tr><th>{html.escape(label)}</th><td>{html.escape(value)}</td></tr>" for label, value in rows]
+            out.append("</table>")
+        return "\n".join(out)
@@ -0,0 +1,172 @@
+import uuid
+import numpy as np
+from config.settings import (
+    EWMA_ALPHA, Z_THRESHOLD, DETECTOR_WARMUP, SEASONAL_SLOTS, SEASONAL_SLOT_SECONDS,
+)
+from core.models import Anomaly, Severity
+from core.batch import MetricBatch, SERIES
+
+
+class SeriesState:
+    """
+    Array-backed online statistics, one row per series.
+    Every update is a handful of NumPy operations over all series at once,
+    and memory per series is constant (plus SEASONAL_SLOTS floats if enabled).
+    """
+    def __init__(self, capacity=64, alpha=EWMA_ALPHA, seasonal_slots=SEASONAL_SLOTS):
+        self.alpha = alpha
+        self.seasonal_slots = seasonal_slots
+        self.size = 0
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        self.mean = np.zeros(capacity)
+        self.var = np.zeros(capacity)
+        self.count = np.zeros(capacity, dtype=np.int64)
+        if self.seasonal_slots:
+            self.seasonal = np.zeros((capacity, self.seasonal_slots))
+            self.seasonal_seen = np.zeros((capacity, self.seasonal_slots), dtype=bool)
+
+    def grow(self, n):
+        """Make room for at least n series."""
+        capacity = len(self.mean)
+        if n <= capacity:
+            return
+        while capacity < n:
+            capacity *= 2
+        old = (self.mean, self.var, self.count)
+        old_seasonal = (self.seasonal, self.seasonal_seen) if self.seasonal_slots else None
+        self._alloc(capacity)
+        self.mean[:len(old[0])] = old[0]
+        self.var[:len(old[1])] = old[1]
+        self.count[:len(old[2])] = old[2]
+        if old_seasonal:
+            self.seasonal[:len(old_seasonal[0])] = old_seasonal[0]
+            self.seasonal_seen[:len(old_seasonal[1])] = old_seasonal[1]
+
+    def baseline(self, idx, values, timestamps=None):
+        """
+        Seasonal level each sample is measured against (the sample itself for
+        a slot not seen yet), or 0 without seasonality: mean/var model
+        `values - baseline`.
+        """
+        if not (self.seasonal_slots and timestamps is not None):
+            return np.zeros(len(values))
+        slot = (timestamps // SEASONAL_SLOT_SECONDS) % self.seasonal_slots
+        return np.where(self.seasonal_seen[idx, slot], self.seasonal[idx, slot], values)
+
+    def update(self, idx, values, timestamps=None):
+        """
+        Score `values` for series `idx` against the state *before* this sample,
+        then fold the sample in. Returns the z-score per sample.
+        `idx` must not contain duplicates within one call.
+        """
+        x = values
+        if self.seasonal_slots and timestamps is not None:
+            slot = (timestamps // SEASONAL_SLOT_SECONDS) % self.seasonal_slots
+            seen = self.seasonal_seen[idx, slot]
+            base = self.baseline(idx, values, timestamps)
+            # Seasonal baseline tracks the level per slot; the EWMA then models
+            # the residual around it.
+            self.seasonal[idx, slot] = np.where(
+                seen, base + self.alpha * (values - base), values
+            )
+            self.seasonal_seen[idx, slot] = True
+            x = values - base
+
+        mean = self.mean[idx]
+        var = self.var[idx]
+        count = self.count[idx]
+
+        std = np.sqrt(var)
+        z = np.where(std > 1e-9, (x - mean) / np.maximum(std, 1e-9), 0.0)
+
+        # First sample seeds the mean; afterwards standard EWMA mean/variance
+        first = count == 0
+        diff = x - mean
+        incr = self.alpha * diff
+        self.mean[idx] = np.where(first, x, mean + incr)
+        self.var[idx] = np.where(first, 0.0, (1 - self.alpha) * (var + diff * incr))
+        self.count[idx] = count + 1
+
+        return z, count
+
+
+class StreamingDetectorAgent:
+    """
+    Statistical detector: flags samples whose EWMA z-score exceeds Z_THRESHOLD
+    and derives confidence from how far past it they are.
+    """
+    def __init__(self, z_threshold=Z_THRESHOLD, warmup=DETECTOR_WARMUP, registry=SERIES, **state_kwargs):
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.state = SeriesState(**state_kwargs)
+        # State rows are the registry's interned series ids
+        self.registry = registry
+
+    def series_id(self, component, name, target="local"):
+        sid = self.registry.intern(component, name, target)
+        self.state.grow(sid + 1)
+        self.state.size = max(self.state.size, sid + 1)
+        return sid
+
+    def score(self, ids, values, timestamps=None):
+        """
+        Vectorized core: update state for one sample per series and return
+        (flagged mask, z-scores, confidence, dynamic thresholds).
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if timestamps is not None:
+            timestamps = np.asarray(timestamps, dtype=np.int64)
+
+        mean = self.state.mean[ids].copy()
+        std = np.sqrt(self.state.var[ids])
+        base = self.state.baseline(ids, values, timestamps)
+        z, seen = self.state.update(ids, values, timestamps)
+
+        flagged = (seen >= self.warmup) & (z > self.z_threshold)
+        confidence = 1.0 - np.exp(-np.abs(z) / self.z_threshold)
+        # mean/std describe the residual around the seasonal level: add it
+        # back so the limit is in the same units as the reported value
+        limit = base + mean + self.z_threshold * std
+        return flagged, z, confidence, limit
+
+    async def detect(self, metrics):
+        return await self.detect_batch(MetricBatch.from_metrics(metrics, self.registry))
+
+    async def detect_batch(self, batch):
+        if not len(batch):
+            return []
+
+        # Series interned since the last tick need state rows
+        self.state.grow(len(self.registry))
+        self.state.size = len(self.registry)
+
+        flagged, z, confidence, limit = self.score(batch.ids, batch.values, batch.timestamps)
+
+        anomalies = []
+        for i in np.flatnonzero(flagged):
+            m = batch.metric(i)
+            anomalies.append(
+                Anomaly(
+                    id=uuid.uuid4().hex[:8],
+                    component=m.component,
+                    metric=m.name,
+                    value=m.value,
+                    threshold=float(limit[i]),
+                    severity=severity_for(z[i], self.z_threshold),
+                    confidence=float(confidence[i]),
+                    timestamp=m.timestamp,
+                    target=m.target
+                )
+            )
+        return anomalies
+
+
+def severity_for(z, z_threshold):
+    if z > z_threshold * 2:
+        return Severity.CRITICAL
+    if z > z_threshold * 1.5:
+        return Severity.HIGH
+    return Severity.MEDIUM
@@ -1,20 +1,101 @@
-from config.settings import RECOVERY_LIMITS
+import asyncio
+import numpy as np
+from config.settings import (
+    VERIFY_INITIAL_DELAY, VERIFY_MAX_DELAY, VERIFY_DEADLINE,
+    VERIFY_CONSECUTIVE,
+)
+from core.batch import MetricBatch, SERIES
+from core.rules import RULES
+from core.sketch import SKETCHES, DDSketch
 
 class VerifierAgent:
+    def __init__(self, rules=RULES, registry=SERIES, sketches=SKETCHES):
+        self.rules = rules
+        self.registry = registry
+        self.sketches = sketches
+
     async def verify(self, metrics):
-        # Default to healthy
-        healthy = True
+        return await self.verify_batch(MetricBatch.from_metrics(metrics, self.registry))
+
+    async def verify_batch(self, batch):
         details = {}
-        
-        for m in metrics:
-            key = f"{m.component.value}.{m.name}"
-            limit = RECOVERY_LIMITS.get(key)
-            
-            if limit and m.value > limit:
-                healthy = False
-                details[key] = f"Value {m.value:.2f} exceeds recovery limit {limit}"
-        
+        if len(batch):
+            limit = self.rules.current.lookup("recovery", batch.ids)
+            values = self.rules.current.observed(batch, self.sketches)
+            for i in np.flatnonzero(values > limit):
+                key = self.registry.keys[batch.ids[i]]
+                details[key] = f"Value {values[i]:.2f} exceeds recovery limit {limit[i]:g}"
+
         return {
-            "healthy": healthy,
+            "healthy": not details,
             "details": details
         }
+
+    async def verify_recovery(self, probe, component, name, target="local",
+                              deadline=VERIFY_DEADLINE, required=VERIFY_CONSECUTIVE):
+        """
+        Poll one series via `probe(component, name, target)` until `required`
+        consecutive samples are under its recovery limit, or `deadline`
+        seconds pass. Samples from any other target do not count.
+        Polls back off exponentially while the metric is still unhealthy and
+        tighten again once it starts to recover. For a series with a quantile
+        rule, each check is that quantile over the samples polled so far, and
+        recovery needs `required` samples rather than a streak, so a single
+        outlier sample does not decide the outcome on its own.
+        """
+        key = f"{component.value}.{name}"
+        rule = self.rules.current.resolve(key, target)
+        limit = rule.get("recovery")
+        quantile = rule.get("quantile") or 0.0
+        polled = DDSketch() if quantile > 0 else None
+        clock = asyncio.get_running_loop().time
+        start = clock()
+        delay = VERIFY_INITIAL_DELAY
+        streak = 0
+        recovered_at = None
+        samples = 0
+        last = None
+
+        while True:
+            m = await probe(component, name, target)
+            if m is not None and m.target != target:
+                m = None
+            samples += 1
+            now = clock()
+
+            if m is not None:
+                last = m.value
+                if polled is not None:
+                    polled.add([m.value])
+                    last = polled.quantile(quantile)
+            ok = m is not None and (not limit or last <= limit)
+
+            if ok:
+                if streak == 0:
+                    recovered_at = now
+                streak += 1
+                if streak >= required or (polled is not None and polled.count >= required):
+                    return {
+                        "healthy": True,
+                        "details": {},
+                        "time_to_recovery": recovered_at - start,
+                        "samples": samples,
+                    }
+                delay = VERIFY_INITIAL_DELAY
+            else:
+                streak = 0
+                delay = min(delay * 2, VERIFY_MAX_DELAY)
+
+            remaining = deadline - (now - start)
+            if remaining < 1e-3:  # tolerate clock rounding near the deadline
+                break
+            await asyncio.sleep(min(delay, remaining))
+
+        label = f"p{quantile * 100:g}" if polled is not None else "Value"
+        detail = "no sample" if last is None else f"{label} {last:.2f} exceeds recovery limit {limit:g}"
+        return {
+            "healthy": False,
+            "details": {key: f"{detail} after {deadline}s"},
+            "time_to_recovery": None,
+            "samples": samples,
+        }
@@ -0,0 +1,85 @@
+"""
+Metric ingestion benchmark for DatabaseManager.
+
+Compares the legacy one-INSERT-one-commit path (log_metric) against the
+batched executemany path (log_metrics) and the write-behind writer.
+
+    python benchmarks/bench_db_ingest.py --rows 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import DatabaseManager
+
+SERIES = [("cpu", "usage"), ("memory", "usage"), ("database", "latency"), ("api", "latency")]
+
+
+def make_rows(n):
+    rows = []
+    for i in range(n):
+        component, name = SERIES[i % len(SERIES)]
+        rows.append((component, name, float(i)))
+    return rows
+
+
+def bench_single(path, rows, legacy=False):
+    db = DatabaseManager(path)
+    if legacy:
+        # Pre-WAL defaults: rollback journal with a full fsync per commit
+        db.conn.execute("PRAGMA journal_mode=DELETE")
+        db.conn.execute("PRAGMA synchronous=FULL")
+    start = time.perf_counter()
+    for component, name, value in rows:
+        db.log_metric(component, name, value)
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def bench_batched(path, rows, batch_size):
+    db = DatabaseManager(path)
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch_size):
+        db.log_metrics(rows[i:i + batch_size])
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def bench_buffered(path, rows):
+    db = DatabaseManager(path, buffered=True)
+    start = time.perf_counter()
+    for component, name, value in rows:
+        db.log_metric(component, name, value)
+    db.close()  # includes the final flush
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=4)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    cases = [
+        ("before: per-row commit, no WAL", lambda p: bench_single(p, rows, legacy=True)),
+        ("log_metric (per-row commit)", lambda p: bench_single(p, rows)),
+        (f"log_metrics (batch={args.batch_size})", lambda p: bench_batched(p, rows, args.batch_size)),
+        ("buffered writer", lambda p: bench_buffered(p, rows)),
+    ]
+
+    print(f"Ingesting {len(rows)} rows")
+    for label, fn in cases:
+        with tempfile.TemporaryDirectory() as tmp:
+            elapsed = fn(os.path.join(tmp, "bench.db"))
+        print(f"  {label:<32} {len(rows) / elapsed:>12,.0f} rows/sec  ({elapsed:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
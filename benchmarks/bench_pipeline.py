@@ -0,0 +1,258 @@
+"""
+End-to-end benchmark suite for the HealthGuard agent pipeline.
+
+Times each stage on its own (monitor, detect, diagnose, fix, verify, report,
+DB writes and reads), then runs the whole HealthGuardOrchestrator loop over a
+synthetic fleet on a virtual clock, so simulated sleeps cost nothing.
+Prints one JSON document (throughput, p50/p99 latency, peak RSS) that can be
+saved per commit and compared.
+
+    python benchmarks/bench_pipeline.py --series 4000 --anomaly-rate 0.01 --ticks 20
+    python benchmarks/bench_pipeline.py --output bench.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents.monitor import MonitorAgent
+from agents.detector import DetectorAgent
+from agents.streaming_detector import StreamingDetectorAgent
+from agents.llm_diagnoser import LLMDiagnoserAgent, SimulatedLLMBackend
+from agents.fixer import FixerAgent
+from agents.verifier import VerifierAgent
+from agents.reporter import ReporterAgent
+from collectors.synthetic import SyntheticFleetCollector, FLEET_SERIES
+from core.database import DatabaseManager
+from core.storage import SQLiteStorage
+from core.shared_ring import SharedSeriesRing
+from core.models import Log, IncidentReport, IncidentStatus
+from core.virtual_time import run_virtual
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def summarize(name, samples, items_per_call=1):
+    """samples: seconds per call."""
+    total = sum(samples)
+    return {
+        "name": name,
+        "iterations": len(samples),
+        "throughput_per_s": (len(samples) * items_per_call / total) if total else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+async def time_calls(fn, iterations):
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        result = fn(i)
+        if asyncio.iscoroutine(result):
+            await result
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def fleet(series, anomaly_rate, seed=0):
+    targets = [f"host-{i:05d}" for i in range(max(1, series // len(FLEET_SERIES)))]
+    return SyntheticFleetCollector(targets, spike_rate=anomaly_rate, seed=seed)
+
+
+async def bench_stages(args, db_path):
+    results = []
+    collector = fleet(args.series, args.anomaly_rate)
+    monitor = MonitorAgent([collector])
+
+    samples = await time_calls(lambda i: MonitorAgent().collect(), args.iterations)
+    results.append(summarize("monitor.collect (simulated)", samples, 4))
+    samples = await time_calls(lambda i: monitor.collect_batch(), args.iterations)
+    n = len((await monitor.collect_batch())[0])
+    results.append(summarize(f"monitor.collect_batch (fleet, {n} series)", samples, n))
+
+    batches = [(await monitor.collect_batch())[0] for _ in range(args.iterations)]
+    threshold = DetectorAgent()
+    samples = await time_calls(lambda i: threshold.detect_batch(batches[i]), args.iterations)
+    results.append(summarize("detector.detect_batch (threshold)", samples, n))
+    streaming = StreamingDetectorAgent()
+    samples = await time_calls(lambda i: streaming.detect_batch(batches[i]), args.iterations)
+    results.append(summarize("detector.detect_batch (streaming)", samples, n))
+
+    live = SharedSeriesRing(db_path.replace(".db", ".live"), capacity=max(256, n), writer=True)
+    samples = await time_calls(lambda i: live.publish(batches[i]), args.iterations)
+    results.append(summarize("live_feed.publish", samples, n))
+    reader = SharedSeriesRing(live.path)
+    key = next(iter(reader.series()))
+    samples = await time_calls(lambda i: reader.read(key), args.iterations)
+    results.append(summarize("live_feed.read (1 series)", samples))
+    reader.close()
+    live.close()
+
+    anomalies = []
+    for batch in batches:
+        anomalies.extend(await threshold.detect_batch(batch))
+    anomalies = anomalies[:args.iterations] or [None]
+    if anomalies[0] is None:
+        return results  # anomaly rate too low to exercise the rest
+
+    logs = [Log("ERROR", "High CPU usage detected", batches[0].metric(0).timestamp)]
+    diagnoser = LLMDiagnoserAgent(backend=SimulatedLLMBackend(latency=args.llm_latency), batch_mode=False)
+    samples = await time_calls(lambda i: diagnoser.diagnose(anomalies[i % len(anomalies)], logs), args.iterations)
+    results.append(summarize("llm_diagnoser.diagnose", samples))
+    diagnoses = [await diagnoser.diagnose(a, logs) for a in anomalies]
+
+    # No cooldowns, so every call really runs its (fake) action
+    fixer = FixerAgent(cooldowns={})
+    samples = await time_calls(
+        lambda i: fixer.fix(diagnoses[i % len(diagnoses)], anomalies[i % len(anomalies)]), args.iterations
+    )
+    results.append(summarize("fixer.fix (virtual time)", samples))
+    fix = await fixer.fix(diagnoses[0], anomalies[0])
+
+    verifier = VerifierAgent()
+    samples = await time_calls(lambda i: verifier.verify_batch(batches[i]), args.iterations)
+    results.append(summarize("verifier.verify_batch", samples, n))
+
+    report = IncidentReport("INC-bench", anomalies[0], diagnoses[0], fix,
+                            {"healthy": True, "details": {}}, 0.0, IncidentStatus.RESOLVED)
+    reporter = ReporterAgent()
+    samples = await time_calls(lambda i: reporter.summary(report), args.iterations)
+    results.append(summarize("reporter.summary", samples))
+    samples = await time_calls(lambda i: reporter.render(report, "markdown"), args.iterations)
+    results.append(summarize("reporter.render(markdown)", samples))
+
+    db = DatabaseManager(db_path)
+    samples = await time_calls(lambda i: db.log_batch(batches[i]), args.iterations)
+    results.append(summarize("db.log_batch", samples, n))
+
+    def log_incident(i):
+        report.id = f"INC-bench-{i}"
+        db.log_incident(report)
+
+    samples = await time_calls(log_incident, args.iterations)
+    results.append(summarize("db.log_incident", samples))
+    samples = await time_calls(lambda i: db.query_incidents(limit=50), args.iterations)
+    results.append(summarize("db.query_incidents(50)", samples))
+    samples = await time_calls(lambda i: db.get_incident(f"INC-bench-{i}"), args.iterations)
+    results.append(summarize("db.get_incident", samples))
+    samples = await time_calls(lambda i: db.get_latest_metrics(limit=200), args.iterations)
+    results.append(summarize("db.get_latest_metrics(200)", samples))
+    now = int(time.time())
+    samples = await time_calls(lambda i: db.query_metrics("cpu", "usage", now - 3600, now + 1), args.iterations)
+    results.append(summarize("db.query_metrics(1h)", samples))
+    db.close()
+    return results
+
+
+async def bench_orchestrator(args, db_path):
+    from core.orchestrator import HealthGuardOrchestrator
+    from config.settings import MONITOR_INTERVAL
+
+    monitor = MonitorAgent([fleet(args.series, args.anomaly_rate, seed=1)])
+    orchestrator = HealthGuardOrchestrator(
+        monitor=monitor, db=SQLiteStorage(db_path), live_feed=db_path.replace(".db", ".live")
+    )
+    orchestrator.llm_diagnoser.backend.latency = args.llm_latency
+
+    # Count collected samples by wrapping the detector
+    detect_batch = orchestrator.detector.detect_batch
+    counts = {"samples": 0, "ticks": 0, "tick_seconds": []}
+
+    async def counting_detect(batch):
+        start = time.perf_counter()
+        result = await detect_batch(batch)
+        counts["tick_seconds"].append(time.perf_counter() - start)
+        counts["samples"] += len(batch)
+        counts["ticks"] += 1
+        return result
+
+    orchestrator.detector.detect_batch = counting_detect
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            await asyncio.wait_for(orchestrator.run(), timeout=args.ticks * MONITOR_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+    wall = time.perf_counter() - start
+
+    durations = [r.duration for r in orchestrator.incidents]
+    return {
+        "name": "orchestrator.run",
+        "series": args.series,
+        "anomaly_rate": args.anomaly_rate,
+        "ticks": counts["ticks"],
+        "wall_seconds": wall,
+        "samples_per_s": counts["samples"] / wall if wall else 0.0,
+        "incidents": len(orchestrator.incidents),
+        "anomalies_correlated": orchestrator.correlator.stats["correlated"],
+        # Adaptive sampling: samples dropped because their series was not due
+        "samples_skipped": monitor.scheduler.stats["skipped"] if monitor.scheduler else 0,
+        # Load shedding in the incident queue
+        "incidents_merged": orchestrator.queue.stats["merged"],
+        "incidents_dropped": orchestrator.queue.stats["dropped"] + orchestrator.queue.stats["evicted"],
+        "incidents_per_s": len(orchestrator.incidents) / wall if wall else 0.0,
+        "detect_p50_ms": percentile(counts["tick_seconds"], 50) * 1000,
+        "detect_p99_ms": percentile(counts["tick_seconds"], 99) * 1000,
+        # Incident durations are in virtual seconds: simulated latency, not CPU cost
+        "incident_virtual_p50_s": percentile(durations, 50),
+        "incident_virtual_p99_s": percentile(durations, 99),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--series", type=int, default=4000, help="series per tick (fleet size x 4)")
+    parser.add_argument("--anomaly-rate", type=float, default=0.01, help="chance a sample is a spike")
+    parser.add_argument("--ticks", type=int, default=20, help="orchestrator ticks to run")
+    parser.add_argument("--iterations", type=int, default=50, help="calls per stage benchmark")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="fake LLM latency (virtual seconds)")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stages = run_virtual(bench_stages(args, os.path.join(tmp, "stages.db")))
+        pipeline = run_virtual(bench_orchestrator(args, os.path.join(tmp, "pipeline.db")))
+
+    result = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "stages": stages,
+        "pipeline": pipeline,
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    }
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
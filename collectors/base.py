@@ -0,0 +1,29 @@
+from config.settings import COLLECTOR_TIMEOUT
+from core.batch import MetricBatch
+
+
+class Collector:
+    """
+    A source of metrics and logs for MonitorAgent.
+    Subclasses implement `collect()` returning (metrics, logs), or
+    `collect_batch()` returning (MetricBatch, logs) for columnar sources, and
+    may implement `collect_metric(component, name, target)` to sample a single
+    series; it returns None for series (including targets) it does not collect.
+    """
+    name = "collector"
+
+    def __init__(self, timeout=COLLECTOR_TIMEOUT):
+        self.timeout = timeout
+
+    async def collect(self):
+        batch, logs = await self.collect_batch()
+        return batch.to_metrics(), logs
+
+    async def collect_batch(self):
+        if type(self).collect is Collector.collect:
+            raise NotImplementedError
+        metrics, logs = await self.collect()
+        return MetricBatch.from_metrics([m for m in metrics if m is not None]), logs
+
+    async def collect_metric(self, component, name, target="local"):
+        return None
@@ -0,0 +1,52 @@
+from datetime import datetime
+from core.models import Metric, Component
+from collectors.base import Collector
+
+
+class ProcHostCollector(Collector):
+    """Host CPU and memory utilisation (0..1) read from /proc on Linux."""
+    name = "host"
+
+    def __init__(self, proc_root="/proc", **kwargs):
+        super().__init__(**kwargs)
+        self.proc_root = proc_root
+        self.last_cpu = None  # (busy, total) jiffies at the previous read
+
+    def read_cpu(self):
+        with open(f"{self.proc_root}/stat") as f:
+            fields = [int(x) for x in f.readline().split()[1:]]
+        idle = fields[3] + (fields[4] if len(fields) > 4 else 0)  # idle + iowait
+        total = sum(fields[:8])
+        busy = total - idle
+
+        # Utilisation since the previous read (or since boot on the first one)
+        prev_busy, prev_total = self.last_cpu or (0, 0)
+        self.last_cpu = (busy, total)
+        delta = total - prev_total
+        return (busy - prev_busy) / delta if delta > 0 else 0.0
+
+    def read_memory(self):
+        info = {}
+        with open(f"{self.proc_root}/meminfo") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                info[key] = int(rest.split()[0])
+        total = info.get("MemTotal", 0)
+        available = info.get("MemAvailable", info.get("MemFree", 0))
+        return (total - available) / total if total else 0.0
+
+    async def collect(self):
+        now = datetime.now()
+        return [
+            Metric(Component.CPU, "usage", self.read_cpu(), now),
+            Metric(Component.MEMORY, "usage", self.read_memory(), now),
+        ], []
+
+    async def collect_metric(self, component, name, target="local"):
+        if name != "usage" or target != "local":
+            return None
+        if component == Component.CPU:
+            return Metric(component, name, self.read_cpu(), datetime.now())
+        if component == Component.MEMORY:
+            return Metric(component, name, self.read_memory(), datetime.now())
+        return None
@@ -0,0 +1,64 @@
+import asyncio
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+from core.models import Metric, Log, Component
+from collectors.base import Collector
+
+
+class LatencyProbeCollector(Collector):
+    """
+    Times an HTTP GET against a local endpoint and reports it as
+    `<component>.latency` in milliseconds.
+    """
+    name = "latency"
+
+    def __init__(self, component, url, target="local", **kwargs):
+        super().__init__(**kwargs)
+        self.component = Component(component)
+        self.url = url
+        self.target = target
+        self.name = f"latency:{self.component.value}" + (f"@{target}" if target != "local" else "")
+        self.logs = []  # problems seen by the most recent probe
+
+    async def probe(self):
+        parts = urlsplit(self.url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        start = time.perf_counter()
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port, ssl=parts.scheme == "https"
+        )
+        try:
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {parts.hostname}\r\nConnection: close\r\n\r\n".encode()
+            )
+            await writer.drain()
+            status_line = await reader.readline()
+        finally:
+            writer.close()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        status = status_line.split()[1].decode() if len(status_line.split()) > 1 else "?"
+        return elapsed_ms, status
+
+    async def collect(self):
+        metric = await self.collect_metric(self.component, "latency", self.target)
+        return [metric], self.logs
+
+    async def collect_metric(self, component, name, target="local"):
+        if component != self.component or name != "latency" or target != self.target:
+            return None
+        now = datetime.now()
+        self.logs = []
+        try:
+            latency, status = await self.probe()
+        except OSError as e:
+            self.logs = [Log("ERROR", f"{self.url} unreachable: {e}", now)]
+            return None
+        if not status.startswith(("2", "3")):
+            self.logs = [Log("WARN", f"{self.url} returned HTTP {status}", now)]
+        return Metric(self.component, "latency", latency, now, self.target)
@@ -0,0 +1,99 @@
+import asyncio
+import os
+from datetime import datetime
+from core.models import Log
+from collectors.base import Collector
+
+LEVELS = ("CRITICAL", "ERROR", "WARN", "INFO", "DEBUG")
+
+
+class LogTailCollector(Collector):
+    """
+    Returns lines appended to a log file since the previous tick, like
+    `tail -F`: it starts at the end of the file, follows rename-style
+    rotation (finishing the old file before opening the new one) and
+    truncation, and carries a trailing partial line over to the next read.
+    """
+    name = "logs"
+
+    def __init__(self, path, max_bytes=4 << 20, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.name = f"logs:{os.path.basename(path)}"
+        self.max_bytes = max_bytes  # read at most this much per tick; the rest waits
+        self.file = None
+        self.file_id = None  # (st_dev, st_ino) of the open file
+        self.partial = b""
+        self.seen = False    # after the first open, new files are read from the start
+
+    def _open(self):
+        f = open(self.path, "rb")
+        st = os.fstat(f.fileno())
+        if not self.seen:
+            f.seek(0, os.SEEK_END)
+        self.file, self.file_id, self.seen = f, (st.st_dev, st.st_ino), True
+
+    def _split(self, data, final=False):
+        data = self.partial + data
+        end = len(data) if final else data.rfind(b"\n") + 1
+        self.partial = data[end:]
+        return data[:end].decode("utf-8", "replace").splitlines()
+
+    def read_new_lines(self):
+        if self.file is None:
+            try:
+                self._open()
+            except OSError:
+                return []
+
+        lines = self._split(self.file.read(self.max_bytes))
+
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return lines  # rotated away and not recreated yet: keep the old handle
+
+        if (st.st_dev, st.st_ino) != self.file_id:
+            # Rotated: drain what was written to the old file, then switch
+            lines += self._split(self.file.read(), final=True)
+            self.file.close()
+            self.file = None
+            try:
+                self._open()
+            except OSError:
+                return lines
+            lines += self._split(self.file.read(self.max_bytes))
+        elif st.st_size < self.file.tell():
+            # Truncated in place
+            self.file.seek(0)
+            self.partial = b""
+            lines += self._split(self.file.read(self.max_bytes))
+        return lines
+
+    async def collect(self):
+        lines = await asyncio.to_thread(self.read_new_lines)
+        now = datetime.now()
+        return [], [parse_line(line, now) for line in lines if line.strip()]
+
+
+def parse_level(line):
+    upper = line[:120].upper()
+    for level in LEVELS:
+        if level in upper:
+            return "WARN" if level == "WARN" else level
+    return "INFO"
+
+
+def parse_timestamp(line, default):
+    """Leading ISO-8601 timestamp ("2024-05-01 12:00:00..." or "...T12:00:00"), else `default`."""
+    head = line[:26]
+    for size in (26, 23, 19):
+        try:
+            return datetime.fromisoformat(head[:size].replace(",", "."))
+        except ValueError:
+            continue
+    return default
+
+
+def parse_line(line, default_ts):
+    return Log(parse_level(line), line, parse_timestamp(line, default_ts))
@@ -0,0 +1,77 @@
+import random
+import time
+from datetime import datetime
+from core.models import Metric, Log, Component
+from core.batch import MetricBatch, SERIES
+from collectors.base import Collector
+
+
+class SimulatedCollector(Collector):
+    """Random metrics around fixed baselines, with occasional spikes."""
+    name = "simulated"
+
+    def __init__(self, target="local", **kwargs):
+        super().__init__(**kwargs)
+        self.target = target
+
+        # Simulation baselines
+        self.cpu_baseline = 0.4
+        self.memory_baseline = 0.5
+        self.db_latency_baseline = 100
+        self.api_latency_baseline = 150
+
+        # (component, metric name) -> sampler
+        self.samplers = {
+            (Component.CPU, "usage"): self._sample_cpu,
+            (Component.MEMORY, "usage"): self._sample_memory,
+            (Component.DATABASE, "latency"): self._sample_db_latency,
+            (Component.API, "latency"): self._sample_api_latency,
+        }
+        self.ids = [SERIES.intern(component, name, target) for component, name in self.samplers]
+
+    def _sample_cpu(self):
+        # Simulate some fluctuation
+        cpu = max(0.0, min(1.0, self.cpu_baseline + random.uniform(-0.1, 0.4)))
+        # Occasional spike
+        if random.random() < 0.1:
+            cpu = random.uniform(0.8, 1.0)
+        return cpu
+
+    def _sample_memory(self):
+        return max(0.0, min(1.0, self.memory_baseline + random.uniform(-0.05, 0.1)))
+
+    def _sample_db_latency(self):
+        db_latency = max(10, self.db_latency_baseline + random.uniform(-20, 100))
+        # Occasional latency spike
+        if random.random() < 0.05:
+            db_latency = random.uniform(300, 600)
+        return db_latency
+
+    def _sample_api_latency(self):
+        return max(10, self.api_latency_baseline + random.uniform(-30, 150))
+
+    async def collect_batch(self):
+        now = time.time()
+
+        cpu = self._sample_cpu()
+        memory = self._sample_memory()
+        db_latency = self._sample_db_latency()
+        api_latency = self._sample_api_latency()
+
+        batch = MetricBatch(self.ids, [cpu, memory, db_latency, api_latency], [int(now)] * 4)
+
+        logs = []
+        if cpu > 0.85 or db_latency > 300:
+            stamp = datetime.fromtimestamp(now)
+            if cpu > 0.85:
+                logs.append(Log("ERROR", "High CPU usage detected", stamp))
+            if db_latency > 300:
+                logs.append(Log("WARN", "Database query slow", stamp))
+
+        return batch, logs
+
+    async def collect_metric(self, component, name, target="local"):
+        sampler = self.samplers.get((component, name))
+        if sampler is None or target != self.target:
+            return None
+        return Metric(component, name, sampler(), datetime.now(), self.target)
@@ -0,0 +1,52 @@
+import time
+from datetime import datetime
+import numpy as np
+from core.models import Metric, Component
+from core.batch import MetricBatch, SERIES
+from collectors.base import Collector
+
+# (component, name, baseline, spread, spike value)
+FLEET_SERIES = [
+    (Component.CPU, "usage", 0.4, 0.1, 0.95),
+    (Component.MEMORY, "usage", 0.5, 0.05, 0.9),
+    (Component.DATABASE, "latency", 100.0, 30.0, 450.0),
+    (Component.API, "latency", 150.0, 40.0, 500.0),
+]
+
+
+class SyntheticFleetCollector(Collector):
+    """
+    Load generator: simulated metrics for many targets per tick, drawn in one
+    NumPy call per series. `spike_rate` is the chance a sample is a spike.
+    """
+    name = "fleet"
+
+    def __init__(self, targets, spike_rate=0.01, seed=None, **kwargs):
+        super().__init__(**kwargs)
+        self.targets = list(targets)
+        self.spike_rate = spike_rate
+        self.rng = np.random.default_rng(seed)
+
+        # Series ids are interned once; each tick only draws new values
+        keys = [(component, name, target) for component, name, *_ in FLEET_SERIES for target in self.targets]
+        self.ids = np.array([SERIES.intern(*key) for key in keys], dtype=np.int64)
+        self.row_of = {key: i for i, key in enumerate(keys)}  # (component, name, target) -> row
+        n = len(self.targets)
+        self.baselines = np.repeat([s[2] for s in FLEET_SERIES], n)
+        self.spreads = np.repeat([s[3] for s in FLEET_SERIES], n)
+        self.spikes = np.repeat([s[4] for s in FLEET_SERIES], n)
+
+    async def collect_batch(self):
+        values = np.abs(self.rng.normal(self.baselines, self.spreads))
+        spiking = self.rng.random(len(values)) < self.spike_rate
+        values[spiking] = self.spikes[spiking]
+        timestamps = np.full(len(values), int(time.time()), dtype=np.int64)
+        return MetricBatch(self.ids, values, timestamps), []
+
+    async def collect_metric(self, component, name, target="local"):
+        # Re-check after a fix: a fresh draw from that target's series, without spikes
+        row = self.row_of.get((component, name, target))
+        if row is None:
+            return None
+        value = abs(self.rng.normal(self.baselines[row], self.spreads[row]))
+        return Metric(component, name, float(value), datetime.now(), target)
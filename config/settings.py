@@ -14,5 +14,191 @@ RECOVERY_LIMITS = {
     "api.latency": 250
 }
 
+# Severity bands as multiples of the threshold: below `medium` is MEDIUM,
+# above `critical` is CRITICAL, HIGH in between
+SEVERITY_BANDS = {"medium": 1.1, "critical": 1.5}
+
+# Series judged on a quantile over a time window instead of single samples:
+# "p95 over the last 60s > threshold" fires, and recovery needs the same
+# quantile under the recovery limit. A quantile of 0 means raw samples.
+QUANTILE_RULES = {
+    "database.latency": {"quantile": 0.95, "window": 60},
+    "api.latency": {"quantile": 0.95, "window": 60},
+}
+
+# Quantile sketches (DDSketch-style log buckets): SKETCH_ACCURACY relative
+# error for values from SKETCH_MIN_VALUE up to about
+# SKETCH_MIN_VALUE * ((1 + a) / (1 - a)) ** SKETCH_BINS. Windows are built from
+# SKETCH_SLOT_SECONDS slots, up to SKETCH_HORIZON seconds back.
+SKETCH_ACCURACY = 0.02
+SKETCH_BINS = 512
+SKETCH_MIN_VALUE = 0.01
+SKETCH_SLOT_SECONDS = 10
+SKETCH_HORIZON = 120
+# Windowed sketches keep, per series, only SKETCH_WINDOW_BINS consecutive bins
+# (about 166x of value range at 2%) that slide up to follow its largest values
+SKETCH_WINDOW_BINS = 128
+
+# Optional JSON rules file layered over the tables above, with per-target and
+# wildcard rules; watched and hot-reloaded while running:
+# {"rules": [{"series": "*.latency", "target": "db-*", "threshold": 500}]}
+RULES_FILE = "config/rules.json"
+
 SIMULATION = True # Set to False for real production use
+
+# Real collectors (used when SIMULATION is False). Host CPU/memory always
+# come from /proc; these add latency probes and log files to tail.
+LATENCY_PROBES = [
+    # (component, url)
+    ("api", "http://127.0.0.1:8000/health"),
+]
+LOG_FILES = []           # e.g. ["/var/log/app/api.log"]
+COLLECTOR_TIMEOUT = 2.0  # seconds a single collector may take per tick
+
+# Log buffer: every collected line is kept (up to LOG_BUFFER_SIZE, oldest
+# overwritten first) and indexed by level, component and token so the
+# diagnosers can pull evidence from around an anomaly
+LOG_BUFFER_SIZE = 50000
+LOG_MAX_LINE = 1000            # characters stored per line
+LOG_EVIDENCE_WINDOW = 60.0     # seconds before an anomaly searched for evidence
+LOG_COMPONENT_KEYWORDS = {     # a line mentioning one of these is tagged with that component
+    "cpu": ["cpu", "load", "throttled"],
+    "memory": ["memory", "oom", "heap", "swap"],
+    "database": ["database", "db", "sql", "query", "postgres", "mysql"],
+    "api": ["api", "http", "endpoint", "upstream", "gateway"],
+}
 SLACK_WEBHOOK_URL = "https://hooks.slack.com/services/FAKE/WEBHOOK/URL" # Replace with real URL
+SLACK_QUEUE_SIZE = 1000       # alerts beyond this are dropped (and counted)
+SLACK_RATE_LIMIT = 1.0        # messages per second (Slack webhook limit)
+SLACK_MAX_RETRIES = 3
+SLACK_COALESCE_WINDOW = 10.0  # seconds; repeat alerts on the same key are summarised
+
+# Database write-behind buffer: flush when this many samples are pending
+# or after this many seconds, whichever comes first
+DB_BATCH_SIZE = 500
+DB_FLUSH_INTERVAL = 1.0
+
+# Metrics retention: raw samples older than this are pruned once rolled up
+# into the 1m/5m/1h tables. Maintenance runs on the DB writer thread.
+RAW_RETENTION_SECONDS = 7 * 24 * 3600
+DB_MAINTENANCE_INTERVAL = 60
+DB_READ_POOL_SIZE = 4   # read-only connections serving dashboard/history queries
+PRUNE_CHUNK_SIZE = 5000
+QUERY_MAX_POINTS = 500  # history queries pick the coarsest table that keeps this many points
+
+# Columnar archive: raw samples older than ARCHIVE_AFTER_SECONDS (and already
+# rolled up) move out of SQLite into <db name>.archive/, one directory of .npy
+# columns per ARCHIVE_PARTITION_SECONDS. 0 disables it (raw rows are pruned
+# at RAW_RETENTION_SECONDS instead).
+ARCHIVE_AFTER_SECONDS = 24 * 3600
+ARCHIVE_PARTITION_SECONDS = 3600
+
+# Detection mode: "threshold" (static THRESHOLDS) or "streaming" (EWMA z-score)
+DETECTOR_MODE = "threshold"
+EWMA_ALPHA = 0.1         # smoothing factor for the running mean/variance
+Z_THRESHOLD = 3.0        # flag samples this many std-devs above the mean
+DETECTOR_WARMUP = 20     # samples per series before it can be flagged
+SEASONAL_SLOTS = 0       # e.g. 24 for an hour-of-day baseline; 0 disables it
+SEASONAL_SLOT_SECONDS = 3600
+
+# Orchestrator loop
+MONITOR_INTERVAL = 5            # seconds between collection ticks (fixed sampling)
+
+# Adaptive sampling: each series is collected every SAMPLE_MIN_INTERVAL..
+# SAMPLE_MAX_INTERVAL seconds, tightest when it is within SAMPLE_NEAR_RATIO of
+# its threshold or volatile (EWMA std/mean above SAMPLE_VOLATILE_CV), and
+# relaxing by SAMPLE_BACKOFF per calm sample. Series due within SAMPLE_SLACK
+# of each other are collected together.
+SAMPLING_MODE = "adaptive"      # or "fixed": every series every MONITOR_INTERVAL
+SAMPLE_MIN_INTERVAL = 1.0
+SAMPLE_MAX_INTERVAL = 30.0
+SAMPLE_NEAR_RATIO = 0.7
+SAMPLE_VOLATILE_CV = 0.5
+SAMPLE_BACKOFF = 1.5
+SAMPLE_SLACK = 0.5
+MAX_CONCURRENT_INCIDENTS = 8    # incident pipelines allowed to run in parallel
+INCIDENT_HISTORY = 1000         # recent reports kept in memory (all of them are in the db)
+
+# Incident queue between detection and the pipeline workers, most severe first.
+# Above INCIDENT_QUEUE_HIGH waiting incidents it sheds until back to
+# INCIDENT_QUEUE_LOW: incidents below INCIDENT_SHED_BELOW severity are merged
+# into one already queued for their target, or dropped. At INCIDENT_QUEUE_SIZE
+# the least severe entry makes room for a more severe one.
+INCIDENT_QUEUE_SIZE = 500
+INCIDENT_QUEUE_HIGH = 200
+INCIDENT_QUEUE_LOW = 50
+INCIDENT_SHED_BELOW = "high"
+
+# Correlation: anomalies on one target within CORRELATION_WINDOW seconds of
+# an open incident join it when their components are related here (either
+# direction), instead of starting another diagnose/fix/verify run
+CORRELATION_WINDOW = 30.0
+COMPONENT_DEPENDENCIES = {
+    "api": ["database", "cpu", "memory"],   # the API slows down when these do
+    "database": ["cpu", "memory"],
+}
+
+# Verification: "snapshot" re-collects everything once after a fixed wait,
+# "adaptive" polls only the affected metric with exponential backoff
+VERIFY_MODE = "adaptive"
+VERIFY_INITIAL_DELAY = 0.1   # seconds between polls while recovering
+VERIFY_MAX_DELAY = 2.0       # backoff cap while still unhealthy
+VERIFY_DEADLINE = 30.0       # give up and mark the incident FAILED after this
+VERIFY_CONSECUTIVE = 3       # healthy samples in a row needed to declare recovery
+
+# Remediation: the action planned per anomalous component, and how it runs.
+# FIX_HANDLER "fake" only simulates (FIX_FAKE_LATENCY seconds per action);
+# "command" runs FIX_COMMANDS as subprocesses, formatted with the action's
+# parameters plus {target}.
+FIX_ACTIONS = {
+    "cpu": ("restart_service", {"service": "api-worker"}),
+    "database": ("clear_db_cache", {"scope": "global"}),
+    "memory": ("restart_service", {"service": "memory-hog-service"}),
+    "api": ("scale_up", {"replicas": 3}),
+}
+FIX_HANDLER = "fake"
+FIX_FAKE_LATENCY = 1.0
+FIX_COMMANDS = {
+    "restart_service": ["systemctl", "restart", "{service}"],
+    "scale_up": ["kubectl", "scale", "deployment/api", "--replicas={replicas}"],
+}
+FIX_TIMEOUT = 30.0           # seconds before a running action is killed
+MAX_CONCURRENT_FIXES = 4     # actions running at once, across all targets
+FIX_COOLDOWNS = {            # seconds before the same action may run again on a target
+    "restart_service": 300,
+    "clear_db_cache": 60,
+    "scale_up": 600,
+}
+
+# Fleet mode: when TARGETS is non-empty, main.py runs the sharded runtime,
+# spreading targets over SHARD_WORKERS processes (0 = one per CPU core)
+TARGETS = []                  # e.g. ["web-01", "web-02", "db-01"]
+SHARD_WORKERS = 0
+TARGET_PROBE_URL = "http://{target}:8000/health"  # latency probe per target (non-simulated)
+
+# LLM diagnosis
+LLM_LATENCY = 0.0          # simulated model latency in seconds (fake backend)
+LLM_CACHE_SIZE = 256       # cached diagnoses (LRU)
+LLM_CACHE_TTL = 300        # seconds before a cached diagnosis is re-asked
+LLM_BATCH_MODE = True      # send all anomalies from one tick in a single request
+LLM_BATCH_WINDOW = 0.05    # seconds to wait for more requests before sending a batch
+LLM_BATCH_MAX = 32
+
+# Dashboard
+DASHBOARD_READ_ONLY = True     # False = cloud demo mode that writes synthetic samples
+DASHBOARD_WINDOW = 2000        # recent samples kept per series for charts
+DASHBOARD_CHART_POINTS = 400   # charts are downsampled to about this many points
+DASHBOARD_REFRESH = 0.8        # seconds between reruns / DB polls
+DASHBOARD_HISTORY_SECONDS = 30 * 24 * 3600  # archived range charted under "Long-Range History"
+
+# Live feed: the orchestrator publishes the last LIVE_FEED_WINDOW samples of up
+# to LIVE_FEED_SERIES series into this memory-mapped file, and the dashboard
+# reads it instead of polling SQLite ("" disables it). Put it on /dev/shm to
+# keep it off disk entirely.
+LIVE_FEED_FILE = "healthguard.live"
+LIVE_FEED_SERIES = 256
+LIVE_FEED_WINDOW = DASHBOARD_WINDOW
+
+# Prometheus-style metrics endpoint (http://METRICS_HOST:METRICS_PORT/metrics); 0 disables it
+METRICS_PORT = 9108
+METRICS_HOST = "127.0.0.1"
@@ -0,0 +1,219 @@
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from config.settings import ARCHIVE_PARTITION_SECONDS
+
+INDEX_FILE = "index.json"
+
+
+def archive_dir(db_file):
+    """Where the archive of `db_file` lives: healthguard.db -> healthguard.archive/"""
+    return os.path.splitext(db_file)[0] + ".archive"
+
+
+def _write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class Partition:
+    """
+    One closed time partition: a .npy file per column, rows sorted by series
+    then timestamp, so a series is one contiguous slice. Columns are opened
+    memory-mapped on first use; nothing is read until it is sliced.
+    """
+    def __init__(self, path, meta):
+        self.path = path
+        self.start = meta["start"]
+        self.end = meta["end"]
+        self.rows = meta["rows"]
+        self.last_id = meta["last_id"]
+        self.series = [tuple(s) for s in meta["series"]]  # code -> (component, name)
+        self.offsets = meta["offsets"]                     # code -> [first, last + 1]
+        self.code = {s: i for i, s in enumerate(self.series)}
+        self.columns = {}
+
+    def column(self, name):
+        array = self.columns.get(name)
+        if array is None:
+            array = self.columns[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+        return array
+
+    def codes(self):
+        """Series code of every row (rebuilt from the offsets, never stored)."""
+        counts = [hi - lo for lo, hi in self.offsets]
+        return np.repeat(np.arange(len(self.series), dtype=np.int32), counts)
+
+    def read(self, component, name, start=None, end=None):
+        """(timestamps, values) of one series within [start, end) as read-only views."""
+        code = self.code.get((component, name))
+        if code is None:
+            return np.empty(0, np.int64), np.empty(0)
+        lo, hi = self.offsets[code]
+        timestamps = self.column("timestamp")[lo:hi]
+        a = 0 if start is None else int(np.searchsorted(timestamps, start))
+        b = len(timestamps) if end is None else int(np.searchsorted(timestamps, end))
+        return timestamps[a:b], self.column("value")[lo + a:lo + b]
+
+    @staticmethod
+    def write(path, meta, timestamps, values):
+        """Write a partition directory atomically (readers never see half of one)."""
+        tmp = f"{path}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "timestamp.npy"), timestamps)
+        np.save(os.path.join(tmp, "value.npy"), values)
+        _write_json(os.path.join(tmp, "meta.json"), meta)
+        os.replace(tmp, path)
+
+
+class MetricArchive:
+    """
+    Columnar archive of raw metric samples moved out of the hot SQLite file.
+
+    `index.json` lists the partitions (ARCHIVE_PARTITION_SECONDS each) and the
+    watermark: every raw sample before it lives here instead of the `metrics`
+    table. Only the DB writer calls `add`; readers (storage read pool,
+    dashboard, replay) pick up new partitions when the index changes.
+    Partitions are never modified in place: a rewrite gets a new directory
+    and the old one is removed, which open memory maps survive.
+    """
+    def __init__(self, path, partition_seconds=ARCHIVE_PARTITION_SECONDS):
+        self.path = path
+        self.partition_seconds = partition_seconds
+        self.index_path = os.path.join(path, INDEX_FILE)
+        self.index_stamp = None
+        self.watermark = None
+        self.parts = {}    # partition start -> Partition
+        self.lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Reload the index if the writer has replaced it."""
+        try:
+            st = os.stat(self.index_path)
+        except OSError:
+            return
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self.lock:
+            if stamp == self.index_stamp:
+                return
+            with open(self.index_path) as f:
+                index = json.load(f)
+            parts = {}
+            for entry in index["partitions"]:
+                old = self.parts.get(entry["start"])
+                if old is not None and old.path.endswith(entry["dir"]):
+                    parts[entry["start"]] = old
+                else:
+                    with open(os.path.join(self.path, entry["dir"], "meta.json")) as f:
+                        parts[entry["start"]] = Partition(os.path.join(self.path, entry["dir"]), json.load(f))
+            self.parts = parts
+            self.watermark = index["watermark"]
+            self.index_stamp = stamp
+
+    def partitions(self, start=None, end=None):
+        """Partitions overlapping [start, end), oldest first."""
+        self.refresh()
+        return [
+            p for _, p in sorted(self.parts.items())
+            if (start is None or p.end > start) and (end is None or p.start < end)
+        ]
+
+    # --- queries ---
+
+    def query(self, component, name, start=None, end=None):
+        """(timestamps, values) of one series over [start, end), oldest first."""
+        pieces = [p.read(component, name, start, end) for p in self.partitions(start, end)]
+        if not pieces:
+            return np.empty(0, np.int64), np.empty(0)
+        return np.concatenate([t for t, _ in pieces]), np.concatenate([v for _, v in pieces])
+
+    def scan(self, start=None, end=None):
+        """
+        Every archived sample in [start, end) as one partition at a time:
+        yields (series, codes, timestamps, values) where series[code] is
+        (component, name). Rows are grouped by series, not time-ordered.
+        """
+        for p in self.partitions(start, end):
+            timestamps, values, codes = p.column("timestamp"), p.column("value"), p.codes()
+            if (start is not None and p.start < start) or (end is not None and p.end > end):
+                keep = np.ones(len(timestamps), dtype=bool)
+                if start is not None:
+                    keep &= timestamps >= start
+                if end is not None:
+                    keep &= timestamps < end
+                timestamps, values, codes = timestamps[keep], values[keep], codes[keep]
+            yield p.series, codes, timestamps, values
+
+    # --- writer ---
+
+    def last_id(self, start):
+        """Newest `metrics` row id archived into the partition at `start` (0 if none)."""
+        self.refresh()
+        part = self.parts.get(start)
+        return part.last_id if part is not None else 0
+
+    def add(self, start, series, codes, timestamps, values, last_id):
+        """
+        Store raw samples of the partition beginning at `start`, merged with
+        whatever it already holds; series[codes[i]] is (component, name) of
+        sample i. `last_id` is the newest `metrics` row id included.
+        """
+        self.refresh()
+        existing = self.parts.get(start)
+        keys = [tuple(s) for s in series]
+        if existing is not None:
+            # Renumber both sides onto the union of their series
+            keys = existing.series + [k for k in keys if k not in existing.code]
+            code_of = {k: i for i, k in enumerate(keys)}
+            remap = np.array([code_of[tuple(s)] for s in series], dtype=np.int32)
+            codes = np.concatenate((existing.codes(), remap[codes] if len(series) else codes))
+            timestamps = np.concatenate((existing.column("timestamp"), timestamps))
+            values = np.concatenate((existing.column("value"), values))
+            last_id = max(last_id, existing.last_id)
+
+        # Codes follow sorted series order, so rows sort by (series, time)
+        rank = np.empty(len(keys), dtype=np.int32)
+        rank[sorted(range(len(keys)), key=keys.__getitem__)] = np.arange(len(keys), dtype=np.int32)
+        series = sorted(keys)
+        codes = rank[np.asarray(codes, dtype=np.int64)]
+        order = np.lexsort((timestamps, codes))
+        codes, timestamps, values = codes[order], timestamps[order], values[order]
+        bounds = np.searchsorted(codes, np.arange(len(series) + 1))
+
+        meta = {
+            "start": int(start),
+            "end": int(start + self.partition_seconds),
+            "rows": len(codes),
+            "last_id": int(last_id),
+            "series": [list(s) for s in series],
+            "offsets": [[int(bounds[i]), int(bounds[i + 1])] for i in range(len(series))],
+        }
+        name = f"metrics-{start}-{last_id}"
+        os.makedirs(self.path, exist_ok=True)
+        Partition.write(os.path.join(self.path, name), meta, timestamps, values)
+
+        with self.lock:
+            self.parts[start] = Partition(os.path.join(self.path, name), meta)
+            self.watermark = max(self.watermark or 0, start + self.partition_seconds)
+            self._write_index()
+        if existing is not None:
+            shutil.rmtree(existing.path, ignore_errors=True)
+
+    def _write_index(self):
+        _write_json(self.index_path, {
+            "watermark": self.watermark,
+            "partitions": [
+                {"start": s, "end": p.end, "rows": p.rows, "dir": os.path.basename(p.path)}
+                for s, p in sorted(self.parts.items())
+            ],
+        })
+        st = os.stat(self.index_path)
+        self.index_stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
@@ -0,0 +1,111 @@
+import threading
+from datetime import datetime
+import numpy as np
+
+from core.models import Metric
+
+
+class SeriesRegistry:
+    """
+    Interns (target, component, name) series as small integer ids, so hot
+    paths index arrays instead of building "component.name" strings per sample.
+    """
+    __slots__ = ("index", "targets", "components", "names", "keys", "lock")
+
+    def __init__(self):
+        self.index = {}
+        self.targets = []
+        self.components = []  # Component enum per id
+        self.names = []
+        self.keys = []        # "component.name", as matched by rules
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def intern(self, component, name, target="local"):
+        sid = self.index.get((target, component, name))
+        if sid is None:
+            with self.lock:
+                sid = self.index.get((target, component, name))
+                if sid is None:
+                    sid = len(self.keys)
+                    self.targets.append(target)
+                    self.components.append(component)
+                    self.names.append(name)
+                    self.keys.append(f"{component.value}.{name}")
+                    self.index[(target, component, name)] = sid
+        return sid
+
+
+# Process-wide registry shared by collectors, detectors, verifier and DB
+SERIES = SeriesRegistry()
+
+
+class MetricBatch:
+    """
+    Columnar samples for one tick: interned series ids, float64 values and
+    int64 epoch-second timestamps. Nothing allocates per-sample objects
+    unless `to_metrics()` is called.
+    """
+    __slots__ = ("ids", "values", "timestamps", "registry")
+
+    def __init__(self, ids, values, timestamps, registry=SERIES):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.registry = registry
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def empty(cls, registry=SERIES):
+        return cls(np.empty(0, np.int64), np.empty(0), np.empty(0, np.int64), registry)
+
+    @classmethod
+    def from_metrics(cls, metrics, registry=SERIES):
+        n = len(metrics)
+        ids = np.fromiter(
+            (registry.intern(m.component, m.name, m.target) for m in metrics), dtype=np.int64, count=n
+        )
+        values = np.fromiter((m.value for m in metrics), dtype=np.float64, count=n)
+        timestamps = np.fromiter(
+            (int(m.timestamp.timestamp()) for m in metrics), dtype=np.int64, count=n
+        )
+        return cls(ids, values, timestamps, registry)
+
+    @classmethod
+    def concat(cls, batches, registry=SERIES):
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return cls.empty(registry)
+        if len(batches) == 1:
+            return batches[0]
+        return cls(
+            np.concatenate([b.ids for b in batches]),
+            np.concatenate([b.values for b in batches]),
+            np.concatenate([b.timestamps for b in batches]),
+            registry,
+        )
+
+    def select(self, mask):
+        return MetricBatch(self.ids[mask], self.values[mask], self.timestamps[mask], self.registry)
+
+    def metric(self, i):
+        """Materialise row i as a Metric (e.g. for an anomaly report)."""
+        sid = self.ids[i]
+        reg = self.registry
+        return Metric(reg.components[sid], reg.names[sid], float(self.values[i]),
+                      datetime.fromtimestamp(int(self.timestamps[i])), reg.targets[sid])
+
+    def to_metrics(self):
+        return [self.metric(i) for i in range(len(self))]
+
+    def rows(self):
+        """(component, name, value, timestamp) tuples for DatabaseManager.log_metrics."""
+        reg = self.registry
+        return [
+            (reg.components[sid].value, reg.names[sid], value, ts)
+            for sid, value, ts in zip(self.ids.tolist(), self.values.tolist(), self.timestamps.tolist())
+        ]
@@ -0,0 +1,96 @@
+import time
+import uuid
+from config.settings import CORRELATION_WINDOW, COMPONENT_DEPENDENCIES
+from core.models import Severity
+
+SEVERITY_RANK = {Severity.LOW: 0, Severity.MEDIUM: 1, Severity.HIGH: 2, Severity.CRITICAL: 3}
+
+
+def new_incident_id():
+    # Random suffix: incidents opened in the same second (or by another
+    # process) never collide on the incidents primary key
+    return f"INC-{int(time.time())}-{uuid.uuid4().hex[:12]}"
+
+
+class Incident:
+    """Correlated anomalies on one target, handled by a single pipeline run."""
+    __slots__ = ("id", "target", "primary", "anomalies", "components", "opened", "last_seen")
+
+    def __init__(self, anomaly, now):
+        self.id = new_incident_id()
+        self.target = anomaly.target
+        self.primary = anomaly  # what gets diagnosed, fixed and verified
+        self.anomalies = [anomaly]
+        self.components = {anomaly.component.value}
+        self.opened = now
+        self.last_seen = now
+
+    @property
+    def related(self):
+        return [a for a in self.anomalies if a is not self.primary]
+
+    def add(self, anomaly, now):
+        self.anomalies.append(anomaly)
+        self.components.add(anomaly.component.value)
+        self.last_seen = now
+
+
+class AnomalyCorrelator:
+    """
+    Groups anomalies into open incidents. An anomaly joins an open incident
+    on the same target when it arrives within `window` seconds of that
+    incident's latest anomaly and its component is the same as, or related
+    through `dependencies` to, one already in it. Otherwise it opens a new
+    incident. Incidents stay open until `close()` (when their pipeline
+    finishes), so a metric that stays anomalous for several ticks updates
+    one incident rather than opening one per tick.
+    """
+    def __init__(self, window=CORRELATION_WINDOW, dependencies=COMPONENT_DEPENDENCIES):
+        self.window = window
+        self.related = {}
+        for component, depends_on in dependencies.items():
+            for other in depends_on:
+                self.related.setdefault(component, set()).add(other)
+                self.related.setdefault(other, set()).add(component)
+        self.open = {}  # target -> [Incident]
+        self.stats = {"opened": 0, "correlated": 0}
+
+    def _match(self, anomaly, now):
+        component = anomaly.component.value
+        neighbours = self.related.get(component, set())
+        for incident in self.open.get(anomaly.target, ()):
+            if now - incident.last_seen > self.window:
+                continue
+            if component in incident.components or neighbours & incident.components:
+                return incident
+        return None
+
+    def ingest(self, anomalies, now):
+        """Attach or open; returns only the newly opened incidents, which need a pipeline run."""
+        opened = []
+        # Worst first, so the most severe anomaly of a burst leads its incident
+        ranked = sorted(
+            anomalies, reverse=True,
+            key=lambda a: (SEVERITY_RANK[a.severity], a.value / a.threshold if a.threshold else 0.0),
+        )
+        for anomaly in ranked:
+            incident = self._match(anomaly, now)
+            if incident is not None:
+                incident.add(anomaly, now)
+                self.stats["correlated"] += 1
+                continue
+            incident = Incident(anomaly, now)
+            self.open.setdefault(anomaly.target, []).append(incident)
+            self.stats["opened"] += 1
+            opened.append(incident)
+        return opened
+
+    def close(self, incident):
+        incidents = self.open.get(incident.target)
+        if incidents and incident in incidents:
+            incidents.remove(incident)
+            if not incidents:
+                del self.open[incident.target]
+
+    def open_count(self):
+        return sum(len(incidents) for incidents in self.open.values())
@@ -1,32 +1,119 @@
 import sqlite3
 import json
+import threading
+import time
 from datetime import datetime
 import os
 
+import numpy as np
+
+from config.settings import (
+    DB_BATCH_SIZE, DB_FLUSH_INTERVAL, DB_MAINTENANCE_INTERVAL,
+    RAW_RETENTION_SECONDS, PRUNE_CHUNK_SIZE, QUERY_MAX_POINTS, ARCHIVE_AFTER_SECONDS,
+)
+
+from core.instrumentation import Counter, Gauge, Histogram, timed
+from core.archive import MetricArchive, archive_dir
+from core.incidents import pack, unpack
+from core.sketch import DDSketch
+
 DB_FILE = "healthguard.db"
 
+# Instrumentation (label sets bound once at import)
+DB_SECONDS = Histogram("healthguard_db_seconds", "DatabaseManager call latency", ["op"])
+DB_ERRORS = Counter("healthguard_db_errors_total", "DatabaseManager calls that failed", ["op"])
+DB_METRIC_ROWS = Counter("healthguard_db_metric_rows_total", "Metric rows written to SQLite").labels()
+DB_ARCHIVED_ROWS = Counter("healthguard_db_archived_rows_total", "Raw metric rows moved to the columnar archive").labels()
+DB_PENDING_ROWS = Gauge("healthguard_db_pending_rows", "Metric samples waiting in the write-behind buffer").labels()
+
+# Rollup levels: (table suffix, bucket width in seconds), finest first
+ROLLUPS = [("1m", 60), ("5m", 300), ("1h", 3600)]
+
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, db_file=DB_FILE, buffered=False, read_only=False):
+        # Serialises access to the shared connection (writer thread + callers)
+        self.lock = threading.RLock()
+        self.read_only = read_only
+        self.writer = None
+        # Raw samples of closed, old partitions live in .npy columns beside the DB
+        self.archive = MetricArchive(archive_dir(db_file)) if ARCHIVE_AFTER_SECONDS else None
+
+        if read_only:
+            # Readers (e.g. the dashboard) never create or alter the schema
+            self.conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True, check_same_thread=False)
+            return
+
         # Connect to DB (creates it if not exists)
         # check_same_thread=False is needed for Streamlit + Asyncio concurrency
-        self.conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.configure()
         self.create_tables()
 
+        # Optional write-behind buffer for metric samples
+        self.writer = MetricWriter(self) if buffered else None
+
+    def configure(self):
+        # WAL lets readers (dashboard) run alongside the writer, and
+        # synchronous=NORMAL only fsyncs at checkpoints instead of every commit.
+        cursor = self.conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-8000")  # ~8MB page cache
+
     def create_tables(self):
         cursor = self.conn.cursor()
         
-        # Metrics Table
+        # Metrics Table (timestamp = integer epoch seconds)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS metrics (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT,
+                timestamp INTEGER,
                 component TEXT,
                 name TEXT,
                 value REAL
             )
         ''')
+        self.migrate_metrics()
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_metrics_series
+            ON metrics (component, name, timestamp)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_metrics_timestamp
+            ON metrics (timestamp)
+        ''')
+
+        # Rollup Tables (one row per series per bucket, with a quantile sketch
+        # so percentiles over any range merge buckets instead of scanning raw rows)
+        for level, _ in ROLLUPS:
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS metrics_{level} (
+                    component TEXT,
+                    name TEXT,
+                    bucket INTEGER,
+                    min REAL,
+                    max REAL,
+                    avg REAL,
+                    count INTEGER,
+                    p95 REAL,
+                    sketch BLOB,
+                    PRIMARY KEY (component, name, bucket)
+                ) WITHOUT ROWID
+            ''')
+            self.migrate_rollup(level)
+
+        # Rollup progress: every bucket before `watermark` has been rolled up
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rollup_state (
+                level TEXT PRIMARY KEY,
+                watermark INTEGER
+            )
+        ''')
 
-        # Incidents Table
+        # Incidents Table: summary columns for filtering plus the full report as
+        # a compressed JSON `record`, rendered only when someone views it.
+        # (`full_report` holds pre-rendered text for rows written before that.)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS incidents (
                 id TEXT PRIMARY KEY,
@@ -35,54 +122,658 @@ class DatabaseManager:
                 anomaly_component TEXT,
                 root_cause TEXT,
                 fix_action TEXT,
-                full_report TEXT
+                full_report TEXT,
+                ts INTEGER,
+                target TEXT,
+                severity TEXT,
+                record BLOB
             )
         ''')
+        self.migrate_incidents()
+        for name, columns in (("ts", "ts"), ("status", "status, ts"), ("component", "anomaly_component, ts")):
+            cursor.execute(f'''
+                CREATE INDEX IF NOT EXISTS idx_incidents_{name}
+                ON incidents ({columns})
+            ''')
         self.conn.commit()
 
+    def schema_pending(self):
+        """
+        Migrations this database still needs, e.g. ["incidents.ts"]; empty
+        when current. Read-only connections can't migrate, so readers use
+        this to wait for the writer instead of failing on missing columns.
+        """
+        def columns(table):
+            return {row[1]: row[2] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+
+        pending = []
+        if columns("metrics").get("timestamp", "").upper() != "INTEGER":
+            pending.append("metrics.timestamp")
+        for level, _ in ROLLUPS:
+            if "sketch" not in columns(f"metrics_{level}"):
+                pending.append(f"metrics_{level}.sketch")
+        incidents = columns("incidents")
+        pending += [f"incidents.{c}" for c in ("ts", "target", "severity", "record") if c not in incidents]
+        return pending
+
+    def migrate_metrics(self):
+        # Older databases stored ISO-8601 strings in a TEXT column; rebuild the
+        # table with an INTEGER epoch column so range scans can use the index.
+        columns = {row[1]: row[2] for row in self.conn.execute("PRAGMA table_info(metrics)")}
+        if columns.get("timestamp", "").upper() != "TEXT":
+            return
+
+        print("Migrating metrics table to integer timestamps...")
+        with self.lock:
+            self.conn.execute("ALTER TABLE metrics RENAME TO metrics_legacy")
+            self.conn.execute('''
+                CREATE TABLE metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp INTEGER,
+                    component TEXT,
+                    name TEXT,
+                    value REAL
+                )
+            ''')
+            rows = self.conn.execute(
+                "SELECT id, timestamp, component, name, value FROM metrics_legacy"
+            ).fetchall()
+            self.conn.executemany(
+                "INSERT INTO metrics (id, timestamp, component, name, value) VALUES (?, ?, ?, ?, ?)",
+                [(r[0], to_epoch(r[1]), r[2], r[3], r[4]) for r in rows]
+            )
+            self.conn.execute("DROP TABLE metrics_legacy")
+            self.conn.commit()
+
+    def migrate_rollup(self, level):
+        # Buckets rolled up before sketches existed keep a NULL sketch
+        columns = {row[1] for row in self.conn.execute(f"PRAGMA table_info(metrics_{level})")}
+        if "sketch" not in columns:
+            with self.lock:
+                self.conn.execute(f"ALTER TABLE metrics_{level} ADD COLUMN sketch BLOB")
+                self.conn.commit()
+
+    def migrate_incidents(self):
+        # Older databases only had the rendered text; add the structured columns
+        # and backfill the epoch timestamp so old rows stay queryable by time.
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(incidents)")}
+        if "ts" in columns:
+            return
+
+        print("Migrating incidents table to structured records...")
+        with self.lock:
+            for column, kind in (("ts", "INTEGER"), ("target", "TEXT"), ("severity", "TEXT"), ("record", "BLOB")):
+                self.conn.execute(f"ALTER TABLE incidents ADD COLUMN {column} {kind}")
+            rows = self.conn.execute("SELECT id, timestamp FROM incidents").fetchall()
+            self.conn.executemany(
+                "UPDATE incidents SET ts = ? WHERE id = ?", [(to_epoch(ts), id_) for id_, ts in rows]
+            )
+            self.conn.execute("DROP INDEX IF EXISTS idx_incidents_timestamp")
+            self.conn.commit()
+
+    @timed(DB_SECONDS.labels("log_metric"))
     def log_metric(self, component, name, value):
+        if self.writer:
+            self.writer.add(component, name, value)
+            return
+
         try:
-            cursor = self.conn.cursor()
-            timestamp = datetime.now().isoformat()
-            cursor.execute('''
-                INSERT INTO metrics (timestamp, component, name, value)
-                VALUES (?, ?, ?, ?)
-            ''', (timestamp, component, name, value))
-            self.conn.commit()
+            with self.lock:
+                cursor = self.conn.cursor()
+                timestamp = int(time.time())
+                cursor.execute('''
+                    INSERT INTO metrics (timestamp, component, name, value)
+                    VALUES (?, ?, ?, ?)
+                ''', (timestamp, component, name, value))
+                self.conn.commit()
         except Exception as e:
+            DB_ERRORS.labels("log_metric").inc()
             print(f"DB Error (log_metric): {e}")
 
-    def log_incident(self, report, full_report_str):
+    @timed(DB_SECONDS.labels("log_metrics"))
+    def log_metrics(self, batch):
+        """Log many (component, name, value[, timestamp]) rows in one transaction."""
+        if self.writer:
+            self.writer.add_many(batch)
+            return
+
+        now = int(time.time())
+        self._insert_metrics([
+            row if len(row) > 3 else (row[0], row[1], row[2], now)
+            for row in batch
+        ])
+
+    @timed(DB_SECONDS.labels("log_batch"))
+    def log_batch(self, batch):
+        """Log a MetricBatch (one tick of columnar samples)."""
+        rows = batch.rows()
+        if self.writer:
+            self.writer.add_many(rows)
+        else:
+            self._insert_metrics(rows)
+
+    @timed(DB_SECONDS.labels("insert_metrics"))
+    def _insert_metrics(self, rows):
+        if not rows:
+            return
+
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT INTO incidents (id, timestamp, status, anomaly_component, root_cause, fix_action, full_report)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                report.id,
-                datetime.now().isoformat(),
-                report.status.value,
-                report.anomaly.component.value,
-                report.diagnosis.root_cause,
-                report.fix.action,
-                full_report_str
-            ))
-            self.conn.commit()
+            with self.lock:
+                self.conn.executemany('''
+                    INSERT INTO metrics (component, name, value, timestamp)
+                    VALUES (?, ?, ?, ?)
+                ''', rows)
+                self.conn.commit()
+            DB_METRIC_ROWS.inc(len(rows))
+        except Exception as e:
+            DB_ERRORS.labels("insert_metrics").inc()
+            print(f"DB Error (log_metrics): {e}")
+
+    @timed(DB_SECONDS.labels("log_incident"))
+    def log_incident(self, report):
+        try:
+            record = pack(report)
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                    INSERT INTO incidents (id, timestamp, status, anomaly_component, root_cause, fix_action,
+                                           ts, target, severity, record)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    report.id,
+                    report.timestamp.isoformat(),
+                    report.status.value,
+                    report.anomaly.component.value,
+                    report.diagnosis.root_cause,
+                    report.fix.action,
+                    int(report.timestamp.timestamp()),
+                    report.anomaly.target,
+                    report.anomaly.severity.value,
+                    record
+                ))
+                self.conn.commit()
         except Exception as e:
+            DB_ERRORS.labels("log_incident").inc()
             print(f"DB Error (log_incident): {e}")
     
+    @timed(DB_SECONDS.labels("get_latest_metrics"), keywords=True)
     def get_latest_metrics(self, limit=100):
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('SELECT * FROM metrics ORDER BY id DESC LIMIT ?', (limit,))
-            return cursor.fetchall()
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute('SELECT * FROM metrics ORDER BY id DESC LIMIT ?', (limit,))
+                return cursor.fetchall()
         except Exception:
+            DB_ERRORS.labels("read").inc()
             return []
         
+    @timed(DB_SECONDS.labels("get_metrics_since"), keywords=True)
+    def get_metrics_since(self, last_id=None, limit=5000):
+        """
+        Rows (id, timestamp, component, name, value) with id > last_id, oldest
+        first. With last_id=None, returns the most recent `limit` rows.
+        """
+        try:
+            with self.lock:
+                if last_id is None:
+                    cursor = self.conn.execute('''
+                        SELECT id, timestamp, component, name, value FROM (
+                            SELECT * FROM metrics ORDER BY id DESC LIMIT ?
+                        ) ORDER BY id
+                    ''', (limit,))
+                else:
+                    cursor = self.conn.execute('''
+                        SELECT id, timestamp, component, name, value FROM metrics
+                        WHERE id > ? ORDER BY id LIMIT ?
+                    ''', (last_id, limit))
+                return cursor.fetchall()
+        except Exception as e:
+            DB_ERRORS.labels("get_metrics_since").inc()
+            print(f"DB Error (get_metrics_since): {e}")
+            return []
+
+    @timed(DB_SECONDS.labels("get_incidents"))
     def get_incidents(self, limit=10):
+        """Latest incidents as (id, timestamp, status, anomaly_component, root_cause, fix_action)."""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('SELECT * FROM incidents ORDER BY timestamp DESC LIMIT ?', (limit,))
-            return cursor.fetchall()
+            with self.lock:
+                cursor = self.conn.execute('''
+                    SELECT id, timestamp, status, anomaly_component, root_cause, fix_action
+                    FROM incidents ORDER BY ts DESC, id DESC LIMIT ?
+                ''', (limit,))
+                return cursor.fetchall()
         except Exception:
+            DB_ERRORS.labels("read").inc()
             return []
+
+    @timed(DB_SECONDS.labels("query_incidents"), keywords=True)
+    def query_incidents(self, status=None, component=None, target=None, start=None, end=None,
+                        limit=50, before=None):
+        """
+        One page of incident summaries, newest first:
+        (id, ts, status, anomaly_component, target, severity, root_cause, fix_action).
+        Filters are optional; start/end are epoch seconds. Pass the returned
+        cursor as `before` for the next page (None when there are no more).
+        """
+        clauses, params = [], []
+        for column, value in (("status", status), ("anomaly_component", component), ("target", target)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(getattr(value, "value", value))
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(int(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(int(end))
+        if before is not None:
+            # Keyset pagination: constant cost per page, however deep
+            clauses.append("(ts < ? OR (ts = ? AND id < ?))")
+            params.extend([before[0], before[0], before[1]])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        try:
+            with self.lock:
+                rows = self.conn.execute(f'''
+                    SELECT id, ts, status, anomaly_component, target, severity, root_cause, fix_action
+                    FROM incidents {where}
+                    ORDER BY ts DESC, id DESC LIMIT ?
+                ''', (*params, limit)).fetchall()
+        except Exception as e:
+            DB_ERRORS.labels("query_incidents").inc()
+            print(f"DB Error (query_incidents): {e}")
+            return [], None
+        cursor = (rows[-1][1], rows[-1][0]) if len(rows) == limit else None
+        return rows, cursor
+
+    @timed(DB_SECONDS.labels("get_incident"))
+    def get_incident(self, incident_id):
+        """The full IncidentReport, the stored text for legacy rows, or None."""
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT record, full_report FROM incidents WHERE id = ?", (incident_id,)
+                ).fetchone()
+        except Exception as e:
+            DB_ERRORS.labels("get_incident").inc()
+            print(f"DB Error (get_incident): {e}")
+            return None
+        if row is None:
+            return None
+        return unpack(row[0]) if row[0] is not None else row[1]
+
+    @timed(DB_SECONDS.labels("query_metrics"), keywords=True)
+    def query_metrics(self, component, name, start, end=None, max_points=QUERY_MAX_POINTS):
+        """
+        Return [(timestamp, min, max, avg, count, p95)] for one series between
+        start and end (epoch seconds), read from the coarsest table that still
+        gives `max_points` of resolution. Raw rows come back with min=max=avg.
+        """
+        end = int(end if end is not None else time.time())
+        start = int(start)
+        level = self.pick_resolution(start, end, max_points)
+
+        try:
+            with self.lock:
+                if level is None:
+                    rows = self.conn.execute('''
+                        SELECT timestamp, value, value, value, 1, value FROM metrics
+                        WHERE component = ? AND name = ? AND timestamp >= ? AND timestamp < ?
+                        ORDER BY timestamp
+                    ''', (component, name, start, end)).fetchall()
+                    archived = self._archived(component, name, start, end)
+                    if archived is not None:
+                        timestamps, values = (a.tolist() for a in archived)
+                        rows = sorted(rows + [(t, v, v, v, 1, v) for t, v in zip(timestamps, values)])
+                else:
+                    rows = self.conn.execute(f'''
+                        SELECT bucket, min, max, avg, count, p95 FROM metrics_{level}
+                        WHERE component = ? AND name = ? AND bucket >= ? AND bucket < ?
+                        ORDER BY bucket
+                    ''', (component, name, start - start % dict(ROLLUPS)[level], end)).fetchall()
+                return rows
+        except Exception as e:
+            DB_ERRORS.labels("query_metrics").inc()
+            print(f"DB Error (query_metrics): {e}")
+            return []
+
+    @timed(DB_SECONDS.labels("query_quantile"))
+    def query_quantile(self, component, name, start, end=None, q=0.95):
+        """
+        (q-quantile, sample count) of one series over [start, end), within the
+        sketch accuracy. Ranges served from rollups merge the buckets' sketches
+        rather than reading raw rows (buckets from before sketches are skipped).
+        """
+        end = int(end if end is not None else time.time())
+        start = int(start)
+        level = self.pick_resolution(start, end)
+
+        try:
+            with self.lock:
+                if level is None:
+                    values = [row[0] for row in self.conn.execute('''
+                        SELECT value FROM metrics
+                        WHERE component = ? AND name = ? AND timestamp >= ? AND timestamp < ?
+                    ''', (component, name, start, end))]
+                    archived = self._archived(component, name, start, end)
+                    if archived is not None:
+                        values = np.concatenate((values, archived[1]))
+                    sketch = DDSketch.of(values)
+                else:
+                    sketch = DDSketch()
+                    for (blob,) in self.conn.execute(f'''
+                        SELECT sketch FROM metrics_{level}
+                        WHERE component = ? AND name = ? AND bucket >= ? AND bucket < ? AND sketch IS NOT NULL
+                    ''', (component, name, start - start % dict(ROLLUPS)[level], end)):
+                        part = DDSketch.from_bytes(blob)
+                        if part is not None:
+                            sketch.merge(part)
+        except Exception as e:
+            DB_ERRORS.labels("query_quantile").inc()
+            print(f"DB Error (query_quantile): {e}")
+            return None, 0
+        return sketch.quantile(q), sketch.count
+
+    def _archived(self, component, name, start, end):
+        """Archived (timestamps, values) for a raw range reaching below the archive watermark."""
+        if self.archive is None:
+            return None
+        self.archive.refresh()
+        if self.archive.watermark is None or start >= self.archive.watermark:
+            return None
+        return self.archive.query(component, name, start, end)
+
+    def pick_resolution(self, start, end, max_points=QUERY_MAX_POINTS):
+        """Rollup level to serve [start, end) from, or None for raw rows."""
+        span = max(end - start, 0)
+        raw_cutoff = time.time() - RAW_RETENTION_SECONDS
+        # Raw samples arrive roughly every few seconds; only serve them for short
+        # ranges that are still inside the retention window.
+        if span <= max_points and start >= raw_cutoff:
+            return None
+        for level, width in ROLLUPS:
+            if span / width <= max_points:
+                return level
+        return ROLLUPS[-1][0]
+
+    @timed(DB_SECONDS.labels("maintain"))
+    def maintain(self, now=None):
+        """Roll up closed buckets, archive old partitions, then prune raw rows past retention."""
+        now = int(now if now is not None else time.time())
+        for level, width in ROLLUPS:
+            self.rollup(level, width, now)
+        self.archive_closed(now)
+        self.prune(now)
+
+    def rollup(self, level, width, now=None):
+        now = int(now if now is not None else time.time())
+        closed = now - now % width  # buckets before this are complete
+
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT watermark FROM rollup_state WHERE level = ?", (level,)
+            ).fetchone()
+            if row:
+                watermark = row[0]
+            else:
+                first = self.conn.execute("SELECT MIN(timestamp) FROM metrics").fetchone()[0]
+                if first is None:
+                    return
+                watermark = first - first % width
+
+        # Work through the backlog a chunk at a time so writers are never
+        # locked out for long.
+        chunk = width * 500
+        while watermark < closed:
+            upper = min(watermark + chunk, closed)
+            try:
+                with self.lock:
+                    cursor = self.conn.execute('''
+                        SELECT component, name, timestamp, value FROM metrics
+                        WHERE timestamp >= ? AND timestamp < ?
+                        ORDER BY component, name, timestamp
+                    ''', (watermark, upper))
+                    rows = summarize_buckets(cursor, width)
+                    self.conn.executemany(f'''
+                        INSERT OR REPLACE INTO metrics_{level}
+                            (component, name, bucket, min, max, avg, count, p95, sketch)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', rows)
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO rollup_state (level, watermark) VALUES (?, ?)",
+                        (level, upper)
+                    )
+                    self.conn.commit()
+            except Exception as e:
+                DB_ERRORS.labels("rollup").inc()
+                print(f"DB Error (rollup {level}): {e}")
+                return
+            watermark = upper
+
+    def archive_closed(self, now=None):
+        """
+        Move the raw rows of partitions that closed ARCHIVE_AFTER_SECONDS ago
+        (and are rolled up) into the columnar archive, oldest first.
+        Returns the number of rows moved.
+        """
+        if self.archive is None:
+            return 0
+        now = int(now if now is not None else time.time())
+        width = self.archive.partition_seconds
+
+        with self.lock:
+            # Rollups read raw rows, so only what the coarsest one consumed may leave
+            row = self.conn.execute(
+                "SELECT watermark FROM rollup_state WHERE level = ?", (ROLLUPS[-1][0],)
+            ).fetchone()
+        if not row:
+            return 0
+        cutoff = min(now - ARCHIVE_AFTER_SECONDS, row[0])
+        cutoff -= cutoff % width
+
+        # One partition per transaction; late rows reopen an archived partition
+        moved = 0
+        while True:
+            try:
+                with self.lock:
+                    first = self.conn.execute("SELECT MIN(timestamp) FROM metrics").fetchone()[0]
+                    if first is None or first >= cutoff:
+                        break
+                    start = first - first % width
+                    moved += self._archive_partition(start, start + width)
+            except Exception as e:
+                DB_ERRORS.labels("archive").inc()
+                print(f"DB Error (archive): {e}")
+                break
+        return moved
+
+    def _archive_partition(self, start, end):
+        # Rows up to the partition's last_id were exported by an earlier run
+        # that stopped before deleting them; they are only deleted now.
+        done = self.archive.last_id(start)
+        series, code_of = [], {}
+        codes, timestamps, values = [], [], []
+        last_id = done
+        cursor = self.conn.execute('''
+            SELECT id, component, name, timestamp, value FROM metrics
+            WHERE timestamp >= ? AND timestamp < ?
+        ''', (start, end))
+        for row_id, component, name, ts, value in cursor:
+            last_id = max(last_id, row_id)
+            if row_id <= done:
+                continue
+            code = code_of.get((component, name))
+            if code is None:
+                code = code_of[(component, name)] = len(series)
+                series.append((component, name))
+            codes.append(code)
+            timestamps.append(ts)
+            values.append(value)
+
+        if codes:
+            self.archive.add(start, series, np.array(codes, dtype=np.int32),
+                             np.array(timestamps, dtype=np.int64), np.array(values, dtype=np.float64), last_id)
+        self.conn.execute(
+            "DELETE FROM metrics WHERE timestamp >= ? AND timestamp < ? AND id <= ?", (start, end, last_id)
+        )
+        self.conn.commit()
+        DB_ARCHIVED_ROWS.inc(len(codes))
+        return len(codes)
+
+    def prune(self, now=None, chunk_size=PRUNE_CHUNK_SIZE):
+        """Delete raw rows older than the retention window, in small transactions."""
+        now = int(now if now is not None else time.time())
+        cutoff = now - RAW_RETENTION_SECONDS
+
+        with self.lock:
+            # Never drop raw rows that the coarsest rollup hasn't consumed yet
+            row = self.conn.execute(
+                "SELECT watermark FROM rollup_state WHERE level = ?", (ROLLUPS[-1][0],)
+            ).fetchone()
+        if not row:
+            return 0
+        cutoff = min(cutoff, row[0])
+
+        deleted = 0
+        while True:
+            try:
+                with self.lock:
+                    cursor = self.conn.execute('''
+                        DELETE FROM metrics WHERE id IN (
+                            SELECT id FROM metrics WHERE timestamp < ? LIMIT ?
+                        )
+                    ''', (cutoff, chunk_size))
+                    self.conn.commit()
+            except Exception as e:
+                DB_ERRORS.labels("prune").inc()
+                print(f"DB Error (prune): {e}")
+                break
+            deleted += cursor.rowcount
+            if cursor.rowcount < chunk_size:
+                break
+        return deleted
+
+    def flush(self):
+        if self.writer:
+            self.writer.flush()
+
+    def close(self):
+        # Drain any buffered samples before releasing the connection
+        if self.writer:
+            self.writer.stop()
+            self.writer = None
+        with self.lock:
+            self.conn.close()
+
+
+def to_epoch(ts):
+    """Convert a stored timestamp (epoch number or ISO-8601 string) to epoch seconds."""
+    if ts is None:
+        return None
+    if isinstance(ts, (int, float)):
+        return int(ts)
+    if isinstance(ts, datetime):
+        return int(ts.timestamp())
+    try:
+        return int(float(ts))
+    except ValueError:
+        return int(datetime.fromisoformat(ts).timestamp())
+
+
+def summarize_buckets(rows, width):
+    """
+    Collapse (component, name, timestamp, value) rows, ordered by series and
+    time, into one (component, name, bucket, min, max, avg, count, p95, sketch)
+    row per series per bucket.
+    """
+    out = []
+    key = None
+    values = []
+
+    def emit():
+        values.sort()
+        p95 = values[max(0, -(-len(values) * 95 // 100) - 1)]  # nearest rank
+        out.append((*key, values[0], values[-1], sum(values) / len(values), len(values), p95,
+                    DDSketch.of(values).to_bytes()))
+
+    for component, name, ts, value in rows:
+        k = (component, name, ts - ts % width)
+        if k != key:
+            if values:
+                emit()
+            key, values = k, []
+        values.append(value)
+    if values:
+        emit()
+    return out
+
+
+class MetricWriter:
+    """
+    Write-behind buffer for metric samples.
+    A background thread writes them with a single executemany once
+    `batch_size` rows are pending or `flush_interval` seconds have passed.
+    """
+    def __init__(self, db, batch_size=DB_BATCH_SIZE, flush_interval=DB_FLUSH_INTERVAL):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.pending = []
+        self.cond = threading.Condition()
+        self.last_maintenance = time.monotonic()
+        self.running = True
+
+        self.thread = threading.Thread(target=self._run, name="metric-writer", daemon=True)
+        self.thread.start()
+
+    def add(self, component, name, value):
+        row = (component, name, value, int(time.time()))
+        with self.cond:
+            self.pending.append(row)
+            DB_PENDING_ROWS.set(len(self.pending))
+            if len(self.pending) >= self.batch_size:
+                self.cond.notify()
+
+    def add_many(self, batch):
+        now = int(time.time())
+        with self.cond:
+            self.pending.extend(
+                row if len(row) > 3 else (row[0], row[1], row[2], now)
+                for row in batch
+            )
+            DB_PENDING_ROWS.set(len(self.pending))
+            if len(self.pending) >= self.batch_size:
+                self.cond.notify()
+
+    def flush(self):
+        with self.cond:
+            rows, self.pending = self.pending, []
+            DB_PENDING_ROWS.set(0)
+        self.db._insert_metrics(rows)
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.thread.join()
+        self.flush()
+
+    def _run(self):
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            with self.cond:
+                while self.running and len(self.pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                if not self.running:
+                    return
+            self.flush()
+            deadline = time.monotonic() + self.flush_interval
+
+            # Rollups and retention run on this thread, off the event loop
+            if time.monotonic() - self.last_maintenance >= DB_MAINTENANCE_INTERVAL:
+                self.last_maintenance = time.monotonic()
+                self.db.maintain()
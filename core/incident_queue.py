@@ -0,0 +1,130 @@
+import asyncio
+import heapq
+import itertools
+
+from config.settings import INCIDENT_QUEUE_SIZE, INCIDENT_QUEUE_HIGH, INCIDENT_QUEUE_LOW, INCIDENT_SHED_BELOW
+from core.correlation import SEVERITY_RANK
+from core.instrumentation import Counter, Gauge, Histogram
+from core.models import Severity
+
+INCIDENT_QUEUE_DEPTH = Gauge("healthguard_incident_queue_depth", "Incidents waiting for a pipeline worker").labels()
+INCIDENT_QUEUE_SHEDDING = Gauge(
+    "healthguard_incident_queue_shedding", "1 while the incident queue is above its high watermark"
+).labels()
+_queue_items = Counter("healthguard_incident_queue_items_total", "Incidents offered to the queue, by outcome", ["outcome"])
+QUEUE_OUTCOMES = {outcome: _queue_items.labels(outcome) for outcome in ("queued", "merged", "dropped", "evicted")}
+_queue_wait = Histogram("healthguard_incident_queue_wait_seconds", "Time from detection to a pipeline worker", ["severity"])
+QUEUE_WAIT = {severity: _queue_wait.labels(severity.value) for severity in Severity}
+
+
+class IncidentQueue:
+    """
+    Bounded, severity-ordered queue between detection and the incident
+    pipeline workers: CRITICAL incidents are taken first, ties oldest first.
+
+    Backpressure: once `high` incidents are waiting the queue sheds until it
+    drains to `low`. While shedding, an incident whose primary anomaly is
+    below `shed_below` is merged into an incident already queued for the same
+    target (its anomalies become related ones there), or dropped if there is
+    none. At `maxsize` the lowest-priority, newest entry is evicted for a
+    more severe newcomer; otherwise the newcomer is dropped. Merged, dropped
+    and evicted incidents are passed to `on_discard` so their owner can
+    close them.
+    """
+    def __init__(self, maxsize=INCIDENT_QUEUE_SIZE, high=INCIDENT_QUEUE_HIGH, low=INCIDENT_QUEUE_LOW,
+                 shed_below=INCIDENT_SHED_BELOW, on_discard=None):
+        self.maxsize = maxsize
+        self.high = high
+        self.low = low
+        self.shed_below = SEVERITY_RANK[Severity(shed_below)]
+        self.on_discard = on_discard
+
+        self.heap = []      # [rank, seq, incident, logs, enqueued, live]
+        self.queued = {}    # target -> live entries, oldest first
+        self.size = 0
+        self.order = itertools.count()
+        self.shedding = False
+        self.nonempty = asyncio.Event()
+        self.stats = {outcome: 0 for outcome in QUEUE_OUTCOMES}
+
+    def __len__(self):
+        return self.size
+
+    def _count(self, outcome, incident=None):
+        self.stats[outcome] += 1
+        QUEUE_OUTCOMES[outcome].inc()
+        if incident is not None and self.on_discard:
+            self.on_discard(incident)
+
+    def _update_depth(self):
+        if self.size >= self.high:
+            self.shedding = True
+        elif self.size <= self.low:
+            self.shedding = False
+        INCIDENT_QUEUE_DEPTH.set(self.size)
+        INCIDENT_QUEUE_SHEDDING.set(int(self.shedding))
+
+    def _remove(self, entry):
+        entry[5] = False
+        self.size -= 1
+        entries = self.queued[entry[2].target]
+        entries.remove(entry)
+        if not entries:
+            del self.queued[entry[2].target]
+
+    def put(self, incident, logs, now):
+        """Offer an incident; returns "queued", "merged" or "dropped"."""
+        severity = SEVERITY_RANK[incident.primary.severity]
+
+        if self.shedding and severity < self.shed_below:
+            entries = self.queued.get(incident.target)
+            if entries:
+                target = entries[-1][2]
+                for anomaly in incident.anomalies:
+                    target.add(anomaly, now)
+                self._count("merged", incident)
+                return "merged"
+            self._count("dropped", incident)
+            return "dropped"
+
+        if self.size >= self.maxsize:
+            # Lowest priority = lowest severity, newest first
+            victim = max((e for e in self.heap if e[5]), key=lambda e: (e[0], e[1]))
+            if victim[0] <= -severity:
+                self._count("dropped", incident)
+                return "dropped"
+            self._remove(victim)
+            self._count("evicted", victim[2])
+
+        entry = [-severity, next(self.order), incident, logs, now, True]
+        self.queued.setdefault(incident.target, []).append(entry)
+        self.size += 1
+        self._push(entry)
+        self._count("queued")
+        self._update_depth()
+        self.nonempty.set()
+        return "queued"
+
+    def _push(self, entry):
+        heapq.heappush(self.heap, entry)
+        # Evicted entries stay in the heap until popped; compact if they pile up
+        if len(self.heap) > 2 * self.maxsize:
+            self.heap = [e for e in self.heap if e[5]]
+            heapq.heapify(self.heap)
+
+    async def get(self):
+        """Most severe waiting incident as (incident, logs); waits if there is none."""
+        while True:
+            while self.heap:
+                entry = heapq.heappop(self.heap)
+                if not entry[5]:
+                    continue
+                self._remove(entry)
+                self._update_depth()
+                if not self.size:
+                    self.nonempty.clear()
+                incident = entry[2]
+                QUEUE_WAIT[incident.primary.severity].observe(asyncio.get_running_loop().time() - entry[4])
+                return incident, entry[3]
+            self.nonempty.clear()
+            await self.nonempty.wait()
@@ -0,0 +1,71 @@
+import json
+import zlib
+from datetime import datetime
+
+from core.models import (
+    Anomaly, Component, Diagnosis, Fix, FixStatus, IncidentReport, IncidentStatus, Severity,
+)
+
+
+def _anomaly_to_dict(a):
+    return {
+        "id": a.id, "component": a.component.value, "metric": a.metric, "value": a.value,
+        "threshold": a.threshold, "severity": a.severity.value, "confidence": a.confidence,
+        "timestamp": a.timestamp.timestamp(), "target": a.target,
+    }
+
+
+def _anomaly_from_dict(d):
+    return Anomaly(
+        d["id"], Component(d["component"]), d["metric"], d["value"], d["threshold"],
+        Severity(d["severity"]), d["confidence"], datetime.fromtimestamp(d["timestamp"]), d["target"],
+    )
+
+
+def report_to_dict(report):
+    """Plain-JSON form of an IncidentReport (enums as values, datetimes as epoch seconds)."""
+    d, f = report.diagnosis, report.fix
+    return {
+        "id": report.id,
+        "timestamp": report.timestamp.timestamp(),
+        "status": report.status.value,
+        "duration": report.duration,
+        "timings": report.timings,
+        "anomaly": _anomaly_to_dict(report.anomaly),
+        "related": [_anomaly_to_dict(a) for a in report.related],
+        "diagnosis": {
+            "anomaly_id": d.anomaly_id, "root_cause": d.root_cause, "confidence": d.confidence,
+            "evidence": list(d.evidence), "recommendations": list(d.recommendations),
+        },
+        "fix": {
+            "action": f.action, "parameters": f.parameters, "safe": f.safe, "target": f.target,
+            "status": f.status.value, "detail": f.detail, "duration": f.duration,
+        },
+        "verification": report.verification,
+    }
+
+
+def report_from_dict(d):
+    fix = d["fix"]
+    return IncidentReport(
+        id=d["id"],
+        anomaly=_anomaly_from_dict(d["anomaly"]),
+        diagnosis=Diagnosis(**d["diagnosis"]),
+        fix=Fix(fix["action"], fix["parameters"], fix["safe"], fix["target"],
+                FixStatus(fix["status"]), fix["detail"], fix["duration"]),
+        verification=d["verification"],
+        duration=d["duration"],
+        status=IncidentStatus(d["status"]),
+        timings=d["timings"],
+        related=[_anomaly_from_dict(a) for a in d["related"]],
+        timestamp=datetime.fromtimestamp(d["timestamp"]),
+    )
+
+
+def pack(report):
+    """Compressed JSON record for the incidents table."""
+    return zlib.compress(json.dumps(report_to_dict(report), separators=(",", ":"), default=str).encode())
+
+
+def unpack(blob):
+    return report_from_dict(json.loads(zlib.decompress(blob)))
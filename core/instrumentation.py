@@ -0,0 +1,210 @@
+import bisect
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Default latency buckets (seconds)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    """
+    Base for Counter/Gauge/Histogram. Label sets are bound once with
+    `labels(...)` (no arguments for an unlabelled metric), which returns a
+    cached child; hot paths keep that child around so an update is just a
+    lock and an add.
+    """
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+        if not self.labelnames:
+            self.children[()] = self.child_class("")
+        registry.register(self)
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            rendered = ",".join(f'{k}="{v}"' for k, v in zip(self.labelnames, values))
+            with self.lock:
+                child = self.children.setdefault(values, self.child_class(rendered))
+        return child
+
+    def samples(self):
+        with self.lock:
+            children = list(self.children.values())
+        out = []
+        for child in children:
+            out.extend(child.samples(self.name))
+        return out
+
+
+def _fmt_labels(rendered, extra=""):
+    inner = ",".join(x for x in (rendered, extra) if x)
+    return f"{{{inner}}}" if inner else ""
+
+
+class _CounterChild:
+    __slots__ = ("rendered", "value", "lock")
+
+    def __init__(self, rendered):
+        self.rendered = rendered
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self, name):
+        return [f"{name}{_fmt_labels(self.rendered)} {self.value}"]
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ("rendered", "bounds", "counts", "sum", "count", "lock")
+
+    def __init__(self, rendered, bounds=DEFAULT_BUCKETS):
+        self.rendered = rendered
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name):
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        out = []
+        cumulative = 0
+        for bound, n in zip(self.bounds, counts):
+            cumulative += n
+            le = 'le="%s"' % bound
+            out.append(f"{name}_bucket{_fmt_labels(self.rendered, le)} {cumulative}")
+        le = 'le="+Inf"'
+        out.append(f"{name}_bucket{_fmt_labels(self.rendered, le)} {count}")
+        out.append(f"{name}_sum{_fmt_labels(self.rendered)} {total}")
+        out.append(f"{name}_count{_fmt_labels(self.rendered)} {count}")
+        return out
+
+
+class Counter(_Metric):
+    kind = "counter"
+    child_class = _CounterChild
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    child_class = _GaugeChild
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def child_class(self, rendered):
+        return _HistogramChild(rendered, self.buckets)
+
+
+def timed(histogram_child, keywords=False):
+    """
+    Decorator: observe the wall time of each call into a pre-bound histogram
+    child. The wrapper takes positional arguments only, so hot paths don't
+    build a kwargs dict per call; pass keywords=True for functions that are
+    called with keyword arguments.
+    """
+    def decorator(fn):
+        if keywords:
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    histogram_child.observe(time.perf_counter() - start)
+        else:
+            @wraps(fn)
+            def wrapper(*args):
+                start = time.perf_counter()
+                try:
+                    return fn(*args)
+                finally:
+                    histogram_child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep scrapes out of the console
+
+
+def start_metrics_server(port, host="127.0.0.1", registry=REGISTRY):
+    """Serve /metrics on a daemon thread. Returns the server (call .shutdown() to stop)."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,180 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+import numpy as np
+
+from config.settings import LOG_BUFFER_SIZE, LOG_MAX_LINE, LOG_COMPONENT_KEYWORDS, LOG_EVIDENCE_WINDOW
+from core.models import Log
+
+TOKEN_RE = re.compile(r"[a-z][a-z0-9_\-]{2,}")
+MAX_TOKENS = 32  # indexed tokens per line
+EVIDENCE_LEVELS = ("CRITICAL", "ERROR", "WARN")
+
+# keyword -> component, for tagging lines that mention one
+_KEYWORDS = {word: component for component, words in LOG_COMPONENT_KEYWORDS.items() for word in words}
+
+
+def tokenize(message):
+    seen = []
+    for token in TOKEN_RE.findall(message.lower()):
+        if token not in seen:
+            seen.append(token)
+            if len(seen) == MAX_TOKENS:
+                break
+    return seen
+
+
+def infer_component(tokens):
+    for token in tokens:
+        component = _KEYWORDS.get(token)
+        if component:
+            return component
+    return None
+
+
+class LogStore:
+    """
+    Bounded in-memory log buffer with an inverted index.
+
+    Lines live in a ring of `capacity` slots addressed by a sequence number
+    (seq % capacity); once full, the oldest lines are overwritten. Postings
+    lists map ("level", L), ("component", C) and ("token", T) to the seqs
+    that carry them, in order, so a time window is two bisects and a filter.
+    Stale postings are swept each time the ring wraps, which keeps memory
+    bounded by `capacity`.
+    """
+    def __init__(self, capacity=LOG_BUFFER_SIZE):
+        self.capacity = capacity
+        self.received = np.zeros(capacity)  # ingest time (epoch s), non-decreasing by seq
+        self.logs = [None] * capacity
+        self.components = [None] * capacity
+        self.tokens = [()] * capacity
+        self.postings = {}
+        self.next_seq = 0
+        self.lock = threading.Lock()
+
+    @property
+    def oldest(self):
+        return max(0, self.next_seq - self.capacity)
+
+    def __len__(self):
+        return self.next_seq - self.oldest
+
+    def add(self, log, component=None, received=None):
+        message = log.message[:LOG_MAX_LINE]
+        tokens = tokenize(message)
+        component = component or infer_component(tokens)
+        received = time.time() if received is None else received
+
+        with self.lock:
+            seq = self.next_seq
+            slot = seq % self.capacity
+            # Keep the index time non-decreasing even if clocks step back
+            if seq and received < self.received[(seq - 1) % self.capacity]:
+                received = self.received[(seq - 1) % self.capacity]
+            self.received[slot] = received
+            self.logs[slot] = log if len(log.message) <= LOG_MAX_LINE else Log(log.level, message, log.timestamp)
+            self.components[slot] = component
+            self.tokens[slot] = frozenset(tokens)
+
+            keys = [("level", log.level)] + [("token", t) for t in tokens]
+            if component:
+                keys.append(("component", component))
+            for key in keys:
+                self.postings.setdefault(key, []).append(seq)
+
+            self.next_seq = seq + 1
+            if self.next_seq % self.capacity == 0:
+                self._sweep()
+
+    def extend(self, logs, component=None):
+        now = time.time()
+        for log in logs:
+            self.add(log, component, now)
+
+    def _sweep(self):
+        oldest = self.oldest
+        for key in list(self.postings):
+            seqs = self.postings[key]
+            cut = bisect_left(seqs, oldest)
+            if cut == len(seqs):
+                del self.postings[key]
+            elif cut:
+                self.postings[key] = seqs[cut:]
+
+    def _seq_at(self, when):
+        """First live seq received at or after `when`."""
+        lo, hi = self.oldest, self.next_seq
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.received[mid % self.capacity] < when:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def query(self, start=None, end=None, levels=None, component=None, tokens=(), limit=100):
+        """
+        Logs received in [start, end) matching every given criterion, newest
+        first. `levels` is any of several levels; `tokens` must all appear.
+        """
+        tokens = [t.lower() for t in tokens]
+        with self.lock:
+            lo = self.oldest if start is None else self._seq_at(start)
+            hi = self.next_seq if end is None else self._seq_at(end)
+            if lo >= hi:
+                return []
+
+            # Drive the scan from the shortest postings list in range
+            candidates = []
+            if component:
+                candidates.append(self.postings.get(("component", component), []))
+            for token in tokens:
+                candidates.append(self.postings.get(("token", token), []))
+            if levels and len(levels) == 1:
+                candidates.append(self.postings.get(("level", levels[0]), []))
+
+            if candidates:
+                driver = min(candidates, key=len)
+                seqs = driver[bisect_left(driver, lo):bisect_left(driver, hi)]
+            else:
+                seqs = range(lo, hi)
+
+            out = []
+            for seq in reversed(seqs):
+                slot = seq % self.capacity
+                log = self.logs[slot]
+                if levels and log.level not in levels:
+                    continue
+                if component and self.components[slot] != component:
+                    continue
+                if tokens and not self.tokens[slot].issuperset(tokens):
+                    continue
+                out.append(log)
+                if len(out) == limit:
+                    break
+            return out
+
+    def evidence(self, anomaly, limit=3, window=LOG_EVIDENCE_WINDOW):
+        """
+        Most relevant recent lines for an anomaly: warnings and errors from
+        `window` seconds before it (and a few after), mentioning its component
+        first, then any others.
+        """
+        when = anomaly.timestamp.timestamp() if isinstance(anomaly.timestamp, datetime) else anomaly.timestamp
+        start, end = when - window, when + min(window, 5.0)
+        logs = self.query(start, end, EVIDENCE_LEVELS, anomaly.component.value, limit=limit)
+        if len(logs) < limit:
+            for log in self.query(start, end, EVIDENCE_LEVELS, limit=limit):
+                if log not in logs:
+                    logs.append(log)
+                    if len(logs) == limit:
+                        break
+        return [log.message for log in logs]
+
+
+# Process-wide log buffer, fed by MonitorAgent and read by the diagnosers
+LOGS = LogStore()
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from typing import Dict, List, Any, Optional
@@ -15,6 +15,14 @@ class Severity(Enum):
     HIGH = "high"
     CRITICAL = "critical"
 
+class FixStatus(Enum):
+    APPLIED = "applied"
+    FAILED = "failed"
+    TIMEOUT = "timeout"
+    COOLDOWN = "cooldown"          # same action ran on this target too recently
+    DEDUPLICATED = "deduplicated"  # joined an identical action already in flight
+    SKIPPED = "skipped"            # nothing to run (notify only)
+
 class IncidentStatus(Enum):
     DETECTED = "detected"
     DIAGNOSING = "diagnosing"
@@ -23,20 +31,21 @@ class IncidentStatus(Enum):
     RESOLVED = "resolved"
     FAILED = "failed"
 
-@dataclass
+@dataclass(slots=True)
 class Metric:
     component: Component
     name: str
     value: float
     timestamp: datetime
+    target: str = "local"  # host/target the sample came from
 
-@dataclass
+@dataclass(slots=True)
 class Log:
     level: str
     message: str
     timestamp: datetime
 
-@dataclass
+@dataclass(slots=True)
 class Anomaly:
     id: str
     component: Component
@@ -46,8 +55,9 @@ class Anomaly:
     severity: Severity
     confidence: float
     timestamp: datetime
+    target: str = "local"
 
-@dataclass
+@dataclass(slots=True)
 class Diagnosis:
     anomaly_id: str
     root_cause: str
@@ -55,13 +65,17 @@ class Diagnosis:
     evidence: List[str]
     recommendations: List[str]
 
-@dataclass
+@dataclass(slots=True)
 class Fix:
     action: str
     parameters: Dict[str, Any]
     safe: bool
+    target: str = "local"
+    status: FixStatus = FixStatus.APPLIED
+    detail: str = ""
+    duration: float = 0.0  # seconds the action ran
 
-@dataclass
+@dataclass(slots=True)
 class IncidentReport:
     id: str
     anomaly: Anomaly
@@ -70,3 +84,6 @@ class IncidentReport:
     verification: Dict[str, Any]
     duration: float
     status: IncidentStatus
+    timings: Dict[str, float] = field(default_factory=dict)  # seconds per pipeline stage
+    related: List[Anomaly] = field(default_factory=list)     # correlated anomalies besides `anomaly`
+    timestamp: datetime = field(default_factory=datetime.now)  # when the incident closed
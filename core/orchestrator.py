@@ -2,94 +2,324 @@ import time
 import asyncio
 import json
 import os
+from collections import deque
 from agents.monitor import MonitorAgent
 from agents.detector import DetectorAgent
+from agents.streaming_detector import StreamingDetectorAgent
 from agents.diagnoser import DiagnoserAgent
 from agents.llm_diagnoser import LLMDiagnoserAgent
 from agents.fixer import FixerAgent
 from agents.verifier import VerifierAgent
 from agents.reporter import ReporterAgent
 from core.models import IncidentStatus, IncidentReport
-from integrations.slack_alert import send_slack_alert
+from config.settings import (
+    DETECTOR_MODE, MONITOR_INTERVAL, MAX_CONCURRENT_INCIDENTS, VERIFY_MODE, METRICS_PORT, METRICS_HOST,
+    INCIDENT_HISTORY, LIVE_FEED_FILE, SAMPLING_MODE,
+)
+from integrations.slack_alert import AlertDispatcher
 
-from core.database import DatabaseManager
+from core.storage import SQLiteStorage
+from core.shared_ring import SharedSeriesRing
+from core.rules import RULES
+from core.correlation import AnomalyCorrelator
+from core.incident_queue import IncidentQueue
+from core.sharding import ShardedRuntime
+from core.instrumentation import Counter, Gauge, Histogram, start_metrics_server
+
+# Instrumentation (label sets bound once at import)
+CYCLE_SECONDS = Histogram("healthguard_cycle_seconds", "Monitor loop work per tick (excluding sleep)").labels()
+COLLECT_SECONDS = Histogram("healthguard_collect_seconds", "MonitorAgent.collect duration").labels()
+DETECT_SECONDS = Histogram("healthguard_detect_seconds", "Detector duration per tick").labels()
+ANOMALIES_TOTAL = Counter("healthguard_anomalies_total", "Anomalies detected").labels()
+ANOMALIES_PER_TICK = Histogram(
+    "healthguard_anomalies_per_tick", "Anomalies detected per tick", buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250)
+).labels()
+_stage_seconds = Histogram("healthguard_stage_seconds", "Incident pipeline stage duration", ["stage"])
+STAGE_SECONDS = {stage: _stage_seconds.labels(stage) for stage in ("diagnose", "fix", "verify")}
+_incidents_total = Counter("healthguard_incidents_total", "Incidents finished, by outcome", ["outcome"])
+INCIDENTS_RESOLVED = _incidents_total.labels("resolved")
+INCIDENTS_FAILED = _incidents_total.labels("failed")
+INCIDENTS_ERRORED = _incidents_total.labels("error")
+FIX_SUCCESS_RATIO = Gauge("healthguard_fix_success_ratio", "Share of finished incidents that verified healthy").labels()
+INCIDENTS_IN_FLIGHT = Gauge("healthguard_incidents_in_flight", "Incident pipelines queued or running").labels()
+ANOMALIES_CORRELATED = Counter(
+    "healthguard_anomalies_correlated_total", "Anomalies folded into an already open incident"
+).labels()
+INCIDENTS_OPEN = Gauge("healthguard_incidents_open", "Incidents currently open for correlation").labels()
+ALERT_QUEUE_DEPTH = Gauge("healthguard_alert_queue_depth", "Slack alerts waiting to be sent").labels()
 
 class HealthGuardOrchestrator:
-    def __init__(self):
-        self.monitor = MonitorAgent()
-        self.detector = DetectorAgent()
+    def __init__(self, monitor=None, db=None, live_feed=LIVE_FEED_FILE):
+        self.monitor = monitor or MonitorAgent()
+        self.detector = StreamingDetectorAgent() if DETECTOR_MODE == "streaming" else DetectorAgent()
         self.diagnoser = DiagnoserAgent()
         self.llm_diagnoser = LLMDiagnoserAgent() # The "Brain"
         self.fixer = FixerAgent()
         self.verifier = VerifierAgent()
         self.reporter = ReporterAgent()
+        # Re-checks one series of a target after a fix (the shard runtime's in coordinator mode)
+        self.probe = self.monitor.collect_metric
         
         # State
         self.metrics_history = []
-        self.incidents = []
+        self.incidents = deque(maxlen=INCIDENT_HISTORY)  # recent reports; full history is in the db
+
+        # Related anomalies are grouped into one incident (one pipeline run)
+        self.correlator = AnomalyCorrelator()
+
+        # New incidents wait in a bounded, severity-ordered queue for one of
+        # MAX_CONCURRENT_INCIDENTS pipeline workers (started on first dispatch)
+        self.queue = IncidentQueue(on_discard=self.discard)
+        self.pending = set()   # worker tasks
+        self.busy = 0          # workers currently running a pipeline
+        self.stopping = False  # set by shutdown: workers take no more incidents
         
-        # Database
-        self.db = DatabaseManager()
+        # Slack alerts are queued and sent off the event loop
+        self.alerts = AlertDispatcher()
+
+        # Storage: writes are queued to a writer thread, never awaited on the loop
+        self.db = db or SQLiteStorage()
+
+        # Prometheus /metrics endpoint (started by run)
+        self.metrics_server = None
+
+        # Shared-memory ring of recent samples for the dashboard (opened by run)
+        self.live_feed_file = live_feed
+        self.live = None
+
+    def start_metrics(self):
+        if METRICS_PORT and self.metrics_server is None:
+            try:
+                self.metrics_server = start_metrics_server(METRICS_PORT, METRICS_HOST)
+                print(f"Metrics endpoint: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+            except OSError as e:
+                print(f"Metrics endpoint disabled: {e}")
+
+    def start_live_feed(self):
+        if self.live_feed_file and self.live is None:
+            try:
+                self.live = SharedSeriesRing(self.live_feed_file, writer=True)
+            except OSError as e:
+                print(f"Live feed disabled: {e}")
 
     async def run(self):
         print("HealthGuard AI Orchestrator Running...")
-        
+        self.start_metrics()
+        self.start_live_feed()
+        self.alerts.start()
+        RULES.watch()
+
+        try:
+            await self._loop()
+        finally:
+            await self.shutdown()
+
+    async def shutdown(self):
+        # Stop the workers (cancelling in-flight incidents), then flush alerts and buffered metrics
+        self.stopping = True
+        for task in self.pending:
+            task.cancel()
+        await asyncio.gather(*self.pending, return_exceptions=True)
+        await self.llm_diagnoser.close()
+        await self.fixer.close()
+        await self.alerts.stop()
+        RULES.stop()
+        await self.db.close()
+        if self.live:
+            self.live.close()
+            self.live = None
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+            self.metrics_server = None
+
+    async def _loop(self):
         while True:
-            # 1. Monitor
-            metrics, logs = await self.monitor.collect()
+            # Loop time (not time.monotonic) so benchmarks can run on a virtual clock
+            loop = asyncio.get_running_loop()
+            tick_start = loop.time()
+            work_start = time.perf_counter()
+
+            # 1. Monitor (adaptive: only the collectors and series that are due)
+            if SAMPLING_MODE == "adaptive":
+                batch, logs = await self.monitor.collect_due(tick_start)
+            else:
+                batch, logs = await self.monitor.collect_batch()
+            collected = time.perf_counter()
+            COLLECT_SECONDS.observe(collected - work_start)
             
-            # Log metrics to DB
-            for m in metrics:
-                self.db.log_metric(m.component.value, m.name, m.value)
+            # Publish to the live feed (in place, microseconds) and log to DB
+            if self.live:
+                self.live.publish(batch)
+            self.db.log_batch(batch)
             
             # 2. Detect
-            anomalies = await self.detector.detect(metrics)
+            detect_start = time.perf_counter()
+            anomalies = await self.detector.detect_batch(batch)
+            DETECT_SECONDS.observe(time.perf_counter() - detect_start)
+            ANOMALIES_PER_TICK.observe(len(anomalies))
+            ANOMALIES_TOTAL.inc(len(anomalies))
             
             if anomalies:
-                print(f"⚠️ Detected {len(anomalies)} anomalies. Starting resolution pipeline...")
-                send_slack_alert(f"⚠️ Anomaly Detected! Count: {len(anomalies)}")
-                
-                for anomaly in anomalies:
-                    # 3. Diagnose (Combine Standard + LLM)
-                    diagnosis = await self.llm_diagnoser.diagnose(anomaly, logs)
-                    print(f"🧠 Diagnosis: {diagnosis.root_cause}")
-                    
-                    # 4. Fix
-                    fix = await self.fixer.fix(diagnosis)
-                    print(f"🛠️ Applying Fix: {fix.action}")
-                    
-                    # 5. Verify
-                    await asyncio.sleep(2) 
-                    new_metrics, _ = await self.monitor.collect()
-                    verification = await self.verifier.verify(new_metrics)
-                    
-                    # 6. Report
-                    incident_id = f"INC-{int(time.time())}"
-                    status = IncidentStatus.RESOLVED if verification["healthy"] else IncidentStatus.FAILED
-                    
-                    report = IncidentReport(
-                        id=incident_id,
-                        anomaly=anomaly,
-                        diagnosis=diagnosis,
-                        fix=fix,
-                        verification=verification,
-                        duration=0.0, 
-                        status=status
-                    )
-                    
-                    report_str = self.reporter.generate(report)
-                    print(report_str)
-                    
-                    # Add to history and DB
-                    self.incidents.append(report)
-                    self.db.log_incident(report, report_str)
-                    
-                    # Notify Slack
-                    if verification["healthy"]:
-                        send_slack_alert(f"✅ Incident {incident_id} Resolved! Cause: {diagnosis.root_cause}")
-                    else:
-                        send_slack_alert(f"❌ Incident {incident_id} Failed to resolve.")
-
-            # Sleep before next cycle
-            await asyncio.sleep(5)
+                self.open_incidents(anomalies, logs, loop.time())
+
+            CYCLE_SECONDS.observe(time.perf_counter() - work_start)
+            INCIDENTS_IN_FLIGHT.set(len(self.queue) + self.busy)
+            ALERT_QUEUE_DEPTH.set(self.alerts.queue_depth())
+
+            # Sleep until the next series is due (or the next fixed tick)
+            next_due = self.monitor.next_due() if SAMPLING_MODE == "adaptive" else None
+            if next_due is None:
+                next_due = tick_start + MONITOR_INTERVAL
+            await asyncio.sleep(max(0.0, next_due - loop.time()))
+
+    async def run_sharded(self, targets):
+        """Coordinator mode: worker processes monitor `targets`, incidents are handled here."""
+        print(f"HealthGuard AI Coordinator Running ({len(targets)} targets)...")
+        runtime = ShardedRuntime(targets)
+        # Targets are collected by the workers, so verification must ask them
+        self.probe = runtime.collect_metric
+        self.start_metrics()
+        self.alerts.start()
+        RULES.watch()
+
+        async def on_anomaly(anomaly):
+            self.open_incidents([anomaly], [], asyncio.get_running_loop().time())
+
+        try:
+            await runtime.run(on_anomaly)
+        finally:
+            await self.shutdown()
+
+    def alert_anomaly(self, anomaly):
+        # Bursts on one component collapse into a single summary message
+        self.alerts.submit(
+            f"⚠️ Anomaly Detected! {anomaly.component.value}.{anomaly.metric} = {anomaly.value:.2f} ({anomaly.severity.value})",
+            key=anomaly.component.value, noun="anomalies"
+        )
+
+    def open_incidents(self, anomalies, logs, now):
+        # Anomalies related to an open incident just join it; only new incidents run the pipeline
+        incidents = self.correlator.ingest(anomalies, now)
+        correlated = len(anomalies) - len(incidents)
+        ANOMALIES_CORRELATED.inc(correlated)
+        INCIDENTS_OPEN.set(self.correlator.open_count())
+
+        if incidents:
+            print(f"⚠️ Detected {len(anomalies)} anomalies ({correlated} joined open incidents). "
+                  f"Queueing {len(incidents)} incident(s) for resolution...")
+        for incident in incidents:
+            self.alert_anomaly(incident.primary)
+            self.dispatch(incident, logs)
+
+    def dispatch(self, incident, logs):
+        # Queued, not run inline, so monitoring keeps its cadence during a storm
+        if not self.pending:
+            for i in range(MAX_CONCURRENT_INCIDENTS):
+                task = asyncio.create_task(self.incident_worker(), name=f"incident-worker-{i}")
+                self.pending.add(task)
+                task.add_done_callback(self.pending.discard)
+        self.queue.put(incident, logs, asyncio.get_running_loop().time())
+        INCIDENTS_IN_FLIGHT.set(len(self.queue) + self.busy)
+
+    def discard(self, incident):
+        # Shed by the queue: merged into another queued incident or dropped
+        self.correlator.close(incident)
+        INCIDENTS_OPEN.set(self.correlator.open_count())
+
+    async def incident_worker(self):
+        # A cancel that lands as an inner wait_for finishes is swallowed on
+        # Python < 3.12, so don't rely on it alone to end the loop
+        while not self.stopping:
+            incident, logs = await self.queue.get()
+            self.busy += 1
+            try:
+                await self.handle_incident(incident, logs)
+            finally:
+                self.busy -= 1
+                INCIDENTS_IN_FLIGHT.set(len(self.queue) + self.busy)
+
+    async def handle_incident(self, incident, logs):
+        anomaly = incident.primary
+        try:
+            await self._resolve(incident, logs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            INCIDENTS_ERRORED.inc()
+            print(f"Incident pipeline error ({anomaly.target}/{anomaly.component.value}.{anomaly.metric}): {e}")
+        finally:
+            self.correlator.close(incident)
+            INCIDENTS_OPEN.set(self.correlator.open_count())
+
+    async def _resolve(self, incident, logs):
+        anomaly = incident.primary
+        clock = asyncio.get_running_loop().time
+        started = clock()
+        timings = {}
+
+        def lap(stage, since):
+            now = clock()
+            timings[stage] = now - since
+            STAGE_SECONDS[stage].observe(now - since)
+            return now
+
+        # 3. Diagnose (Combine Standard + LLM)
+        t = clock()
+        diagnosis = await self.llm_diagnoser.diagnose(anomaly, logs)
+        t = lap("diagnose", t)
+        print(f"🧠 Diagnosis: {diagnosis.root_cause}")
+
+        # 4. Fix (the fixer runs it; repeats on the same target share one run)
+        fix = await self.fixer.submit(diagnosis, anomaly)
+        t = lap("fix", t)
+        print(f"🛠️ Applying Fix: {fix.action} on {fix.target} ({fix.status.value})")
+
+        # 5. Verify (only samples of the anomaly's own target count)
+        if VERIFY_MODE == "adaptive":
+            verification = await self.verifier.verify_recovery(
+                self.probe, anomaly.component, anomaly.metric, anomaly.target
+            )
+        else:
+            # One re-check of the series after a fixed wait
+            await asyncio.sleep(2)
+            verification = await self.verifier.verify_recovery(
+                self.probe, anomaly.component, anomaly.metric, anomaly.target, deadline=0, required=1
+            )
+        t = lap("verify", t)
+
+        # 6. Report (covers every anomaly that joined while the pipeline ran)
+        incident_id = incident.id
+        status = IncidentStatus.RESOLVED if verification["healthy"] else IncidentStatus.FAILED
+
+        report = IncidentReport(
+            id=incident_id,
+            anomaly=anomaly,
+            diagnosis=diagnosis,
+            fix=fix,
+            verification=verification,
+            duration=clock() - started,
+            status=status,
+            timings=timings,
+            related=incident.related
+        )
+
+        # Stored as a structured record; full reports are rendered when someone asks for one
+        print(self.reporter.summary(report))
+        self.incidents.append(report)
+        self.db.log_incident(report)
+
+        (INCIDENTS_RESOLVED if verification["healthy"] else INCIDENTS_FAILED).inc()
+        finished = INCIDENTS_RESOLVED.value + INCIDENTS_FAILED.value
+        FIX_SUCCESS_RATIO.set(INCIDENTS_RESOLVED.value / finished)
 
+        # Notify Slack
+        if verification["healthy"]:
+            self.alerts.submit(
+                f"✅ Incident {incident_id} Resolved! Cause: {diagnosis.root_cause}",
+                key=f"{anomaly.component.value} (resolved)", noun="incidents resolved"
+            )
+        else:
+            self.alerts.submit(
+                f"❌ Incident {incident_id} Failed to resolve.",
+                key=f"{anomaly.component.value} (failed)", noun="incidents failed"
+            )
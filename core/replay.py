@@ -0,0 +1,214 @@
+import json
+import os
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from agents.detector import DetectorAgent
+from agents.streaming_detector import StreamingDetectorAgent
+from agents.llm_diagnoser import LLMDiagnoserAgent, SimulatedLLMBackend
+from agents.fixer import FixerAgent
+from agents.verifier import VerifierAgent
+from core.archive import MetricArchive, archive_dir
+from core.batch import MetricBatch
+from core.models import Metric, Component
+from core.sketch import WindowedSketches
+
+
+def to_datetime(ts):
+    if isinstance(ts, datetime):
+        return ts
+    if isinstance(ts, (int, float)):
+        return datetime.fromtimestamp(ts)
+    try:
+        return datetime.fromtimestamp(float(ts))
+    except ValueError:
+        return datetime.fromisoformat(ts)
+
+
+def metric_from_record(record, default_ts=None):
+    return Metric(
+        Component(record["component"]),
+        record["name"],
+        float(record["value"]),
+        to_datetime(record.get("timestamp", default_ts)),
+        record.get("target", "local"),
+    )
+
+
+def iter_file_metrics(path):
+    """
+    Stream Metrics from recorded telemetry without loading the whole file.
+    `.jsonl` lines may be snapshots shaped like system_state.json
+    ({"timestamp", "metrics": [...]}) or single metric records; a `.json`
+    file is read as one snapshot.
+    """
+    if path.endswith(".json"):
+        with open(path) as f:
+            snapshot = json.load(f)
+        for record in snapshot.get("metrics", []):
+            yield metric_from_record(record, snapshot.get("timestamp"))
+        return
+
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "metrics" in record:
+                for m in record["metrics"]:
+                    yield metric_from_record(m, record.get("timestamp"))
+            elif "component" in record:
+                yield metric_from_record(record)
+
+
+def iter_archive_metrics(archive, start=None, end=None, chunk=5000):
+    """Stream Metrics from a MetricArchive in time order, one memory-mapped partition at a time."""
+    for series, codes, timestamps, values in archive.scan(start, end):
+        order = np.argsort(timestamps, kind="stable")
+        kinds = [(Component(component), name) for component, name in series]
+        for lo in range(0, len(order), chunk):
+            rows = order[lo:lo + chunk]
+            for code, ts, value in zip(codes[rows].tolist(), timestamps[rows].tolist(), values[rows].tolist()):
+                component, name = kinds[code]
+                yield Metric(component, name, value, to_datetime(ts))
+
+
+def iter_db_metrics(db_file, start=None, end=None, chunk=5000):
+    """
+    Stream Metrics from the `metrics` table in time order, `chunk` rows at a
+    time, preceded by anything in range that has moved to the DB's archive.
+    """
+    path = archive_dir(db_file)
+    if os.path.exists(path):
+        archive = MetricArchive(path)
+        if archive.watermark is not None and (start is None or start < archive.watermark):
+            upto = archive.watermark if end is None else min(end, archive.watermark)
+            yield from iter_archive_metrics(archive, start, upto, chunk)
+            start = archive.watermark
+
+    conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    try:
+        query = "SELECT timestamp, component, name, value FROM metrics"
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("timestamp < ?")
+            params.append(end)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        cursor = conn.execute(query + " ORDER BY timestamp, id", params)
+        while True:
+            rows = cursor.fetchmany(chunk)
+            if not rows:
+                break
+            for ts, component, name, value in rows:
+                yield Metric(Component(component), name, value, to_datetime(ts))
+    finally:
+        conn.close()
+
+
+def group_ticks(metrics):
+    """Group a time-ordered Metric stream into ticks (one list per distinct second)."""
+    tick, tick_key = [], None
+    for m in metrics:
+        key = int(m.timestamp.timestamp())
+        if key != tick_key and tick:
+            yield tick
+            tick = []
+        tick_key = key
+        tick.append(m)
+    if tick:
+        yield tick
+
+
+class ReplayEngine:
+    """
+    Streams recorded ticks through the detector, and optionally the rest of
+    the pipeline, as fast as possible. Run it under core.virtual_time so the
+    fixer's simulated sleeps cost nothing. Verification uses the next
+    recorded tick, since that is what the system actually did next.
+
+    Quantile rules are judged on the replay's own windowed sketches, fed
+    each tick before detection. Their windows follow the recorded
+    timestamps, so a replay sees the same p95s the live path saw.
+    """
+    def __init__(self, detector="threshold", pipeline=False):
+        self.sketches = WindowedSketches()
+        self.detector = (StreamingDetectorAgent() if detector == "streaming"
+                         else DetectorAgent(sketches=self.sketches))
+        self.pipeline = pipeline
+        if pipeline:
+            self.diagnoser = LLMDiagnoserAgent(backend=SimulatedLLMBackend(latency=0), batch_mode=False)
+            self.fixer = FixerAgent()
+            self.verifier = VerifierAgent(sketches=self.sketches)
+
+        self.ticks = 0
+        self.samples = 0
+        self.detections = Counter()  # (component.metric, severity) -> count
+        self.recovered = 0
+        self.not_recovered = 0
+        self.first_ts = None
+        self.last_ts = None
+
+    async def run(self, ticks):
+        start = time.perf_counter()
+        pending = []  # anomalies waiting for the next tick to verify against
+
+        for tick in ticks:
+            batch = MetricBatch.from_metrics(tick)
+            self.sketches.update(batch)
+            if pending:
+                await self._finish(pending, tick)
+                pending = []
+
+            self.ticks += 1
+            self.samples += len(tick)
+            self.first_ts = self.first_ts or tick[0].timestamp
+            self.last_ts = tick[-1].timestamp
+
+            anomalies = await self.detector.detect_batch(batch)
+            for a in anomalies:
+                self.detections[(f"{a.component.value}.{a.metric}", a.severity.value)] += 1
+            if self.pipeline:
+                pending = anomalies
+
+        return self.report(time.perf_counter() - start)
+
+    async def _finish(self, anomalies, next_tick):
+        for anomaly in anomalies:
+            diagnosis = await self.diagnoser.diagnose(anomaly, [])
+            await self.fixer.fix(diagnosis, anomaly)
+            # Only the affected series decides recovery
+            follow_up = [m for m in next_tick
+                         if m.component == anomaly.component and m.name == anomaly.metric
+                         and m.target == anomaly.target]
+            verification = await self.verifier.verify(follow_up)
+            if verification["healthy"]:
+                self.recovered += 1
+            else:
+                self.not_recovered += 1
+
+    def report(self, wall_seconds):
+        span = (self.last_ts - self.first_ts).total_seconds() if self.first_ts else 0.0
+        return {
+            "ticks": self.ticks,
+            "samples": self.samples,
+            "detections": sum(self.detections.values()),
+            "by_series": {
+                f"{series} [{severity}]": count
+                for (series, severity), count in sorted(self.detections.items())
+            },
+            "recovered": self.recovered if self.pipeline else None,
+            "not_recovered": self.not_recovered if self.pipeline else None,
+            "recorded_span_seconds": span,
+            "wall_seconds": wall_seconds,
+            "samples_per_s": self.samples / wall_seconds if wall_seconds else 0.0,
+            "speedup": span / wall_seconds if wall_seconds else 0.0,
+        }
@@ -0,0 +1,263 @@
+import json
+import os
+import re
+import threading
+from fnmatch import translate
+
+import numpy as np
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from config.settings import THRESHOLDS, RECOVERY_LIMITS, SEVERITY_BANDS, QUANTILE_RULES, RULES_FILE
+from core.batch import SERIES
+from core.models import Severity
+
+# Severity codes used by the compiled index (index into SEVERITIES)
+SEVERITIES = (Severity.MEDIUM, Severity.HIGH, Severity.CRITICAL)
+MEDIUM, HIGH, CRITICAL = range(3)
+
+FIELDS = ("threshold", "recovery", "medium", "critical", "quantile", "window")
+
+
+class Rule:
+    """
+    One config entry: a `series` pattern ("cpu.usage", "*.latency") and an
+    optional `target` pattern ("web-*"), both fnmatch-style, plus any of
+    `threshold`, `recovery`, `medium` and `critical` (severity bands as
+    multiples of the threshold), and `quantile`/`window` to judge the series
+    on e.g. its p95 over the last 60 seconds rather than on each sample.
+    """
+    __slots__ = ("series", "target", "values", "rank", "_series_re", "_target_re")
+
+    def __init__(self, series, target="*", order=0, **values):
+        unknown = set(values) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown rule field(s) for {series!r}: {', '.join(sorted(unknown))}")
+        self.series = series
+        self.target = target
+        self.values = {k: float(v) for k, v in values.items() if v is not None}
+        self._series_re = re.compile(translate(series)).match
+        self._target_re = re.compile(translate(target)).match
+        # Most specific first: per-target rules over fleet-wide ones, exact
+        # names over patterns, longer literals, then later rules over earlier
+        self.rank = (
+            _specificity(target), _specificity(series),
+            len(target.replace("*", "")), len(series.replace("*", "")), order,
+        )
+
+    def matches(self, key, target):
+        return self._series_re(key) is not None and self._target_re(target) is not None
+
+
+def _specificity(pattern):
+    if pattern == "*":
+        return 0
+    return 1 if any(c in pattern for c in "*?[") else 2
+
+
+def default_rules():
+    """Rules equivalent to THRESHOLDS / RECOVERY_LIMITS / SEVERITY_BANDS / QUANTILE_RULES in settings."""
+    rules = [Rule("*", **SEVERITY_BANDS)]
+    for key in sorted(set(THRESHOLDS) | set(RECOVERY_LIMITS) | set(QUANTILE_RULES)):
+        rules.append(Rule(
+            key, threshold=THRESHOLDS.get(key), recovery=RECOVERY_LIMITS.get(key), **QUANTILE_RULES.get(key, {})
+        ))
+    return rules
+
+
+def load_rules(path):
+    """
+    Parse a rules file: {"rules": [{"series": ..., "target": ..., ...}, ...]}.
+    Its rules are layered over the settings defaults, so a file only needs
+    the overrides.
+    """
+    with open(path) as f:
+        config = json.load(f)
+    rules = default_rules()
+    for entry in config.get("rules", []):
+        entry = dict(entry)
+        rules.append(Rule(entry.pop("series"), entry.pop("target", "*"), order=len(rules), **entry))
+    return rules
+
+
+class RuleSet:
+    """
+    An immutable rule list compiled into per-series-id arrays (NaN = no
+    value), so evaluating a whole MetricBatch is a few array operations.
+    Series interned after compilation are resolved on first use.
+    """
+    def __init__(self, rules, registry=SERIES):
+        self.rules = sorted(rules, key=lambda r: r.rank, reverse=True)
+        self.registry = registry
+        self.lock = threading.Lock()
+        self.arrays = {field: np.empty(0) for field in FIELDS}
+
+    def resolve(self, key, target):
+        """Most specific value per field for one series."""
+        resolved = {}
+        for rule in self.rules:
+            if len(resolved) == len(FIELDS):
+                break
+            if rule.matches(key, target):
+                for field, value in rule.values.items():
+                    resolved.setdefault(field, value)
+        return resolved
+
+    def compiled(self):
+        arrays = self.arrays
+        n = len(self.registry)
+        if len(arrays["threshold"]) == n:
+            return arrays
+
+        with self.lock:
+            arrays = self.arrays
+            start = len(arrays["threshold"])
+            n = len(self.registry)
+            if start < n:
+                reg = self.registry
+                new = [self.resolve(reg.keys[sid], reg.targets[sid]) for sid in range(start, n)]
+                arrays = {
+                    field: np.concatenate([arrays[field], np.array(
+                        [r.get(field, np.nan) for r in new], dtype=np.float64
+                    )])
+                    for field in FIELDS
+                }
+                # Readers see either the old or the new dict, never a mix
+                self.arrays = arrays
+        return arrays
+
+    def lookup(self, field, ids):
+        return self.compiled()[field][ids]
+
+    def value(self, field, component, name, target="local"):
+        """Single-series lookup, e.g. one recovery limit while verifying."""
+        return self.resolve(f"{component.value}.{name}", target).get(field)
+
+    def observed(self, batch, sketches=None):
+        """
+        The value each row is judged on: the raw sample, or for series with a
+        `quantile` rule that quantile over the rule's window from `sketches`
+        (core/sketch.py) as of the row's timestamp.
+        """
+        if sketches is None:
+            return batch.values
+        arrays = self.compiled()
+        quantile = arrays["quantile"][batch.ids]
+        rows = np.flatnonzero(quantile > 0)
+        if not len(rows):
+            return batch.values
+        window = arrays["window"][batch.ids[rows]]
+        window = np.where(np.isnan(window), sketches.slot_seconds, window)
+        estimate = sketches.quantile(batch.ids[rows], quantile[rows], window, batch.timestamps[rows])
+        values = batch.values.copy()
+        values[rows] = np.where(np.isnan(estimate), values[rows], estimate)
+        return values
+
+    def evaluate(self, batch, sketches=None):
+        """
+        Vectorized threshold check over a batch.
+        Returns (row indices over threshold, their thresholds, severity codes,
+        the values judged: raw samples or windowed quantiles, see observed()).
+        """
+        arrays = self.compiled()
+        threshold = arrays["threshold"][batch.ids]
+        observed = self.observed(batch, sketches)
+        # NaN (no threshold) compares False, so unknown series never fire
+        rows = np.flatnonzero(observed > threshold)
+        if not len(rows):
+            return rows, threshold[rows], np.empty(0, dtype=np.int64), observed[rows]
+
+        ids = batch.ids[rows]
+        values = observed[rows]
+        limit = threshold[rows]
+        severity = np.select(
+            [values > limit * arrays["critical"][ids], values < limit * arrays["medium"][ids]],
+            [CRITICAL, MEDIUM],
+            HIGH,
+        )
+        return rows, limit, severity, values
+
+
+class _ReloadHandler(FileSystemEventHandler):
+    # Only changes; reading the file ourselves raises "opened" events too
+    EVENTS = ("created", "modified", "moved", "closed")
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def on_any_event(self, event):
+        if event.event_type not in self.EVENTS:
+            return
+        paths = {getattr(event, "src_path", None), getattr(event, "dest_path", None)}
+        if os.path.abspath(self.engine.path) in {os.path.abspath(p) for p in paths if p}:
+            self.engine.reload(only_if_changed=True)
+
+
+class RuleEngine:
+    """
+    Holds the live RuleSet. `reload()` compiles a new one off to the side and
+    swaps the reference, so detectors mid-tick keep the set they started
+    with. `watch()` reloads whenever the rules file changes.
+    """
+    def __init__(self, path=RULES_FILE, registry=SERIES):
+        self.path = path
+        self.registry = registry
+        self.observer = None
+        self.stamp = self._stamp()
+        self.current = RuleSet(self._load(), registry)
+        # A forked child (shard worker) inherits `observer` but not its
+        # thread; forget it there so the child's watch() starts its own
+        os.register_at_fork(after_in_child=self._forget_observer)
+
+    def _forget_observer(self):
+        self.observer = None
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except (OSError, TypeError):
+            return None
+
+    def _load(self):
+        if self.path and os.path.exists(self.path):
+            return load_rules(self.path)
+        return default_rules()
+
+    def reload(self, only_if_changed=False):
+        # One save usually fires several events; compile once per change
+        stamp = self._stamp()
+        if only_if_changed and (stamp == self.stamp or (stamp and stamp[1] == 0)):
+            return False  # unchanged, or truncated mid-save
+        self.stamp = stamp
+        try:
+            rules = RuleSet(self._load(), self.registry)
+            rules.compiled()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # Keep serving the previous rules rather than dropping detection
+            print(f"Rules reload failed ({self.path}): {e}")
+            return False
+        self.current = rules
+        print(f"Rules reloaded from {self.path}")
+        return True
+
+    def watch(self):
+        if self.observer or not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.isdir(directory):
+            return
+        self.observer = Observer()
+        self.observer.daemon = True
+        self.observer.schedule(_ReloadHandler(self), directory, recursive=False)
+        self.observer.start()
+
+    def stop(self):
+        if self.observer:
+            self.observer.stop()
+            self.observer.join(timeout=2)
+            self.observer = None
+
+
+# Process-wide rules, shared by the detector and verifier
+RULES = RuleEngine()
@@ -0,0 +1,116 @@
+import heapq
+import itertools
+
+import numpy as np
+
+from config.settings import (
+    MONITOR_INTERVAL, SAMPLE_MIN_INTERVAL, SAMPLE_MAX_INTERVAL, SAMPLE_NEAR_RATIO, SAMPLE_VOLATILE_CV,
+    SAMPLE_BACKOFF, SAMPLE_SLACK,
+)
+from agents.streaming_detector import SeriesState
+from core.rules import RULES
+from core.instrumentation import Counter
+
+_samples = Counter("healthguard_samples_total", "Collected samples, by whether their series was due", ["outcome"])
+SAMPLES_KEPT = _samples.labels("kept")
+SAMPLES_SKIPPED = _samples.labels("skipped")
+
+
+class SamplingScheduler:
+    """
+    Per-series collection intervals, with collectors driven off a heap.
+
+    Each series gets an interval between `min_interval` and `max_interval`:
+    it tightens straight away when a sample comes within SAMPLE_NEAR_RATIO of
+    the series' threshold or the series is volatile (EWMA coefficient of
+    variation above SAMPLE_VOLATILE_CV), and relaxes by SAMPLE_BACKOFF per
+    sample once it is calm again.
+
+    A collector is due when the earliest series it produced last time is due.
+    When it runs, only the samples of series that are due (within `slack`)
+    are kept, so calm series cost neither storage nor detection even when
+    their collector reads everything in one go. A sample at or above
+    SAMPLE_NEAR_RATIO of its threshold is always kept (and tightens its
+    series at once), whether due or not, so collected evidence of an
+    incident is never thrown away. Collectors without series (log tails)
+    run every `initial` seconds.
+    """
+    def __init__(self, rules=RULES, min_interval=SAMPLE_MIN_INTERVAL, max_interval=SAMPLE_MAX_INTERVAL,
+                 initial=MONITOR_INTERVAL, slack=SAMPLE_SLACK):
+        self.rules = rules
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial = initial
+        self.slack = slack
+
+        self.state = SeriesState(seasonal_slots=0)
+        self.interval = np.empty(0)
+        self.due = np.empty(0)
+        self.heap = []               # (due, tiebreak, collector)
+        self.order = itertools.count()
+        self.stats = {"kept": 0, "skipped": 0}
+
+    def _grow(self, n):
+        if n <= len(self.interval):
+            return
+        extra = n - len(self.interval)
+        self.interval = np.concatenate((self.interval, np.full(extra, float(self.initial))))
+        self.due = np.concatenate((self.due, np.full(extra, -np.inf)))  # new series are due now
+        self.state.grow(n)
+
+    def add(self, collector, now):
+        heapq.heappush(self.heap, (now, next(self.order), collector))
+
+    def next_due(self):
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now):
+        """Collectors due at `now`, removed from the heap until rescheduled."""
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            due.append(heapq.heappop(self.heap)[2])
+        return due
+
+    def observe(self, collector, batch, now):
+        """
+        Account for one run of `collector`: update the intervals of the series
+        that were due or near their threshold, reschedule the collector, and
+        return just those rows.
+        """
+        if batch is None or not len(batch):
+            self.add(collector, now + self.initial)
+            return batch
+
+        ids = batch.ids
+        self._grow(int(ids.max()) + 1)
+        threshold = self.rules.current.lookup("threshold", ids)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = np.nan_to_num(batch.values / threshold, nan=0.0, posinf=0.0, neginf=0.0)
+        rows = np.flatnonzero((self.due[ids] <= now + self.slack) | (ratio >= SAMPLE_NEAR_RATIO))
+        self.stats["kept"] += len(rows)
+        self.stats["skipped"] += len(ids) - len(rows)
+        SAMPLES_KEPT.inc(len(rows))
+        SAMPLES_SKIPPED.inc(len(ids) - len(rows))
+
+        if len(rows):
+            # SeriesState wants one sample per series: use the last one
+            sids, last = np.unique(ids[rows][::-1], return_index=True)
+            values = batch.values[rows][::-1][last]
+            ratio = ratio[rows][::-1][last]
+            self.state.update(sids, values)
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                cv = np.sqrt(self.state.var[sids]) / np.maximum(np.abs(self.state.mean[sids]), 1e-9)
+            near = np.clip((ratio - SAMPLE_NEAR_RATIO) / (1.0 - SAMPLE_NEAR_RATIO), 0.0, 1.0)
+            volatile = np.where(self.state.count[sids] > 2, np.clip(cv / SAMPLE_VOLATILE_CV, 0.0, 1.0), 0.0)
+            urgency = np.maximum(near, volatile)
+
+            # Geometric between the bounds: urgency 0 -> max_interval, 1 -> min_interval
+            target = self.max_interval * (self.min_interval / self.max_interval) ** urgency
+            current = self.interval[sids]
+            interval = np.where(target < current, target, np.minimum(target, current * SAMPLE_BACKOFF))
+            self.interval[sids] = interval
+            self.due[sids] = now + interval
+
+        self.add(collector, float(self.due[ids].min()))
+        return batch.select(rows) if len(rows) < len(ids) else batch
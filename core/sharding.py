@@ -0,0 +1,174 @@
+import asyncio
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import time
+import zlib
+from config.settings import (
+    SIMULATION, MONITOR_INTERVAL, SHARD_WORKERS, DETECTOR_MODE, TARGET_PROBE_URL, COLLECTOR_TIMEOUT,
+)
+
+
+def shard_targets(targets, shards):
+    """Stable target -> shard assignment (same target always lands on the same worker)."""
+    buckets = [[] for _ in range(shards)]
+    for target in targets:
+        buckets[zlib.crc32(target.encode()) % shards].append(target)
+    return buckets
+
+
+def worker_collectors(targets):
+    from collectors.synthetic import SyntheticFleetCollector
+    from collectors.latency import LatencyProbeCollector
+
+    if SIMULATION:
+        return [SyntheticFleetCollector(targets)]
+    return [LatencyProbeCollector("api", TARGET_PROBE_URL.format(target=t), target=t) for t in targets]
+
+
+def worker_main(shard_id, targets, out_queue, stop_event, interval, collector_factory=None, requests=None):
+    """Process entry point: monitor/detect loop for one shard of targets."""
+    asyncio.run(_worker_loop(shard_id, targets, out_queue, stop_event, interval, collector_factory, requests))
+
+
+async def _worker_loop(shard_id, targets, out_queue, stop_event, interval, collector_factory, requests):
+    # Imported here so each worker process builds its own agents
+    from agents.monitor import MonitorAgent
+    from agents.detector import DetectorAgent
+    from agents.streaming_detector import StreamingDetectorAgent
+    from core.rules import RULES
+
+    monitor = MonitorAgent((collector_factory or worker_collectors)(targets))
+    detector = StreamingDetectorAgent() if DETECTOR_MODE == "streaming" else DetectorAgent()
+    # Each worker watches the rules file itself, so edits reach every shard
+    # (and picks up any edit made between the fork and this watch)
+    RULES.watch()
+    RULES.reload(only_if_changed=True)
+
+    while not stop_event.is_set():
+        tick_start = time.monotonic()
+        batch, _ = await monitor.collect_batch()
+        anomalies = await detector.detect_batch(batch)
+
+        # One message per tick: sample count for throughput, plus anomalies
+        out_queue.put(("tick", shard_id, len(batch), anomalies))
+
+        # Until the next tick, answer the coordinator's single-series re-checks
+        while not stop_event.is_set():
+            remaining = interval - (time.monotonic() - tick_start)
+            if remaining <= 0:
+                break
+            if requests is None:
+                await asyncio.sleep(remaining)
+                break
+            try:
+                request_id, component, name, target = await asyncio.to_thread(requests.get, True, remaining)
+            except queue.Empty:
+                break
+            metric = await monitor.collect_metric(component, name, target)
+            out_queue.put(("metric", request_id, metric))
+
+
+class ShardedRuntime:
+    """
+    Spreads targets across a process pool. Each worker runs its own
+    monitor/detect loop; anomalies flow back to this (coordinator) process.
+    `collect_metric` re-checks a series on the worker that owns its target,
+    since only that worker collects it.
+    """
+    def __init__(self, targets, workers=SHARD_WORKERS, interval=MONITOR_INTERVAL,
+                 collector_factory=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.shards = [s for s in shard_targets(targets, self.workers) if s]
+        self.interval = interval
+        self.collector_factory = collector_factory
+
+        self.queue = mp.Queue()
+        self.requests = [mp.Queue() for _ in self.shards]  # per-shard re-check requests
+        self.shard_of = {target: i for i, shard in enumerate(self.shards) for target in shard}
+        self.waiting = {}  # request id -> future for the worker's answer
+        self.request_ids = itertools.count()
+        self.stop_event = mp.Event()
+        self.processes = []
+
+        # Coordinator-side counters
+        self.samples = 0
+        self.anomalies = 0
+        self.ticks = 0
+        self.started = None
+
+    def start(self):
+        self.started = time.monotonic()
+        for shard_id, targets in enumerate(self.shards):
+            p = mp.Process(
+                target=worker_main,
+                args=(shard_id, targets, self.queue, self.stop_event, self.interval,
+                      self.collector_factory, self.requests[shard_id]),
+                name=f"healthguard-shard-{shard_id}",
+                daemon=True,
+            )
+            p.start()
+            self.processes.append(p)
+
+    def stop(self):
+        self.stop_event.set()
+        # Drain so workers blocked on a full pipe can exit
+        deadline = time.monotonic() + 5
+        while any(p.is_alive() for p in self.processes) and time.monotonic() < deadline:
+            try:
+                self.queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for p in self.processes:
+            if p.is_alive():
+                p.terminate()
+            p.join()
+        self.processes = []
+
+    async def collect_metric(self, component, name, target="local", timeout=None):
+        """
+        Sample one series on the worker that owns `target`; None if no worker
+        does or it does not answer within `timeout` (by default a tick plus
+        COLLECTOR_TIMEOUT, as it answers between ticks).
+        """
+        shard = self.shard_of.get(target)
+        if shard is None or not self.processes:
+            return None
+        request_id = next(self.request_ids)
+        future = self.waiting[request_id] = asyncio.get_running_loop().create_future()
+        self.requests[shard].put((request_id, component, name, target))
+        try:
+            return await asyncio.wait_for(future, timeout or self.interval + COLLECTOR_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.waiting.pop(request_id, None)
+
+    def throughput(self):
+        elapsed = time.monotonic() - self.started if self.started else 0
+        return self.samples / elapsed if elapsed > 0 else 0.0
+
+    async def run(self, on_anomaly, duration=None):
+        """Start workers and await `on_anomaly(anomaly)` for each anomaly they report."""
+        self.start()
+        try:
+            while duration is None or time.monotonic() - self.started < duration:
+                try:
+                    kind, *message = await asyncio.to_thread(self.queue.get, True, 0.5)
+                except queue.Empty:
+                    continue
+                if kind == "metric":
+                    request_id, metric = message
+                    future = self.waiting.get(request_id)
+                    if future is not None and not future.done():
+                        future.set_result(metric)
+                    continue
+                shard_id, samples, anomalies = message
+                self.ticks += 1
+                self.samples += samples
+                self.anomalies += len(anomalies)
+                for anomaly in anomalies:
+                    await on_anomaly(anomaly)
+        finally:
+            self.stop()
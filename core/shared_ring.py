@@ -0,0 +1,218 @@
+import mmap
+import os
+import time
+
+import numpy as np
+
+from config.settings import LIVE_FEED_FILE, LIVE_FEED_SERIES, LIVE_FEED_WINDOW
+
+MAGIC = b"HGRING01"
+KEY_BYTES = 96      # utf-8 "target/component.name", NUL padded
+HEADER_BYTES = 64
+READ_RETRIES = 100
+
+# Header fields: (offset, dtype)
+_LAYOUT = {
+    "window": (8, np.uint32),
+    "capacity": (12, np.uint32),
+    "seq": (16, np.uint64),       # seqlock: odd while the writer is mid-update
+    "n_series": (24, np.uint32),
+    "pid": (28, np.uint32),
+    "updated": (32, np.float64),  # epoch seconds of the last publish
+}
+
+
+def series_key(target, component, name):
+    component = getattr(component, "value", component)
+    return f"{target}/{component}.{name}"
+
+
+class SharedSeriesRing:
+    """
+    Fixed-layout, memory-mapped ring of the most recent `window` samples for
+    up to `capacity` series, written by one orchestrator process and read by
+    any number of local processes (dashboard sessions) without a DB query.
+
+    Layout: a 64-byte header, the key table (one NUL-padded key per slot),
+    per-slot write counters, then timestamps and values as [capacity, window]
+    arrays. Slot s's next sample goes to column counter[s] % window.
+
+    Consistency is a seqlock: the writer bumps `seq` to odd before touching
+    anything and back to even after, readers copy what they need and retry
+    if `seq` was odd or moved meanwhile. Slots are only ever appended, so a
+    key→slot map stays valid for the life of the file. The writer replaces
+    the file atomically on start; readers notice and remap.
+    """
+    def __init__(self, path=LIVE_FEED_FILE, capacity=LIVE_FEED_SERIES, window=LIVE_FEED_WINDOW, writer=False):
+        self.path = path
+        self.writer = writer
+        self.slots = {}            # key -> slot
+        self.slot_of = np.empty(0, dtype=np.int64)  # registry id -> slot (writer), -1 unassigned
+        self.dropped = False
+        if writer:
+            self._create(capacity, window)
+        self._map()
+
+    # --- mapping ---
+
+    @staticmethod
+    def size(capacity, window):
+        return HEADER_BYTES + capacity * (KEY_BYTES + 8) + capacity * window * 16
+
+    def _create(self, capacity, window):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.truncate(self.size(capacity, window))
+            f.write(MAGIC)
+            f.write(np.array([window, capacity], dtype=np.uint32).tobytes())
+        # Readers still mapping the old file keep a valid (now frozen) view until they remap
+        os.replace(tmp, self.path)
+
+    def _map(self):
+        with open(self.path, "r+b" if self.writer else "rb") as f:
+            st = os.fstat(f.fileno())
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if self.writer else mmap.ACCESS_READ)
+        self.file_id = (st.st_dev, st.st_ino)
+        buf = self.mm
+        if bytes(buf[:8]) != MAGIC:
+            raise ValueError(f"{self.path} is not a HealthGuard live feed")
+
+        def field(name):
+            offset, dtype = _LAYOUT[name]
+            return np.frombuffer(buf, dtype=dtype, count=1, offset=offset)
+
+        self.window = int(field("window")[0])
+        self.capacity = int(field("capacity")[0])
+        self.seq, self.n_series, self.pid, self.updated = (field(n) for n in ("seq", "n_series", "pid", "updated"))
+
+        cap, win = self.capacity, self.window
+        offset = HEADER_BYTES
+        self.keys = np.frombuffer(buf, dtype=f"S{KEY_BYTES}", count=cap, offset=offset)
+        offset += cap * KEY_BYTES
+        self.counters = np.frombuffer(buf, dtype=np.uint64, count=cap, offset=offset)
+        offset += cap * 8
+        self.timestamps = np.frombuffer(buf, dtype=np.int64, count=cap * win, offset=offset).reshape(cap, win)
+        offset += cap * win * 8
+        self.values = np.frombuffer(buf, dtype=np.float64, count=cap * win, offset=offset).reshape(cap, win)
+        self.slots = {}
+        if self.writer:
+            self.pid[0] = os.getpid()
+
+    def stale(self):
+        """True when the writer has replaced the file since it was mapped."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        return (st.st_dev, st.st_ino) != self.file_id
+
+    def remap(self):
+        self.close()
+        self._map()
+
+    def close(self):
+        # Views must go before the mmap can be closed
+        self.keys = self.counters = self.timestamps = self.values = None
+        self.seq = self.n_series = self.pid = self.updated = None
+        try:
+            self.mm.close()
+        except BufferError:
+            pass  # a caller still holds a view; the mapping goes with it
+
+    # --- writer ---
+
+    def _slots_for(self, batch):
+        registry = batch.registry
+        known = len(self.slot_of)
+        if known < len(registry):
+            self.slot_of = np.concatenate((self.slot_of, np.full(len(registry) - known, -1, dtype=np.int64)))
+        slots = self.slot_of[batch.ids]
+        missing = np.unique(batch.ids[slots < 0])
+        if len(missing):
+            for sid in missing:
+                n = int(self.n_series[0])
+                if n == self.capacity:
+                    if not self.dropped:
+                        print(f"Live feed full ({self.capacity} series); new series are not published")
+                        self.dropped = True
+                    break
+                key = series_key(registry.targets[sid], registry.components[sid], registry.names[sid])
+                self.keys[n] = key.encode()[:KEY_BYTES]
+                self.slot_of[sid] = n
+                self.n_series[0] = n + 1
+            slots = self.slot_of[batch.ids]
+        return slots
+
+    def publish(self, batch):
+        """Append one tick's samples (a MetricBatch); never blocks on readers."""
+        if not len(batch):
+            return
+        self.seq[0] += 1
+        try:
+            slots = self._slots_for(batch)
+            keep = slots >= 0
+            slots, values, timestamps = slots[keep], batch.values[keep], batch.timestamps[keep]
+
+            # Several samples of one series in a batch take consecutive columns
+            order = np.argsort(slots, kind="stable")
+            slots, values, timestamps = slots[order], values[order], timestamps[order]
+            first = np.searchsorted(slots, slots)
+            rank = np.arange(len(slots)) - first
+            columns = (self.counters[slots].astype(np.int64) + rank) % self.window
+            self.values[slots, columns] = values
+            self.timestamps[slots, columns] = timestamps
+
+            uniq, counts = np.unique(slots, return_counts=True)
+            self.counters[uniq] += counts.astype(np.uint64)
+            self.updated[0] = time.time()
+        finally:
+            self.seq[0] += 1
+
+    # --- readers ---
+
+    def _consistent(self, read):
+        for _ in range(READ_RETRIES):
+            before = int(self.seq[0])
+            if before & 1:
+                time.sleep(0.001)  # let a descheduled writer finish
+                continue
+            result = read()
+            if int(self.seq[0]) == before:
+                return result
+        raise TimeoutError(f"live feed {self.path} kept changing while being read")
+
+    def series(self):
+        """key -> slot for every published series (cached; slots never move)."""
+        n = int(self.n_series[0])
+        if n != len(self.slots):
+            keys = self._consistent(lambda: self.keys[:n].copy())
+            self.slots = {k.decode(): i for i, k in enumerate(keys)}
+        return self.slots
+
+    def read(self, key):
+        """(timestamps, values) of one series, oldest first; empty if unknown."""
+        slot = self.series().get(key)
+        if slot is None:
+            return np.empty(0, np.int64), np.empty(0)
+
+        def copy():
+            count = int(self.counters[slot])
+            n = min(count, self.window)
+            start = (count - n) % self.window
+            idx = (start + np.arange(n)) % self.window
+            return self.timestamps[slot, idx], self.values[slot, idx]
+        return self._consistent(copy)
+
+    def latest(self, key, default=None):
+        slot = self.series().get(key)
+        if slot is None:
+            return default
+
+        def last():
+            count = int(self.counters[slot])
+            return float(self.values[slot, (count - 1) % self.window]) if count else default
+        return self._consistent(last)
+
+    def age(self):
+        """Seconds since the writer last published."""
+        return time.time() - float(self.updated[0])
@@ -0,0 +1,254 @@
+import math
+import struct
+import threading
+
+import numpy as np
+
+from config.settings import (
+    SKETCH_ACCURACY, SKETCH_BINS, SKETCH_MIN_VALUE, SKETCH_SLOT_SECONDS, SKETCH_HORIZON, SKETCH_WINDOW_BINS,
+)
+from core.rules import RULES
+
+# DDSketch-style log buckets: bin i holds values in (MIN * GAMMA^(i-1), MIN * GAMMA^i],
+# so any quantile comes back within SKETCH_ACCURACY relative error. The bins are
+# a fixed range (values outside it clamp to the end bins), so every sketch has
+# the same shape and merging is adding counts.
+GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+BIN_VALUES = SKETCH_MIN_VALUE * 2 * GAMMA ** np.arange(SKETCH_BINS) / (GAMMA + 1)
+
+# Serialized form: accuracy, min value, first and last+1 non-empty bin, then uint32 counts
+_HEADER = struct.Struct("<ffHH")
+
+
+def bin_index(values):
+    values = np.maximum(np.asarray(values, dtype=np.float64), SKETCH_MIN_VALUE)
+    idx = np.ceil(np.log(values / SKETCH_MIN_VALUE) / LOG_GAMMA).astype(np.int64)
+    return np.minimum(idx, SKETCH_BINS - 1)
+
+
+def quantiles(counts, q):
+    """q-quantile of each sketch along the last axis of `counts` (NaN where empty)."""
+    return _cumulative_quantiles(np.cumsum(counts, axis=-1), q)
+
+
+def _cumulative_quantiles(cum, q, offset=0):
+    # `offset`: global bin of column 0, for sketches holding a slice of the bins
+    total = cum[..., -1]
+    rank = np.asarray(q) * np.maximum(total - 1, 0)
+    idx = np.minimum((cum <= rank[..., None]).sum(axis=-1), cum.shape[-1] - 1)
+    return np.where(total > 0, BIN_VALUES[offset + idx], np.nan)
+
+
+class DDSketch:
+    """A single mergeable quantile sketch (fixed memory: SKETCH_BINS counters)."""
+    __slots__ = ("counts",)
+
+    def __init__(self, counts=None):
+        self.counts = np.zeros(SKETCH_BINS, dtype=np.int64) if counts is None else counts
+
+    @classmethod
+    def of(cls, values):
+        return cls(np.bincount(bin_index(values), minlength=SKETCH_BINS).astype(np.int64))
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def add(self, values):
+        self.counts += np.bincount(bin_index(values), minlength=SKETCH_BINS)
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def quantile(self, q):
+        value = quantiles(self.counts, q)
+        return None if np.isnan(value) else float(value)
+
+    def to_bytes(self):
+        nonzero = np.flatnonzero(self.counts)
+        lo, hi = (int(nonzero[0]), int(nonzero[-1]) + 1) if len(nonzero) else (0, 0)
+        header = _HEADER.pack(SKETCH_ACCURACY, SKETCH_MIN_VALUE, lo, hi)
+        return header + self.counts[lo:hi].astype(np.uint32).tobytes()
+
+    @classmethod
+    def from_bytes(cls, blob):
+        """None if the blob was written with different sketch settings."""
+        accuracy, min_value, lo, hi = _HEADER.unpack_from(blob)
+        if not (math.isclose(accuracy, SKETCH_ACCURACY, rel_tol=1e-6)
+                and math.isclose(min_value, SKETCH_MIN_VALUE, rel_tol=1e-6)) or hi > SKETCH_BINS:
+            return None
+        counts = np.zeros(SKETCH_BINS, dtype=np.int64)
+        counts[lo:hi] = np.frombuffer(blob, dtype=np.uint32, count=hi - lo, offset=_HEADER.size)
+        return cls(counts)
+
+
+class WindowedSketches:
+    """
+    Rolling sketches for every series whose rule asks for a quantile: a ring
+    of SKETCH_HORIZON / SKETCH_SLOT_SECONDS slot sketches per series, so
+    "p95 over the last 60s" is the merge of the slots inside that window.
+    Slots are keyed by sample timestamp, so replays and virtual clocks see
+    the same windows as live data.
+
+    To keep memory small (about 3.5 KB per series at the defaults), a series
+    only holds SKETCH_WINDOW_BINS consecutive bins starting at `lo[row]`,
+    shared by all its slots, with uint16 counts. A value above the window
+    slides it up and the bins that fall off the bottom fold into its first
+    bin, as DDSketch does when it collapses: high quantiles stay within
+    SKETCH_ACCURACY, and only quantiles below the window's floor (far under
+    a tail of interest) are overestimated.
+    """
+    WIDTH = SKETCH_WINDOW_BINS
+    MAX_COUNT = np.iinfo(np.uint16).max
+
+    def __init__(self, rules=RULES, slot_seconds=SKETCH_SLOT_SECONDS, horizon=SKETCH_HORIZON):
+        self.rules = rules
+        self.slot_seconds = slot_seconds
+        self.slots = max(1, math.ceil(horizon / slot_seconds))
+        self.row_of = np.empty(0, dtype=np.int64)  # series id -> row, -1 untracked
+        self.rows = 0
+        self.lo = np.zeros(0, dtype=np.int64)      # global bin of each row's first column, -1 unset
+        self.counts = np.zeros((0, self.slots, self.WIDTH), dtype=np.uint16)
+        self.epochs = np.zeros((0, self.slots), dtype=np.int64)  # slot number each slot holds
+        # Per series: cumulative counts of the completed slots of its last
+        # window, and the (epoch, span) they cover
+        self.base = np.zeros((0, self.WIDTH), dtype=np.int32)
+        self.base_key = np.zeros((0, 2), dtype=np.int64)
+        self.lock = threading.Lock()
+
+    def _rows_for(self, ids):
+        if len(self.row_of) <= ids.max():
+            grow = int(ids.max()) + 1 - len(self.row_of)
+            self.row_of = np.concatenate((self.row_of, np.full(grow, -1, dtype=np.int64)))
+        rows = self.row_of[ids]
+        new = np.unique(ids[rows < 0])
+        if len(new):
+            self.row_of[new] = np.arange(self.rows, self.rows + len(new))
+            self.rows += len(new)
+            if self.rows > len(self.counts):
+                capacity = max(self.rows, 2 * len(self.counts), 16)
+                self.lo = self._resize(self.lo, (capacity,), -1)
+                self.counts = self._resize(self.counts, (capacity, self.slots, self.WIDTH), 0)
+                self.epochs = self._resize(self.epochs, (capacity, self.slots), -1)
+                self.base = self._resize(self.base, (capacity, self.WIDTH), 0)
+                self.base_key = self._resize(self.base_key, (capacity, 2), -1)
+            rows = self.row_of[ids]
+        return rows
+
+    @staticmethod
+    def _resize(array, shape, fill):
+        out = np.full(shape, fill, dtype=array.dtype)
+        out[:len(array)] = array
+        return out
+
+    def _place(self, rows, bins):
+        """Set up windows for new rows and slide windows up past values above them."""
+        # A new series starts with its first value a quarter of the way up
+        unset = self.lo[rows] < 0
+        if unset.any():
+            first_rows, first = np.unique(rows[unset], return_index=True)
+            self.lo[first_rows] = np.clip(bins[unset][first] - self.WIDTH // 4, 0, SKETCH_BINS - self.WIDTH)
+
+        above = bins >= self.lo[rows] + self.WIDTH
+        if not above.any():
+            return
+        # Rare (a new high): leave a quarter of the window as headroom again
+        top = {}
+        for row, b in zip(rows[above].tolist(), bins[above].tolist()):
+            top[row] = max(top.get(row, b), b)
+        for row, b in top.items():
+            new_lo = min(b - 3 * self.WIDTH // 4, SKETCH_BINS - self.WIDTH)
+            shift = new_lo - int(self.lo[row])
+            old = self.counts[row].astype(np.int64)
+            moved = np.zeros_like(old)
+            moved[:, 0] = old[:, :shift + 1].sum(axis=1)
+            if shift + 1 < self.WIDTH:
+                moved[:, 1:self.WIDTH - shift] = old[:, shift + 1:]
+            self.counts[row] = np.minimum(moved, self.MAX_COUNT)
+            self.lo[row] = new_lo
+            self.base_key[row] = -1
+
+    def update(self, batch):
+        """Fold in the samples of series that have a quantile rule."""
+        if not len(batch):
+            return
+        quantile = self.rules.current.lookup("quantile", batch.ids)
+        keep = np.flatnonzero(quantile > 0)  # NaN (no rule) compares False
+        if not len(keep):
+            return
+        ids, values = batch.ids[keep], batch.values[keep]
+        epoch = batch.timestamps[keep] // self.slot_seconds
+        slot = epoch % self.slots
+        bins = bin_index(values)
+
+        with self.lock:
+            rows = self._rows_for(ids)
+            self._place(rows, bins)
+            # A slot last used for an older epoch starts over
+            stale = self.epochs[rows, slot] != epoch
+            if stale.any():
+                self.counts[rows[stale], slot[stale]] = 0
+                self.epochs[rows[stale], slot[stale]] = epoch[stale]
+            # Values under a row's window count in its first bin; counts saturate
+            column = np.maximum(bins - self.lo[rows], 0)
+            cells, added = np.unique((rows * self.slots + slot) * self.WIDTH + column, return_counts=True)
+            flat = self.counts.reshape(-1)
+            flat[cells] = np.minimum(flat[cells] + added, self.MAX_COUNT)
+            # Late samples land in a slot a cached base may already include
+            late = epoch < self.base_key[rows, 0]
+            if late.any():
+                self.base_key[rows[late]] = -1
+
+    def quantile(self, ids, q, window, now):
+        """
+        q-quantile over the last `window` seconds (up to the horizon) before
+        epoch second `now`, per series id; NaN where a series has no samples.
+
+        The completed slots of a window are summed (cumulatively) once per
+        slot period and cached per series, so a query only adds the current
+        slot to it.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        out = np.full(len(ids), np.nan)
+        with self.lock:
+            if not len(ids) or not len(self.row_of):
+                return out
+            known = ids < len(self.row_of)
+            rows = np.full(len(ids), -1, dtype=np.int64)
+            rows[known] = self.row_of[ids[known]]
+            tracked = np.flatnonzero(rows >= 0)
+            if not len(tracked):
+                return out
+            rows = rows[tracked]
+            now_epoch = np.broadcast_to(np.asarray(now, dtype=np.int64) // self.slot_seconds, ids.shape)[tracked]
+            span = np.clip(np.ceil(np.broadcast_to(window, ids.shape)[tracked] / self.slot_seconds),
+                           1, self.slots).astype(np.int64)
+
+            # Rebuild cached bases that are for another slot period or window
+            key = np.column_stack((now_epoch, span))
+            rebuild = np.flatnonzero((self.base_key[rows] != key).any(axis=1))
+            if len(rebuild):
+                r = rows[rebuild]
+                epochs = self.epochs[r]
+                older = (epochs > (now_epoch[rebuild] - span[rebuild])[:, None]) & (epochs < now_epoch[rebuild, None])
+                base = np.zeros((len(r), self.WIDTH), dtype=np.int32)
+                for s in range(self.slots):
+                    use = np.flatnonzero(older[:, s])
+                    if len(use):
+                        base[use] += self.counts[r[use], s]
+                self.base[r] = np.cumsum(base, axis=1, dtype=np.int32)
+                self.base_key[r] = key[rebuild]
+
+            cum = self.base[rows]
+            slot = now_epoch % self.slots
+            current = np.flatnonzero(self.epochs[rows, slot] == now_epoch)
+            cum[current] += np.cumsum(self.counts[rows[current], slot[current]], axis=1, dtype=np.int32)
+            lo = self.lo[rows]
+        out[tracked] = _cumulative_quantiles(cum, np.broadcast_to(q, ids.shape)[tracked], lo)
+        return out
+
+
+# Process-wide windowed sketches, fed by MonitorAgent and read by detection and verification
+SKETCHES = WindowedSketches()
@@ -0,0 +1,211 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import DB_READ_POOL_SIZE, DB_MAINTENANCE_INTERVAL
+from core.database import DatabaseManager, DB_FILE
+from core.instrumentation import Gauge
+
+STORAGE_PENDING_WRITES = Gauge(
+    "healthguard_storage_pending_writes", "Storage writes queued for the writer thread"
+).labels()
+
+
+class StorageBackend:
+    """
+    Storage used by the orchestrator and the dashboard.
+
+    Writes (`log_batch`, `log_metrics`, `log_incident`) only queue the work and
+    return a concurrent.futures.Future, so callers on the event loop never
+    wait on disk; `await flush()` when everything queued must be stored.
+    Batches and reports handed to them must not be modified afterwards.
+    Reads are coroutines. Implementations must let reads and writes proceed
+    independently of each other.
+    """
+    def log_batch(self, batch):
+        raise NotImplementedError
+
+    def log_metrics(self, rows):
+        raise NotImplementedError
+
+    def log_incident(self, report):
+        raise NotImplementedError
+
+    async def get_latest_metrics(self, limit=100):
+        raise NotImplementedError
+
+    async def get_metrics_since(self, last_id=None, limit=5000):
+        raise NotImplementedError
+
+    async def get_incidents(self, limit=10):
+        raise NotImplementedError
+
+    async def query_incidents(self, status=None, component=None, target=None, start=None, end=None,
+                              limit=50, before=None):
+        """(page of summaries, cursor for the next page or None)."""
+        raise NotImplementedError
+
+    async def get_incident(self, incident_id):
+        raise NotImplementedError
+
+    async def query_metrics(self, component, name, start, end=None, **kwargs):
+        raise NotImplementedError
+
+    async def query_quantile(self, component, name, start, end=None, q=0.95):
+        """(q-quantile, sample count) over [start, end)."""
+        raise NotImplementedError
+
+    async def flush(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    SQLite behind two executors: one writer thread that owns the read-write
+    DatabaseManager (schema, inserts, rollups and pruning all happen there),
+    and a pool of threads that each hold a read-only connection. WAL mode
+    lets the two sides run concurrently.
+    """
+    def __init__(self, db_file=DB_FILE, read_only=False, readers=DB_READ_POOL_SIZE):
+        self.db_file = db_file
+        self.read_only = read_only
+        self.writer = None
+        self.db = None
+
+        if read_only:
+            # Never create the database from a reader
+            if not os.path.exists(db_file):
+                raise FileNotFoundError(f"{db_file} does not exist yet")
+            # ...nor query a schema only the writer can migrate
+            probe = DatabaseManager(db_file, read_only=True)
+            try:
+                pending = probe.schema_pending()
+            finally:
+                probe.close()
+            if pending:
+                raise RuntimeError(f"{db_file} has not been migrated yet (missing {', '.join(pending)})")
+        else:
+            self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+            # Opened on the writer thread, so schema setup is off the caller's thread too
+            self.db = self.writer.submit(DatabaseManager, db_file).result()
+            self.last_maintenance = time.monotonic()
+
+        self.local = threading.local()
+        self.reader_dbs = []
+        self.reader_lock = threading.Lock()
+        self.readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="sqlite-reader")
+        self.pending_writes = 0
+        self.pending_lock = threading.Lock()
+
+    # --- writes (writer thread) ---
+
+    def _write(self, method, *args):
+        if self.writer is None:
+            raise PermissionError("storage is read-only")
+        if time.monotonic() - self.last_maintenance >= DB_MAINTENANCE_INTERVAL:
+            # Rollups and retention queue behind the writes, never on the caller
+            self.last_maintenance = time.monotonic()
+            self._submit_write(self.db.maintain)
+        return self._submit_write(getattr(self.db, method), *args)
+
+    def _submit_write(self, fn, *args):
+        self._count_pending(1)
+        future = self.writer.submit(fn, *args)
+        future.add_done_callback(lambda f: self._count_pending(-1))
+        return future
+
+    def _count_pending(self, delta):
+        with self.pending_lock:
+            self.pending_writes += delta
+            STORAGE_PENDING_WRITES.set(self.pending_writes)
+
+    def log_batch(self, batch):
+        # Even turning the batch into rows happens on the writer thread
+        return self._write("log_batch", batch)
+
+    def log_metrics(self, rows):
+        return self._write("log_metrics", list(rows))
+
+    def log_incident(self, report):
+        return self._write("log_incident", report)
+
+    async def flush(self):
+        if self.writer is not None:
+            # The writer is a single FIFO thread: a no-op lands after everything queued
+            await asyncio.wrap_future(self.writer.submit(lambda: None))
+
+    # --- reads (reader pool) ---
+
+    def _reader(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = self.local.db = DatabaseManager(self.db_file, read_only=True)
+            with self.reader_lock:
+                self.reader_dbs.append(db)
+        return db
+
+    async def _read(self, method, *args, **kwargs):
+        def call():
+            return getattr(self._reader(), method)(*args, **kwargs)
+        return await asyncio.wrap_future(self.readers.submit(call))
+
+    async def get_latest_metrics(self, limit=100):
+        return await self._read("get_latest_metrics", limit)
+
+    async def get_metrics_since(self, last_id=None, limit=5000):
+        return await self._read("get_metrics_since", last_id, limit)
+
+    async def get_incidents(self, limit=10):
+        return await self._read("get_incidents", limit)
+
+    async def query_incidents(self, status=None, component=None, target=None, start=None, end=None,
+                              limit=50, before=None):
+        return await self._read("query_incidents", status, component, target, start, end, limit, before)
+
+    async def get_incident(self, incident_id):
+        return await self._read("get_incident", incident_id)
+
+    async def query_metrics(self, component, name, start, end=None, **kwargs):
+        return await self._read("query_metrics", component, name, start, end, **kwargs)
+
+    async def query_quantile(self, component, name, start, end=None, q=0.95):
+        return await self._read("query_quantile", component, name, start, end, q)
+
+    async def close(self):
+        def shutdown():
+            self.readers.shutdown(wait=True)
+            with self.reader_lock:
+                for db in self.reader_dbs:
+                    db.close()
+                self.reader_dbs = []
+            if self.writer is not None:
+                # Drains queued writes first
+                self.writer.submit(self.db.close)
+                self.writer.shutdown(wait=True)
+        await asyncio.to_thread(shutdown)
+
+
+class BlockingStorage:
+    """
+    Synchronous view of any StorageBackend for code without an event loop
+    (the Streamlit dashboard): coroutine methods run on a private loop thread
+    and their results are returned directly.
+    """
+    def __init__(self, storage):
+        self.storage = storage
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="storage-loop", daemon=True).start()
+
+    def __getattr__(self, name):
+        method = getattr(self.storage, name)
+        if not asyncio.iscoroutinefunction(method):
+            return method
+
+        def call(*args, **kwargs):
+            return asyncio.run_coroutine_threadsafe(method(*args, **kwargs), self.loop).result()
+        return call
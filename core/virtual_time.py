@@ -0,0 +1,30 @@
+import asyncio
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop whose clock jumps straight to the next timer whenever nothing
+    is ready, so asyncio.sleep() and timeouts complete instantly. Used by
+    benchmarks and telemetry replay.
+    """
+    def __init__(self):
+        super().__init__()
+        self.virtual_now = 0.0
+
+    def time(self):
+        return self.virtual_now
+
+    def _run_once(self):
+        if not self._ready and self._scheduled:
+            when = self._scheduled[0]._when
+            if when > self.virtual_now:
+                self.virtual_now = when
+        super()._run_once()
+
+
+def run_virtual(coro):
+    loop = VirtualClockLoop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
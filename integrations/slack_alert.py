@@ -1,5 +1,11 @@
+import asyncio
+import time
 import requests
-from config.settings import SLACK_WEBHOOK_URL
+from requests.adapters import HTTPAdapter
+from config.settings import (
+    SLACK_WEBHOOK_URL, SLACK_QUEUE_SIZE, SLACK_RATE_LIMIT, SLACK_MAX_RETRIES,
+    SLACK_COALESCE_WINDOW,
+)
 
 def send_slack_alert(message):
     try:
@@ -12,3 +18,153 @@ def send_slack_alert(message):
         requests.post(SLACK_WEBHOOK_URL, json=payload, timeout=5)
     except Exception as e:
         print(f"Failed to send Slack alert: {e}")
+
+
+class AlertDispatcher:
+    """
+    Non-blocking Slack delivery for the orchestrator.
+
+    `submit()` never waits: messages go onto a bounded queue that a single
+    sender task drains through a pooled HTTP session, rate limited to
+    SLACK_RATE_LIMIT messages/sec and retried with exponential backoff.
+    Alerts submitted with a `key` are coalesced: the first one in a
+    SLACK_COALESCE_WINDOW is sent right away, the rest are folded into one
+    summary ("12 anomalies in the last 10s on database") when the window ends.
+    """
+    def __init__(self, webhook_url=SLACK_WEBHOOK_URL, queue_size=SLACK_QUEUE_SIZE,
+                 rate_limit=SLACK_RATE_LIMIT, max_retries=SLACK_MAX_RETRIES,
+                 coalesce_window=SLACK_COALESCE_WINDOW):
+        self.webhook_url = webhook_url
+        self.rate_limit = rate_limit
+        self.max_retries = max_retries
+        self.coalesce_window = coalesce_window
+
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.windows = {}  # key -> [deadline, suppressed count, noun, last message]
+        self.tasks = []
+
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+        # Token bucket for rate limiting
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+
+        self.stats = {
+            "sent": 0, "failed": 0, "dropped": 0, "coalesced": 0, "retries": 0,
+            "last_latency": 0.0, "avg_latency": 0.0,
+        }
+
+    def start(self):
+        self.tasks = [
+            asyncio.create_task(self._sender()),
+            asyncio.create_task(self._window_flusher()),
+        ]
+
+    async def stop(self, timeout=5):
+        # Flush open windows and give the sender a moment to drain the queue
+        self._flush_windows(force=True)
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.session.close()
+
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def submit(self, message, key=None, noun="alerts"):
+        if key is None:
+            self._enqueue(message)
+            return
+
+        window = self.windows.get(key)
+        if window is None:
+            self.windows[key] = [time.monotonic() + self.coalesce_window, 0, noun, message]
+            self._enqueue(message)
+        else:
+            window[1] += 1
+            window[3] = message
+            self.stats["coalesced"] += 1
+
+    def _enqueue(self, message):
+        try:
+            self.queue.put_nowait((message, time.monotonic()))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+
+    def _flush_windows(self, force=False):
+        now = time.monotonic()
+        for key, (deadline, count, noun, last) in list(self.windows.items()):
+            if not force and deadline > now:
+                continue
+            del self.windows[key]
+            if count:
+                self._enqueue(
+                    f"{count} more {noun} in the last {self.coalesce_window:.0f}s on {key}. Latest: {last}"
+                )
+
+    async def _window_flusher(self):
+        while True:
+            await asyncio.sleep(min(1.0, self.coalesce_window / 4))
+            self._flush_windows()
+
+    async def _take_token(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(1.0, self.tokens + (now - self.last_refill) * self.rate_limit)
+            self.last_refill = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self.tokens) / self.rate_limit)
+
+    async def _sender(self):
+        while True:
+            message, queued_at = await self.queue.get()
+            try:
+                delivered = await self._deliver(message)
+                if delivered:
+                    latency = time.monotonic() - queued_at
+                    self.stats["sent"] += 1
+                    self.stats["last_latency"] = latency
+                    self.stats["avg_latency"] += (latency - self.stats["avg_latency"]) / self.stats["sent"]
+                else:
+                    self.stats["failed"] += 1
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, message):
+        if "FAKE" in self.webhook_url:
+            # Don't actually send if it's the default fake URL
+            return True
+
+        delay = 0.5
+        for attempt in range(self.max_retries + 1):
+            await self._take_token()
+            try:
+                resp = await asyncio.to_thread(
+                    self.session.post, self.webhook_url, json={"text": message}, timeout=5
+                )
+                if resp.status_code < 400:
+                    return True
+                if resp.status_code != 429 and resp.status_code < 500:
+                    print(f"Failed to send Slack alert: HTTP {resp.status_code}")
+                    return False
+                # Rate limited or server error: honour Retry-After if given
+                retry_after = resp.headers.get("Retry-After")
+                wait = float(retry_after) if retry_after else delay
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Failed to send Slack alert: {e}")
+                wait = delay
+
+            if attempt < self.max_retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(wait)
+                delay *= 2
+        return False
@@ -1,5 +1,8 @@
+import argparse
 import asyncio
+import json
 from core.orchestrator import HealthGuardOrchestrator
+from config.settings import TARGETS, DETECTOR_MODE
 import sys
 import io
 
@@ -7,7 +10,47 @@ import io
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 
+def replay(args):
+    from core.replay import ReplayEngine, iter_db_metrics, iter_file_metrics, group_ticks
+    from core.database import DB_FILE
+    from core.virtual_time import run_virtual
+
+    if args.replay == "db":
+        metrics = iter_db_metrics(DB_FILE, args.since, args.until)
+    else:
+        metrics = iter_file_metrics(args.replay)
+
+    engine = ReplayEngine(detector=args.detector, pipeline=args.pipeline)
+    report = run_virtual(engine.run(group_ticks(metrics)))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"\n⏪ Replayed {report['samples']} samples in {report['ticks']} ticks "
+          f"({report['recorded_span_seconds']:.0f}s of history) in {report['wall_seconds']:.2f}s")
+    print(f"   Throughput: {report['samples_per_s']:,.0f} samples/sec ({report['speedup']:,.0f}x real time)")
+    print(f"   Detections: {report['detections']}")
+    for series, count in report["by_series"].items():
+        print(f"     {series:<32} {count}")
+    if args.pipeline:
+        print(f"   Recovered on next tick: {report['recovered']}, not recovered: {report['not_recovered']}")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HealthGuard AI")
+    parser.add_argument("--replay", metavar="SOURCE",
+                        help="replay recorded telemetry instead of monitoring: 'db' (with its archive) or a .json/.jsonl file")
+    parser.add_argument("--detector", choices=["threshold", "streaming"], default=DETECTOR_MODE)
+    parser.add_argument("--pipeline", action="store_true", help="also run diagnose/fix/verify during replay")
+    parser.add_argument("--since", type=int, help="replay from this epoch second (db source)")
+    parser.add_argument("--until", type=int, help="replay up to this epoch second (db source)")
+    parser.add_argument("--json", action="store_true", help="print the replay report as JSON")
+    args = parser.parse_args()
+
+    if args.replay:
+        replay(args)
+        sys.exit(0)
+
     print("\n🚀 HealthGuard AI System Starting...")
     print("Initialize Monitor... [OK]")
     print("Initialize Detector... [OK]")
@@ -19,6 +62,10 @@ if __name__ == "__main__":
     print("------------------------------------------------\n")
     
     try:
-        asyncio.run(HealthGuardOrchestrator().run())
+        orchestrator = HealthGuardOrchestrator()
+        if TARGETS:
+            asyncio.run(orchestrator.run_sharded(TARGETS))
+        else:
+            asyncio.run(orchestrator.run())
     except KeyboardInterrupt:
         print("\n🛑 System Shutting Down.")
@@ -0,0 +1,17 @@
+from config.settings import FIX_TIMEOUT
+
+
+class RemediationHandler:
+    """
+    Runs fix actions for FixerAgent.
+    Subclasses implement `run(action, params, target)`, returning a short
+    detail string on success and raising on failure. FixerAgent enforces
+    `timeout` and cancels `run` when it expires.
+    """
+    name = "handler"
+
+    def __init__(self, timeout=FIX_TIMEOUT):
+        self.timeout = timeout
+
+    async def run(self, action, params, target):
+        raise NotImplementedError
@@ -0,0 +1,48 @@
+import asyncio
+import os
+import signal
+from config.settings import FIX_COMMANDS
+from remediation.base import RemediationHandler
+
+
+class CommandHandler(RemediationHandler):
+    """
+    Runs each action as a subprocess. `commands` maps an action to an argv
+    template whose items are formatted with the action's parameters and
+    `target`, e.g. ["systemctl", "restart", "{service}"]. No shell is involved.
+    """
+    name = "command"
+
+    def __init__(self, commands=FIX_COMMANDS, **kwargs):
+        super().__init__(**kwargs)
+        self.commands = commands
+
+    def argv(self, action, params, target):
+        template = self.commands.get(action)
+        if not template:
+            raise LookupError(f"no command configured for {action}")
+        return [str(arg).format(target=target, **params) for arg in template]
+
+    async def run(self, action, params, target):
+        argv = self.argv(action, params, target)
+        proc = await asyncio.create_subprocess_exec(
+            *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True,  # own process group, so a kill reaches its children too
+        )
+        try:
+            output, _ = await proc.communicate()
+        except asyncio.CancelledError:
+            # Timed out (or shutting down): don't leave the process behind
+            if proc.returncode is None:
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                await proc.wait()
+            raise
+
+        text = output.decode(errors="replace").strip()
+        tail = text.splitlines()[-1] if text else ""
+        if proc.returncode != 0:
+            raise RuntimeError(f"{argv[0]} exited {proc.returncode}: {tail}")
+        return tail or f"{argv[0]} ok"
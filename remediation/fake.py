@@ -0,0 +1,26 @@
+import asyncio
+import random
+from config.settings import FIX_FAKE_LATENCY
+from remediation.base import RemediationHandler
+
+
+class FakeHandler(RemediationHandler):
+    """
+    Pretends to run every action: sleeps `latency` seconds and fails with
+    probability `fail_rate`. Runs are recorded in `calls` for inspection.
+    """
+    name = "fake"
+
+    def __init__(self, latency=FIX_FAKE_LATENCY, fail_rate=0.0, seed=None, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.calls = []  # (action, params, target)
+
+    async def run(self, action, params, target):
+        self.calls.append((action, params, target))
+        await asyncio.sleep(self.latency)
+        if self.rng.random() < self.fail_rate:
+            raise RuntimeError(f"simulated {action} failure on {target}")
+        return f"simulated {action} on {target}"
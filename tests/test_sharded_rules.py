@@ -0,0 +1,74 @@
+import asyncio
+import json
+import time
+
+from collectors.base import Collector
+from core.batch import MetricBatch, SERIES
+from core.models import Component
+from core.rules import RULES
+from core.sharding import ShardedRuntime
+
+
+class SteadyCpuCollector(Collector):
+    """cpu.usage = 0.7 for every target, every tick."""
+    name = "steady"
+
+    def __init__(self, targets):
+        super().__init__()
+        self.ids = [SERIES.intern(Component.CPU, "usage", t) for t in targets]
+
+    async def collect_batch(self):
+        now = int(time.time())
+        return MetricBatch(self.ids, [0.7] * len(self.ids), [now] * len(self.ids)), []
+
+
+def steady_collectors(targets):
+    return [SteadyCpuCollector(targets)]
+
+
+def write_rules(path, threshold):
+    with open(path, "w") as f:
+        json.dump({"rules": [{"series": "cpu.usage", "threshold": threshold}]}, f)
+
+
+def test_rule_edits_reach_forked_shard_workers(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, 0.9)
+    old_path = RULES.path
+    RULES.path = str(path)
+    RULES.reload()
+    # The coordinator watches before the workers fork, as run_sharded does
+    RULES.watch()
+
+    async def run():
+        anomalies = []
+
+        async def on_anomaly(anomaly):
+            anomalies.append(anomaly)
+
+        runtime = ShardedRuntime(["shard-t0", "shard-t1"], workers=2, interval=0.1,
+                                 collector_factory=steady_collectors)
+        task = asyncio.create_task(runtime.run(on_anomaly, duration=15))
+        try:
+            await asyncio.sleep(1.5)
+            before = list(anomalies)
+            write_rules(path, 0.5)
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline and not {a.target for a in anomalies} >= {"shard-t0", "shard-t1"}:
+                await asyncio.sleep(0.1)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        return before, anomalies
+
+    try:
+        before, anomalies = asyncio.run(run())
+    finally:
+        RULES.stop()
+        RULES.path = old_path
+        RULES.reload()
+
+    assert before == []
+    # Every shard judged 0.7 against the edited 0.5 threshold
+    assert {a.target for a in anomalies} == {"shard-t0", "shard-t1"}
+    assert {a.threshold for a in anomalies} == {0.5}
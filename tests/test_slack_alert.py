@@ -0,0 +1,126 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from integrations.slack_alert import AlertDispatcher
+
+
+class StubWebhook:
+    """
+    Local stand-in for the Slack webhook on 127.0.0.1. Records (arrival time,
+    text) per POST and answers with queued (status, headers) responses, then
+    200 once they run out.
+    """
+    def __init__(self, responses=()):
+        self.received = []
+        self.responses = list(responses)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stub.received.append((time.monotonic(), json.loads(body)["text"]))
+                status, headers = stub.responses.pop(0) if stub.responses else (200, {})
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def texts(self):
+        return [text for _, text in self.received]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def webhook():
+    stub = StubWebhook()
+    yield stub
+    stub.close()
+
+
+async def run_dispatcher(dispatcher, submit, settle):
+    dispatcher.start()
+    submit(dispatcher)
+    await asyncio.sleep(settle)
+    await dispatcher.stop()
+
+
+def test_repeat_keys_coalesce_into_one_summary(webhook):
+    dispatcher = AlertDispatcher(webhook.url, rate_limit=100, coalesce_window=0.4)
+
+    def submit(d):
+        for i in range(5):
+            d.submit(f"db latency {i}", key="database", noun="anomalies")
+        d.submit("cpu high", key="cpu", noun="anomalies")
+
+    asyncio.run(run_dispatcher(dispatcher, submit, settle=1.0))
+
+    texts = webhook.texts()
+    assert texts[:2] == ["db latency 0", "cpu high"]
+    assert len(texts) == 3
+    assert texts[2].startswith("4 more anomalies in the last")
+    assert "on database" in texts[2]
+    assert texts[2].endswith("Latest: db latency 4")
+    assert dispatcher.stats["coalesced"] == 4
+    assert dispatcher.stats["sent"] == 3
+
+
+def test_429_is_retried_after_retry_after():
+    webhook = StubWebhook(responses=[(429, {"Retry-After": "0.3"})])
+    try:
+        dispatcher = AlertDispatcher(webhook.url, rate_limit=100)
+        asyncio.run(run_dispatcher(dispatcher, lambda d: d.submit("disk full"), settle=0.8))
+    finally:
+        webhook.close()
+
+    (first, text1), (second, text2) = webhook.received
+    assert text1 == text2 == "disk full"
+    assert second - first >= 0.3
+    assert dispatcher.stats["retries"] == 1
+    assert dispatcher.stats["sent"] == 1
+    assert dispatcher.stats["failed"] == 0
+
+
+def test_token_bucket_spaces_messages(webhook):
+    rate = 5.0
+    dispatcher = AlertDispatcher(webhook.url, rate_limit=rate)
+
+    def submit(d):
+        for i in range(4):
+            d.submit(f"alert {i}")
+
+    asyncio.run(run_dispatcher(dispatcher, submit, settle=1.0))
+
+    times = [t for t, _ in webhook.received]
+    assert len(times) == 4
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    # Allow a little scheduling jitter under the 1/rate spacing
+    assert min(gaps) >= 1.0 / rate - 0.03
+
+
+def test_full_queue_drops_and_counts():
+    async def fill():
+        # Sender not started, so nothing drains the queue
+        dispatcher = AlertDispatcher("http://127.0.0.1:9/unused", queue_size=2)
+        for i in range(5):
+            dispatcher.submit(f"alert {i}")
+        return dispatcher
+
+    dispatcher = asyncio.run(fill())
+    assert dispatcher.queue_depth() == 2
+    assert dispatcher.stats["dropped"] == 3
@@ -1,7 +1,6 @@
 import streamlit as st
 import json
 import time
-import pandas as pd
 import os
 import sys
 import random
@@ -10,7 +9,14 @@ from datetime import datetime
 # Add parent directory to path to allow imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from core.database import DatabaseManager
+from core.storage import SQLiteStorage, BlockingStorage
+from core.archive import MetricArchive, archive_dir
+from core.database import DB_FILE
+from agents.reporter import ReporterAgent
+from ui.live_feed import LiveMetricsFeed, SharedMemoryFeed, downsample
+from config.settings import (
+    DASHBOARD_READ_ONLY, DASHBOARD_CHART_POINTS, DASHBOARD_REFRESH, DASHBOARD_HISTORY_SECONDS, LIVE_FEED_FILE,
+)
 
 st.set_page_config(
     page_title="HealthGuard AI Monitor",
@@ -37,6 +43,7 @@ st.title("🛡️ HealthGuard AI: Autonomous SRE")
 st.markdown("### 🔴 Live System Telemetry")
 
 # --- CLOUD DEPLOYMENT SUPPORT: SELF-DRIVING MODE ---
+# Only used when DASHBOARD_READ_ONLY is False (no backend writing the DB)
 def ensure_live_data(db_manager):
     """Generates a new data point with SMOOTH random walk for realistic effect"""
     
@@ -64,17 +71,73 @@ def ensure_live_data(db_manager):
     db_lat = random.randint(20, 60) if new_cpu < 0.8 else random.randint(100, 300)
     api_lat = random.randint(30, 150)
 
-    db_manager.log_metric("cpu", "usage", new_cpu)
-    db_manager.log_metric("memory", "usage", new_mem)
-    db_manager.log_metric("database", "latency", db_lat)
-    db_manager.log_metric("api", "latency", api_lat)
+    db_manager.log_metrics([
+        ("cpu", "usage", new_cpu),
+        ("memory", "usage", new_mem),
+        ("database", "latency", db_lat),
+        ("api", "latency", api_lat),
+    ]).result()  # written before this run's refresh reads it back
     
     return new_cpu, new_mem, db_lat, api_lat
 
+# Shared across reruns and sessions: one storage (pooled read-only
+# connections) and one incremental feed
+@st.cache_resource
+def get_db():
+    return BlockingStorage(SQLiteStorage(read_only=DASHBOARD_READ_ONLY))
+
+@st.cache_resource
+def get_shared_feed():
+    return SharedMemoryFeed(LIVE_FEED_FILE)
+
+@st.cache_resource
+def get_polling_feed():
+    return LiveMetricsFeed(get_db())
+
+def get_feed():
+    # Read the backend's shared-memory feed when it is running; the demo mode
+    # writes its own samples to the DB, so it polls that instead. Checked on
+    # every rerun, so a dashboard started before the backend switches over
+    # once the feed file appears (only the feed objects are cached).
+    if DASHBOARD_READ_ONLY and LIVE_FEED_FILE and os.path.exists(LIVE_FEED_FILE):
+        try:
+            return get_shared_feed()
+        except (OSError, ValueError):
+            pass  # being replaced, or not a feed: poll the DB this run
+    return get_polling_feed()
+
+@st.cache_resource
+def get_archive():
+    # Memory-mapped columns: opening is cheap and the OS page cache is shared
+    return MetricArchive(archive_dir(DB_FILE))
+
+@st.cache_data(ttl=60)
+def get_archived_values(component, name):
+    # Archived partitions only change when the backend closes a new one
+    _, values = get_archive().query(component, name, time.time() - DASHBOARD_HISTORY_SECONDS)
+    return downsample(values, DASHBOARD_CHART_POINTS)
+
+@st.cache_data(ttl=2)
+def get_recent_incidents():
+    rows, _ = get_db().query_incidents(limit=3)
+    return rows
+
+@st.cache_data(max_entries=100)
+def get_incident_markdown(incident_id):
+    # Finished incidents never change, so a rendered report can be kept
+    report = get_db().get_incident(incident_id)
+    return ReporterAgent().render(report, "markdown") if report is not None else None
+
 # Connect to DB
 try:
-    db = DatabaseManager()
+    db = get_db()
+    feed = get_feed()
 except Exception as e:
+    if DASHBOARD_READ_ONLY:
+        # Read-only mode needs the backend (python main.py) to create or migrate the DB first
+        st.info(f"Waiting for the HealthGuard backend to prepare its database... ({e})")
+        time.sleep(2)
+        st.rerun()
     st.error(f"Failed to connect to Database: {e}")
     st.stop()
 
@@ -82,62 +145,70 @@ except Exception as e:
 col1, col2, col3, col4 = st.columns(4)
 
 # Generate & Get Data
-curr_cpu, curr_mem, curr_db, curr_api = ensure_live_data(db)
+if not DASHBOARD_READ_ONLY:
+    ensure_live_data(db)
+feed.refresh()
+
+curr_cpu = feed.latest("cpu", "usage", 0.0)
+curr_mem = feed.latest("memory", "usage", 0.0)
+curr_db = feed.latest("database", "latency", 0.0)
+curr_api = feed.latest("api", "latency", 0.0)
 
 with col1:
     st.metric("CPU Load", f"{curr_cpu*100:.1f}%", f"{(curr_cpu-0.5)*10:.1f}%", delta_color="inverse")
 with col2:
     st.metric("Memory Usage", f"{curr_mem*100:.1f}%", f"{(curr_mem-0.5)*5:.1f}%", delta_color="normal")
 with col3:
-    st.metric("DB Latency", f"{curr_db}ms", delta_color="inverse")
+    st.metric("DB Latency", f"{curr_db:.0f}ms", delta_color="inverse")
 with col4:
-    st.metric("API Latency", f"{curr_api}ms")
+    st.metric("API Latency", f"{curr_api:.0f}ms")
 
 # --- VISUALIZATION: AREA CHARTS ---
 st.markdown("### System Performance")
 chart_col1, chart_col2 = st.columns(2)
 
-# Fetch History
-raw_metrics = db.get_latest_metrics(limit=200) # Get more data for smooth lines
-metric_df = pd.DataFrame(raw_metrics, columns=["id", "timestamp", "Component", "Name", "Value"])
-metric_df["Component"] = metric_df["Component"].str.upper()
-
 with chart_col1:
     st.subheader("🔥 CPU Usage Trend")
-    cpu_df = metric_df[metric_df["Name"] == "usage"]
-    cpu_df = cpu_df[cpu_df["Component"] == "CPU"]
+    cpu_values = feed.values("cpu", "usage")
     
-    if not cpu_df.empty:
-        # Reverse to show chronological order (oldest -> newest)
-        chart_data = cpu_df.sort_values("id")
-        # Clean index for chart
-        chart_data = chart_data.reset_index(drop=True)
-        st.area_chart(chart_data["Value"], color="#ff4b4b") # Red for CPU
+    if len(cpu_values):
+        # Oldest -> newest, decimated to the chart's resolution
+        st.area_chart(downsample(cpu_values, DASHBOARD_CHART_POINTS), color="#ff4b4b") # Red for CPU
     else:
         st.info("Initializing CPU Stream...")
 
 with chart_col2:
     st.subheader("💾 Memory Usage Trend")
-    mem_df = metric_df[metric_df["Name"] == "usage"]
-    mem_df = mem_df[mem_df["Component"] == "MEMORY"]
+    mem_values = feed.values("memory", "usage")
     
-    if not mem_df.empty:
-        chart_data = mem_df.sort_values("id")
-        chart_data = chart_data.reset_index(drop=True)
-        st.area_chart(chart_data["Value"], color="#0068c9") # Blue for Memory
+    if len(mem_values):
+        st.area_chart(downsample(mem_values, DASHBOARD_CHART_POINTS), color="#0068c9") # Blue for Memory
     else:
         st.info("Initializing Memory Stream...")
 
+# --- LONG-RANGE HISTORY (columnar archive) ---
+if get_archive().partitions():
+    st.markdown("### 📚 Long-Range History")
+    hist_col1, hist_col2 = st.columns(2)
+    with hist_col1:
+        st.subheader("CPU Usage (archived)")
+        st.line_chart(get_archived_values("cpu", "usage"), color="#ff4b4b")
+    with hist_col2:
+        st.subheader("Memory Usage (archived)")
+        st.line_chart(get_archived_values("memory", "usage"), color="#0068c9")
+
 # --- INCIDENTS ---
 st.subheader("🚨 Detected Anomalies")
-incidents = db.get_incidents(limit=3)
+incidents = get_recent_incidents()
 if incidents:
-    for inc in incidents:
-        st.error(f"**{inc[3]}** | {inc[1]} | Root Cause: {inc[4]}")
+    for inc_id, ts, status, component, target, severity, root_cause, fix_action in incidents:
+        when = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else "?"
+        st.error(f"**{component}** on {target or 'local'} | {when} | Root Cause: {root_cause}")
+        with st.expander(f"{inc_id} – {status} ({fix_action})"):
+            st.markdown(get_incident_markdown(inc_id) or "Report not available.")
 else:
     st.success("No active anomalies detected. System operating within normal parameters.")
 
 # Auto-refresh
-time.sleep(0.8) # Faster refresh for "video" feel
+time.sleep(DASHBOARD_REFRESH) # Faster refresh for "video" feel
 st.rerun()
-
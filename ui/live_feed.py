@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+
+from config.settings import DASHBOARD_WINDOW, DASHBOARD_REFRESH
+from core.shared_ring import SharedSeriesRing, series_key
+
+
+class LiveMetricsFeed:
+    """
+    Recent samples per (component, name), shared by every dashboard session.
+    Each refresh only fetches rows newer than the last id seen, and refreshes
+    are throttled so many viewers cost one query per interval.
+    """
+    def __init__(self, db, window=DASHBOARD_WINDOW, min_interval=DASHBOARD_REFRESH):
+        self.db = db
+        self.window = window
+        self.min_interval = min_interval
+
+        self.series = {}  # (component, name) -> deque of (timestamp, value)
+        self.last_id = None
+        self.last_refresh = 0.0
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        with self.lock:
+            if time.monotonic() - self.last_refresh < self.min_interval:
+                return
+            self.last_refresh = time.monotonic()
+
+            rows = self.db.get_metrics_since(self.last_id, limit=self.window * 4)
+            for _, ts, component, name, value in rows:
+                buf = self.series.get((component, name))
+                if buf is None:
+                    buf = self.series[(component, name)] = deque(maxlen=self.window)
+                buf.append((ts, value))
+            if rows:
+                self.last_id = rows[-1][0]
+
+    def values(self, component, name):
+        with self.lock:
+            buf = self.series.get((component, name))
+            if not buf:
+                return np.empty(0)
+            return np.fromiter((v for _, v in buf), dtype=np.float64, count=len(buf))
+
+    def latest(self, component, name, default=None):
+        with self.lock:
+            buf = self.series.get((component, name))
+            return buf[-1][1] if buf else default
+
+
+class SharedMemoryFeed:
+    """
+    Same interface as LiveMetricsFeed, read straight from the orchestrator's
+    shared-memory ring (core/shared_ring.py): no DB query and no per-session
+    buffers. Only the series being drawn are copied out.
+    """
+    def __init__(self, path):
+        self.ring = SharedSeriesRing(path)
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        with self.lock:
+            if self.ring.stale():
+                # The orchestrator restarted and published a fresh file
+                self.ring.remap()
+
+    def values(self, component, name, target="local"):
+        with self.lock:
+            try:
+                return self.ring.read(series_key(target, component, name))[1]
+            except TimeoutError:
+                return np.empty(0)  # writer died mid-update; it rewrites the file on restart
+
+    def latest(self, component, name, default=None, target="local"):
+        with self.lock:
+            try:
+                return self.ring.latest(series_key(target, component, name), default)
+            except TimeoutError:
+                return default
+
+
+def downsample(values, points):
+    """
+    Min/max decimation to roughly `points` values: each bucket keeps its
+    extremes in time order, so spikes survive on a narrow chart.
+    """
+    n = len(values)
+    if n <= points:
+        return values
+    buckets = max(1, points // 2)
+    size = n // buckets
+    trimmed = values[n - size * buckets:].reshape(buckets, size)
+    lo_idx = trimmed.argmin(axis=1)
+    hi_idx = trimmed.argmax(axis=1)
+    rows = np.arange(buckets)
+    first = np.where(lo_idx <= hi_idx, trimmed[rows, lo_idx], trimmed[rows, hi_idx])
+    second = np.where(lo_idx <= hi_idx, trimmed[rows, hi_idx], trimmed[rows, lo_idx])
+    return np.column_stack((first, second)).ravel()